@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Runway simulation benchmark for Omri Association Dashboard
+Times the Monte Carlo runway (src.runway) on synthetic monthly donation and
+expense totals for both resampling methods
+
+Usage: python -m benchmarks.bench_runway --paths 10000 50000 --horizon 36 --repeat 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.runway import METHODS, simulate_runway
+
+
+def make_history(months=36, seed=0):
+    """Monthly donations and expenses with a seasonal swing"""
+    rng = np.random.default_rng(seed)
+    season = 1 + 0.3 * np.sin(np.arange(months) / 12 * 2 * np.pi)
+    return pd.DataFrame(
+        {
+            "donations": rng.gamma(8.0, 12000.0, months) * season,
+            "expenses": rng.normal(95000.0, 15000.0, months).clip(0),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paths", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--horizon", type=int, default=36)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    history = make_history()
+    commitments = np.linspace(60000.0, 75000.0, args.horizon)
+    print(f"{'paths':>8} {'method':>10} {'best ms':>8} {'median runway':>14}")
+    for paths in args.paths:
+        for method in METHODS:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                result = simulate_runway(
+                    history,
+                    args.horizon,
+                    paths,
+                    starting_balance=200000.0,
+                    commitments=commitments,
+                    method=method,
+                )
+                timings.append(time.perf_counter() - started)
+            median = result.runway_percentiles()[50]
+            print(f"{paths:>8} {method:>10} {min(timings) * 1000:>8.1f} {median:>14}")
+
+
+if __name__ == "__main__":
+    main()
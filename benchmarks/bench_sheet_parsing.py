@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Sheet parsing benchmark for Omri Association Dashboard
+Compares the schema-driven parser (src.sheet_schemas) with the previous
+keyword-scan cleaning path, on synthetic ledgers of configurable size; the
+typed column parses the same ledger as read with SHEETS_VALUE_RENDER=typed
+
+Usage: python -m benchmarks.bench_sheet_parsing --rows 5000 20000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from src.sheet_schemas import _fix_headers, parse_sheet
+
+
+def make_ledger_rows(rows, seed=0):
+    """Build raw Donations rows (title + header + data) like the values API returns them"""
+    rng = random.Random(seed)
+    values = [["עמרי למען משפחות השכול- תרומות"], ["תאריך", "שם התורם", "סכום"]]
+    for _ in range(rows):
+        day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2021, 2025)
+        # Donations come in a few dozen round amounts
+        amount = rng.choice(["{:,}", "₪ {:,}", "{}"]).format(rng.randint(1, 40) * 50)
+        values.append([f"{day:02d}.{month:02d}.{year}", f"תורם {rng.randint(1, 500)}", amount])
+    return values
+
+
+def make_typed_rows(rows, seed=0):
+    """The same ledger as an UNFORMATTED_VALUE/SERIAL_NUMBER read returns it"""
+    values = make_ledger_rows(rows, seed)
+    typed = values[:2]
+    for date, name, amount in values[2:]:
+        day, month, year = (int(part) for part in date.split("."))
+        serial = (pd.Timestamp(year, month, day) - pd.Timestamp("1899-12-30")).days
+        typed.append([serial, name, int(amount.replace("₪", "").replace(",", ""))])
+    return typed
+
+
+def legacy_parse(title, values):
+    """The cleaning path load_all_data used before the schema engine (kept for comparison)"""
+    width = max(len(row) for row in values)
+    values = [row + [""] * (width - len(row)) for row in values]
+    headers = _fix_headers(values[1])
+    df = pd.DataFrame(values[2:], columns=headers).replace("", pd.NA)
+    mapping = {}
+    for col in df.columns:
+        col_str = str(col).strip()
+        if col_str == "NaT":
+            mapping[col] = "תאריך"
+        elif col_str in ("שם התורם", "שם", "שם לקוח"):
+            mapping[col] = "שם"
+        elif col_str == "סכום":
+            mapping[col] = "שקלים"
+    df = df.rename(columns=mapping)
+    df = df[["תאריך", "שם", "שקלים"]]
+    for col in df.columns:
+        col_lower = str(col).lower()
+        if (
+            any(k in col_lower for k in ["תאריך", "date", "חודש", "month"])
+            and "סכום" not in col_lower
+        ):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in df.columns:
+        col_lower = str(col).lower()
+        if any(k in col_lower for k in ["סכום", "amount", "שקלים", "מחיר", "price", "חודשי"]):
+            df[col] = df[col].astype(str).str.replace(r"[^\d.,-]", "", regex=True)
+            df[col] = df[col].str.replace(",", ".")
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+
+def best_of(fn, repeat):
+    """Best wall time of ``repeat`` runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'rows':>8} {'legacy ms':>10} {'schema ms':>10} {'typed ms':>9} {'speedup':>8}"
+        "  amounts-differ"
+    )
+    for rows in args.rows:
+        values = make_ledger_rows(rows)
+        legacy = best_of(lambda values=values: legacy_parse("Donations", values), args.repeat)
+        schema = best_of(lambda values=values: parse_sheet("Donations", values), args.repeat)
+        typed_values = make_typed_rows(rows)
+        typed = best_of(lambda v=typed_values: parse_sheet("Donations", v), args.repeat)
+        # The legacy path read "1,500" as 1.5; count the rows whose amount it got wrong
+        differ = int(
+            (
+                legacy_parse("Donations", values)["שקלים"]
+                != parse_sheet("Donations", values)["שקלים"]
+            ).sum()
+        )
+        print(
+            f"{rows:>8} {legacy * 1000:>10.1f} {schema * 1000:>10.1f} {typed * 1000:>9.1f}"
+            f" {legacy / schema:>7.1f}x  {differ}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Streaming read benchmark for Omri Association Dashboard
+Compares peak memory and time of a full worksheet read with the paged
+streaming reader (src.sheet_stream) on a synthetic Donations ledger
+
+Usage: python -m benchmarks.bench_sheet_stream --rows 100000 --page-rows 5000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.bench_sheet_parsing import make_ledger_rows
+from src.sheet_schemas import parse_sheet
+from src.sheet_stream import collect_pages, iter_sheet_pages
+from src.sheets_backend import LocalBackend
+
+
+def measure(fn):
+    """Return (seconds, peak bytes allocated) of ``fn()``, timed without tracing"""
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    backend = LocalBackend(workbooks={"book": {"Donations": make_ledger_rows(args.rows)}})
+    spreadsheet = backend.open("book")
+    worksheet = spreadsheet.worksheet("Donations")
+
+    def full():
+        return parse_sheet("Donations", backend.read_worksheet(worksheet))
+
+    def streamed():
+        pages = iter_sheet_pages(
+            lambda ranges: backend.batch_read(spreadsheet, ranges),
+            "'Donations'",
+            "Donations",
+            args.page_rows,
+            worksheet.row_count,
+        )
+        return collect_pages(pages, None)
+
+    def folded():
+        pages = iter_sheet_pages(
+            lambda ranges: backend.batch_read(spreadsheet, ranges),
+            "'Donations'",
+            "Donations",
+            args.page_rows,
+            worksheet.row_count,
+        )
+        return sum(page["שקלים"].sum() for page in pages)
+
+    print(f"{'mode':>10} {'seconds':>8} {'peak MB':>8}")
+    for name, fn in (("full", full), ("streamed", streamed), ("folded", folded)):
+        seconds, peak = measure(fn)
+        print(f"{name:>10} {seconds:>8.2f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
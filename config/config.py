@@ -24,12 +24,29 @@ class Config:
     DATA_CACHE_TTL = int(os.getenv("DATA_CACHE_TTL", "300"))  # 5 minutes
     STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "600"))  # 10 minutes
 
+    # Background refresher: reloads the dashboard data off the render path
+    ENABLE_BACKGROUND_REFRESH = os.getenv("ENABLE_BACKGROUND_REFRESH", "true").lower() == "true"
+    DATA_REFRESH_INTERVAL = int(os.getenv("DATA_REFRESH_INTERVAL", str(DATA_CACHE_TTL)))  # seconds
+
+    # On-disk Parquet snapshot of the dashboard data (warm start for new processes)
+    ENABLE_SNAPSHOTS = os.getenv("ENABLE_SNAPSHOTS", "true").lower() == "true"
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+
+    # Compact loaded frames (categorical names, Arrow strings, small-int counts)
+    COMPACT_FRAMES = os.getenv("COMPACT_FRAMES", "true").lower() == "true"
+
     # Google Sheets settings
     SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE", "service_account.json")
     SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "1zo3Rnmmykvd55owzQyGPSjx6cYfy4SB3SZc-Ku7UcOo")
     WIDOW_SPREADSHEET_ID = os.getenv(
         "WIDOW_SPREADSHEET_ID", "1FQRFhChBVUI8G7GrJW8BZInxJ2F25UhMT-fj-O6odv8"
     )
+    # Workbooks of archived years, oldest first (comma-separated spreadsheet ids);
+    # fetched once, frozen in the snapshot store and concatenated with SPREADSHEET_ID
+    ARCHIVE_SPREADSHEET_IDS = [
+        sid.strip() for sid in os.getenv("ARCHIVE_SPREADSHEET_IDS", "").split(",") if sid.strip()
+    ]
+    SHEETS_FETCH_TIMEOUT = float(os.getenv("SHEETS_FETCH_TIMEOUT", "60"))  # seconds
 
     # UI settings
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
@@ -104,6 +121,7 @@ class Config:
             "service_account_file": cls.SERVICE_ACCOUNT_FILE,
             "spreadsheet_id": cls.SPREADSHEET_ID,
             "widow_spreadsheet_id": cls.WIDOW_SPREADSHEET_ID,
+            "archive_spreadsheet_ids": ",".join(cls.ARCHIVE_SPREADSHEET_IDS),
         }
 
     @classmethod
@@ -112,4 +130,5 @@ class Config:
         return {
             "data_cache_ttl": cls.DATA_CACHE_TTL,
             "stats_cache_ttl": cls.STATS_CACHE_TTL,
+            "snapshot_dir": cls.SNAPSHOT_DIR,
         }
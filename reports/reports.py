@@ -5,6 +5,9 @@ import pandas as pd
 import streamlit as st
 from fpdf import FPDF
 
+from src.donor_index import build_donor_index
+from src.rollups import build_rollups, month_label
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -63,8 +66,11 @@ def clean_text_for_pdf(text):
     return text
 
 
-def generate_monthly_report(expenses_df, donations_df, widows_df):
-    """Generate a monthly report"""
+def generate_monthly_report(expenses_df, donations_df, widows_df, donor_index=None):
+    """Generate a monthly report
+
+    Donations per donor come from ``donor_index`` when given (the index of the data version).
+    """
     try:
         logger.info("Starting monthly report generation...")
         logger.info(f"Expenses DataFrame shape: {expenses_df.shape}")
@@ -92,7 +98,7 @@ def generate_monthly_report(expenses_df, donations_df, widows_df):
         logger.info(f"Expenses columns: {list(expenses_df.columns)}")
         if "שם" in expenses_df.columns and "שקלים" in expenses_df.columns:
             expenses_by_category = (
-                expenses_df.groupby("שם")["שקלים"].sum().sort_values(ascending=False)
+                expenses_df.groupby("שם", observed=True)["שקלים"].sum().sort_values(ascending=False)
             )
             logger.info(f"Expenses by category: {expenses_by_category.to_dict()}")
             for category, amount in expenses_by_category.items():
@@ -110,9 +116,9 @@ def generate_monthly_report(expenses_df, donations_df, widows_df):
         # Calculate donations by donor
         logger.info(f"Donations columns: {list(donations_df.columns)}")
         if "שם" in donations_df.columns and "שקלים" in donations_df.columns:
-            donations_by_donor = (
-                donations_df.groupby("שם")["שקלים"].sum().sort_values(ascending=False)
-            )
+            if donor_index is None:
+                donor_index = build_donor_index(donations_df, "שקלים", "שם")
+            donations_by_donor = donor_index.ranking()
             logger.info(f"Donations by donor: {donations_by_donor.to_dict()}")
             for donor, amount in donations_by_donor.items():
                 clean_donor = clean_text_for_pdf(donor)
@@ -130,7 +136,9 @@ def generate_monthly_report(expenses_df, donations_df, widows_df):
         logger.info(f"Widows columns: {list(widows_df.columns)}")
         if "שם " in widows_df.columns and "סכום חודשי" in widows_df.columns:
             support_by_widow = (
-                widows_df.groupby("שם ")["סכום חודשי"].sum().sort_values(ascending=False)
+                widows_df.groupby("שם ", observed=True)["סכום חודשי"]
+                .sum()
+                .sort_values(ascending=False)
             )
             logger.info(f"Support by widow: {support_by_widow.to_dict()}")
             for widow, amount in support_by_widow.items():
@@ -224,8 +232,11 @@ def generate_widows_report(widows_df):
         return None
 
 
-def generate_donor_report(donations_df):
-    """Generate a donor report"""
+def generate_donor_report(donations_df, donor_index=None):
+    """Generate a donor report
+
+    Donor totals come from ``donor_index`` when given (the index of the data version).
+    """
     try:
         logger.info("Starting donor report generation...")
         logger.info(f"Donations DataFrame shape: {donations_df.shape}")
@@ -246,14 +257,10 @@ def generate_donor_report(donations_df):
         # Calculate donor statistics
         if "שם" in donations_df.columns and "שקלים" in donations_df.columns:
             # Convert amount column to numeric, handling mixed data types
-            donations_df_copy = donations_df.copy()
-            donations_df_copy["שקלים"] = pd.to_numeric(
-                donations_df_copy["שקלים"], errors="coerce"
-            ).fillna(0)
-            donor_totals = (
-                donations_df_copy.groupby("שם")["שקלים"].sum().sort_values(ascending=False)
-            )
-            total_donations = donations_df_copy["שקלים"].sum()
+            if donor_index is None:
+                donor_index = build_donor_index(donations_df, "שקלים", "שם")
+            donor_totals = donor_index.ranking()
+            total_donations = pd.to_numeric(donations_df["שקלים"], errors="coerce").fillna(0).sum()
             logger.info(f"Total donations: {total_donations}")
             logger.info(f"Number of donors: {len(donor_totals)}")
 
@@ -297,8 +304,12 @@ def generate_donor_report(donations_df):
         return None
 
 
-def generate_budget_report(expenses_df, donations_df):
-    """Generate a budget report"""
+def generate_budget_report(expenses_df, donations_df, rollups=None):
+    """Generate a budget report
+
+    Monthly totals come from ``rollups`` (the shared result of the data version)
+    when given, otherwise they are rolled up from the two frames.
+    """
     try:
         logger.info("Starting budget report generation...")
         logger.info(f"Expenses DataFrame shape: {expenses_df.shape}")
@@ -321,43 +332,21 @@ def generate_budget_report(expenses_df, donations_df):
         pdf.cell(0, 10, "Monthly Comparison:", 0, 1, "L")
         pdf.set_font("Arial", "", 12)
 
-        # Calculate monthly totals
-        if "תאריך" in expenses_df.columns and "שקלים" in expenses_df.columns:
-            # Convert date column to datetime and amount column to numeric
-            expenses_df_copy = expenses_df.copy()
-            expenses_df_copy["תאריך"] = pd.to_datetime(expenses_df_copy["תאריך"], errors="coerce")
-            expenses_df_copy["שקלים"] = pd.to_numeric(
-                expenses_df_copy["שקלים"], errors="coerce"
-            ).fillna(0)
-            monthly_expenses = expenses_df_copy.groupby(
-                expenses_df_copy["תאריך"].dt.strftime("%Y-%m")
-            )["שקלים"].sum()
-            logger.info(f"Monthly expenses: {monthly_expenses.to_dict()}")
-        else:
-            monthly_expenses = pd.Series()
-            logger.warning("Missing required columns in expenses_df")
-
-        if "תאריך" in donations_df.columns and "שקלים" in donations_df.columns:
-            # Convert date column to datetime and amount column to numeric
-            donations_df_copy = donations_df.copy()
-            donations_df_copy["תאריך"] = pd.to_datetime(donations_df_copy["תאריך"], errors="coerce")
-            donations_df_copy["שקלים"] = pd.to_numeric(
-                donations_df_copy["שקלים"], errors="coerce"
-            ).fillna(0)
-            monthly_donations = donations_df_copy.groupby(
-                donations_df_copy["תאריך"].dt.strftime("%Y-%m")
-            )["שקלים"].sum()
-            logger.info(f"Monthly donations: {monthly_donations.to_dict()}")
-        else:
-            monthly_donations = pd.Series()
-            logger.warning("Missing required columns in donations_df")
-
-        for month in sorted(set(monthly_expenses.index) | set(monthly_donations.index)):
-            expenses = monthly_expenses.get(month, 0)
-            donations = monthly_donations.get(month, 0)
-            balance = donations - expenses
-
-            pdf.cell(0, 10, f"Month: {month}", 0, 1, "L")
+        # Monthly totals per integer month key
+        for name, df in (("expenses_df", expenses_df), ("donations_df", donations_df)):
+            if "תאריך" not in df.columns or "שקלים" not in df.columns:
+                logger.warning(f"Missing required columns in {name}")
+        if rollups is None:
+            rollups = build_rollups(expenses_df, donations_df)
+        months = rollups.months()
+        logger.info(f"Monthly totals: {len(months)} months")
+
+        for month, row in months.iterrows():
+            expenses = row["expenses"]
+            donations = row["donations"]
+            balance = row["balance"]
+
+            pdf.cell(0, 10, f"Month: {month_label(int(month))}", 0, 1, "L")
             pdf.cell(0, 10, f"Expenses: {expenses:,.2f} NIS", 0, 1, "L")
             pdf.cell(0, 10, f"Donations: {donations:,.2f} NIS", 0, 1, "L")
             pdf.cell(0, 10, f"Balance: {balance:,.2f} NIS", 0, 1, "L")
@@ -0,0 +1,274 @@
+"""Process-level background refresher for the dashboard data.
+
+A daemon thread reloads both workbooks every ``Config.DATA_REFRESH_INTERVAL``
+seconds and atomically swaps the result into ``DATASET_STORE``. Page renders
+only read the current version, so a rerun never waits on Google Sheets once the
+first version exists.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable
+
+import pandas as pd
+
+from config.config import Config
+from services.sheets import SCHEDULER, fetch_all_workbooks
+from services.snapshot_store import compute_frames_version
+from src.donor_index import DonorIndex, build_donor_index
+from src.incremental import DatasetAggregates, build_aggregates
+from src.multi_year import MultiYearFrames
+from src.rollups import Rollups, build_rollups
+from src.sheets_scheduler import BACKGROUND
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DatasetVersion:
+    """One immutable snapshot of the dashboard data and how it was loaded.
+
+    ``version`` is derived from the content of every frame, so an unchanged
+    refresh keeps the token and the statistics cached under it.
+    """
+
+    frames: Mapping[str, pd.DataFrame]
+    widow_support: pd.DataFrame
+    version: str | None
+    refreshed_at: float  # epoch seconds
+    duration: float  # seconds the load took
+    errors: Mapping[str, str] = field(default_factory=dict)
+    rollups: Rollups | None = None  # monthly totals, computed once per version
+    aggregates: DatasetAggregates | None = None  # maintained from the previous version
+    donor_index: DonorIndex | None = None  # per-donor totals shared by stats, charts, reports
+
+    @property
+    def has_data(self) -> bool:
+        return any(not frame.empty for frame in self.frames.values())
+
+
+class DatasetStore:
+    """Holds the current DatasetVersion; swaps replace it in one assignment."""
+
+    def __init__(self) -> None:
+        self._current: DatasetVersion | None = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def current(self) -> DatasetVersion | None:
+        return self._current
+
+    def swap(self, dataset: DatasetVersion) -> DatasetVersion | None:
+        """Publish ``dataset`` as the current version and return the previous one."""
+        with self._lock:
+            previous, self._current = self._current, dataset
+        self._ready.set()
+        return previous
+
+    def wait(self, timeout: float | None = None) -> DatasetVersion | None:
+        """Wait until a first version was published (or ``timeout`` elapsed)."""
+        self._ready.wait(timeout)
+        return self._current
+
+
+def dataset_version(frames: Mapping[str, pd.DataFrame], widow_support: pd.DataFrame) -> str:
+    """Content-derived token over every frame of a version, widow support included.
+
+    Archive workbooks count by their frozen version, so only the current
+    workbook is hashed on a refresh.
+    """
+    if isinstance(frames, MultiYearFrames) and frames.archive_version is not None:
+        current = compute_frames_version({**frames.current, "Widows Support": widow_support})
+        token = f"{current}|{frames.archive_version}".encode()
+        return hashlib.sha1(token).hexdigest()[:16]
+    return compute_frames_version({**frames, "Widows Support": widow_support})
+
+
+def load_dataset(fresh: bool = True, previous: DatasetVersion | None = None) -> DatasetVersion:
+    """Fetch both workbooks and package them as a DatasetVersion.
+
+    The aggregates are derived from those of ``previous`` by applying the rows
+    that changed since, so the refresh cost scales with the change set.
+    """
+    started = time.perf_counter()
+    bundle = fetch_all_workbooks(fresh=fresh)
+    frames = bundle.frames
+    if isinstance(frames, dict):
+        frames = dict(frames)  # detach from the service caches
+    # Statistics caches key on the version token instead of hashing frames
+    version = dataset_version(frames, bundle.widow_support)
+    if previous is not None and previous.version == version and previous.aggregates is not None:
+        aggregates, donor_index = previous.aggregates, previous.donor_index
+    else:
+        aggregates = build_aggregates(
+            frames,
+            version,
+            previous_frames=previous.frames if previous is not None else None,
+            previous=previous.aggregates if previous is not None else None,
+        )
+        # The per-donor totals are maintained by the aggregates from the row changes
+        donor_index = aggregates.donor_index()
+        if donor_index is None:
+            donor_index = build_donor_index(frames.get("Donations"), version=version)
+    return DatasetVersion(
+        frames=MappingProxyType(frames) if isinstance(frames, dict) else frames,
+        widow_support=bundle.widow_support,
+        version=version,
+        refreshed_at=time.time(),
+        duration=time.perf_counter() - started,
+        errors=MappingProxyType(dict(bundle.errors)),
+        rollups=aggregates.rollups()
+        or build_rollups(frames.get("Expenses"), frames.get("Donations"), version=version),
+        aggregates=aggregates,
+        donor_index=donor_index,
+    )
+
+
+class BackgroundRefresher:
+    """Daemon thread that reloads the data on a fixed interval.
+
+    A load that returns no data (Google unavailable) keeps the current version
+    and is reported by ``status``.
+    """
+
+    def __init__(
+        self,
+        store: DatasetStore,
+        load: Callable[[], DatasetVersion] | None = None,
+        interval: float = Config.DATA_REFRESH_INTERVAL,
+        initial_load: Callable[[], DatasetVersion] = lambda: load_dataset(fresh=False),
+    ) -> None:
+        self.store = store
+        self.interval = interval
+        self._load = load or self._load_next
+        self._initial_load = initial_load
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._status: dict[str, Any] = {
+            "refreshes": 0,
+            "failures": 0,
+            "last_error": None,
+            "last_attempt_at": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the refresh thread (no-op if it is already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="dashboard-data-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def load_initial(self) -> DatasetVersion | None:
+        """Publish a first version synchronously unless one exists (cold start).
+
+        Uses the Streamlit cache and the on-disk snapshot, so a restarted process
+        serves the last snapshot at once.
+        """
+        with self._refresh_lock:
+            if self.store.current() is None:
+                dataset = self._initial_load()
+                if dataset.has_data:
+                    self.store.swap(dataset)
+            return self.store.current()
+
+    def refresh_now(self) -> DatasetVersion | None:
+        """Load the data once and publish it; return the current version afterwards."""
+        with self._refresh_lock:
+            self._status["last_attempt_at"] = time.time()
+            try:
+                dataset = self._load()
+            except Exception as exc:
+                LOGGER.exception("Refreshing the dashboard data failed: %s", exc)
+                self._status["failures"] += 1
+                self._status["last_error"] = str(exc)
+                return self.store.current()
+            if not dataset.has_data:
+                self._status["failures"] += 1
+                self._status["last_error"] = "; ".join(dataset.errors.values()) or "no data"
+                LOGGER.warning("Refresh returned no data; keeping the current version")
+                return self.store.current()
+            self.store.swap(dataset)
+            self._status["refreshes"] += 1
+            self._status["last_error"] = None
+            LOGGER.info("Published dashboard data %s (%.2fs)", dataset.version, dataset.duration)
+            return dataset
+
+    def _load_next(self) -> DatasetVersion:
+        """Load a new version incrementally on top of the current one."""
+        return load_dataset(previous=self.store.current())
+
+    def _run(self) -> None:
+        # Lower priority than page requests in the Sheets request scheduler
+        with SCHEDULER.lane(BACKGROUND):
+            while not self._stop.is_set():
+                self.refresh_now()
+                self._stop.wait(self.interval)
+
+    def status(self) -> dict[str, Any]:
+        """Refresh counters plus the time and duration of the current version."""
+        dataset = self.store.current()
+        return {
+            **self._status,
+            "running": self.running,
+            "interval": self.interval,
+            "version": dataset.version if dataset else None,
+            "refreshed_at": dataset.refreshed_at if dataset else None,
+            "duration": dataset.duration if dataset else None,
+        }
+
+
+DATASET_STORE = DatasetStore()
+
+_REFRESHER: BackgroundRefresher | None = None
+_REFRESHER_LOCK = threading.Lock()
+
+
+def get_refresher() -> BackgroundRefresher:
+    """Return the process-wide refresher, creating it on first use."""
+    global _REFRESHER
+    with _REFRESHER_LOCK:
+        if _REFRESHER is None:
+            _REFRESHER = BackgroundRefresher(DATASET_STORE)
+        return _REFRESHER
+
+
+def current_dataset() -> DatasetVersion | None:
+    """Return the current dataset version for a page render.
+
+    Only the very first call of a process loads synchronously (from the on-disk
+    snapshot when there is one); after that the background thread keeps the
+    store up to date and this call never touches Google Sheets. With
+    ``ENABLE_BACKGROUND_REFRESH=false`` an expired version is reloaded inline.
+    """
+    refresher = get_refresher()
+    dataset = DATASET_STORE.current() or refresher.load_initial()
+    if Config.ENABLE_BACKGROUND_REFRESH:
+        refresher.start()
+    elif dataset is not None and time.time() - dataset.refreshed_at > refresher.interval:
+        dataset = refresher.refresh_now()
+    return dataset
+
+
+def get_refresh_status() -> dict[str, Any]:
+    """Status of the refresher, for the header and diagnostics."""
+    return get_refresher().status()
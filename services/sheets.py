@@ -2,16 +2,53 @@
 
 from __future__ import annotations
 
+import contextvars
 import logging
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 
 import pandas as pd
 import streamlit as st
 
-# Config import moved to avoid circular imports
-from src.google_sheets_io import load_all_data
+from config.config import Config
+from services.snapshot_store import SnapshotStore, compute_frames_version
+from src.frame_compaction import compact_frames, memory_report
+from src.google_sheets_io import (
+    DASHBOARD_SHEETS,
+    REVISION_CACHE,
+    SCHEDULER,
+    SPREADSHEET_ID,
+    get_sheets_backend,
+    load_all_data,
+    load_workbook,
+    read_widow_support_data,
+)
+from src.multi_year import MultiYearFrames
+from src.sheets_scheduler import BACKGROUND
 
 LOGGER = logging.getLogger(__name__)
 
+SNAPSHOT_NAME = "dashboard_frames"
+SNAPSHOT_STORE = SnapshotStore(Config.SNAPSHOT_DIR, enabled=Config.ENABLE_SNAPSHOTS)
+
+# Process-wide state: whether the frames being served came from Google (fresh) or
+# from the on-disk snapshot (stale, revalidating)
+_STATE = {"fresh": False, "refreshing": False}
+_STATE_LOCK = threading.Lock()
+
+# Bytes per frame and column before/after compaction of the last load
+_MEMORY_REPORT: dict[str, pd.DataFrame] = {}
+
+# Frozen frames of the archive workbooks, per spreadsheet id; archived years never
+# change, so each one is fetched once and then served from memory or its snapshot
+ARCHIVE_SNAPSHOT_PREFIX = "archive_"
+_ARCHIVES: dict[str, dict[str, pd.DataFrame]] = {}
+_ARCHIVE_VERSIONS: dict[str, str] = {}  # content version of each frozen archive
+_ARCHIVE_LOCK = threading.Lock()
+
 
 def _empty_frames() -> dict[str, pd.DataFrame]:
     """Return empty dataframes for the expected sheets."""
@@ -23,15 +60,15 @@ def _empty_frames() -> dict[str, pd.DataFrame]:
     }
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def fetch_dashboard_frames() -> dict[str, pd.DataFrame]:
-    """Fetch all dashboard sheets, normalising missing data.
+def _has_data(frames: dict[str, pd.DataFrame]) -> bool:
+    """Return True if at least one frame holds rows (i.e. the load did not fail)."""
+    return any(not frame.empty for frame in frames.values())
 
-    Returns a dict keyed by sheet name with pandas DataFrames. Any failures are
-    logged and replaced with empty frames so callers can degrade gracefully.
-    """
+
+def _load_frames() -> dict[str, pd.DataFrame]:
+    """Download and normalise the dashboard sheets (no revision check)."""
     try:
-        all_data = load_all_data()
+        all_data = load_all_data(DASHBOARD_SHEETS)
     except Exception as exc:  # pragma: no cover - defensive logging
         LOGGER.exception("Failed to load data from Google Sheets: %s", exc)
         return _empty_frames()
@@ -40,6 +77,11 @@ def fetch_dashboard_frames() -> dict[str, pd.DataFrame]:
         LOGGER.warning("Google Sheets returned no data; using empty frames")
         return _empty_frames()
 
+    return _normalise_frames(all_data)
+
+
+def _normalise_frames(all_data: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """Map the sheets of a workbook onto the four dashboard frames."""
     frames = _empty_frames()
 
     expenses = all_data.get("Expenses")
@@ -62,3 +104,246 @@ def fetch_dashboard_frames() -> dict[str, pd.DataFrame]:
         frames["Widows"] = widows
 
     return frames
+
+
+def _compact(frames: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """Shrink freshly ingested frames and record the before/after memory report."""
+    if not Config.COMPACT_FRAMES:
+        return frames
+    compacted = compact_frames(frames)
+    by_frame, by_column = memory_report(frames, compacted)
+    with _STATE_LOCK:
+        _MEMORY_REPORT.update(frames=by_frame, columns=by_column)
+    LOGGER.info(
+        "Compacted dashboard frames from %d to %d bytes",
+        by_frame["bytes_before"].sum(),
+        by_frame["bytes_after"].sum(),
+    )
+    return compacted
+
+
+def get_memory_report() -> dict[str, pd.DataFrame]:
+    """Return the per-frame (``frames``) and per-column (``columns``) memory report.
+
+    Empty until the first load with ``Config.COMPACT_FRAMES`` enabled.
+    """
+    with _STATE_LOCK:
+        return dict(_MEMORY_REPORT)
+
+
+def _load_and_snapshot() -> dict[str, pd.DataFrame]:
+    """Load the frames from Google and persist them as the on-disk snapshot."""
+    frames = _compact(_load_frames())
+    if _has_data(frames):
+        SNAPSHOT_STORE.save(SNAPSHOT_NAME, frames)
+    return frames
+
+
+def _load_fresh_frames() -> dict[str, pd.DataFrame]:
+    """Load the frames from Google, reusing parsed frames while the revision is unchanged."""
+    frames = REVISION_CACHE.get_or_load(
+        SPREADSHEET_ID, SNAPSHOT_NAME, _load_and_snapshot, cacheable=_has_data
+    )
+    if _has_data(frames):
+        with _STATE_LOCK:
+            _STATE["fresh"] = True
+    return frames
+
+
+def _revalidate_in_background() -> None:
+    """Refresh the snapshot-served frames from Google on a daemon thread (once at a time)."""
+    with _STATE_LOCK:
+        if _STATE["refreshing"]:
+            return
+        _STATE["refreshing"] = True
+
+    def _run() -> None:
+        try:
+            # Queue behind interactive requests so revalidation never delays a user
+            with SCHEDULER.lane(BACKGROUND):
+                refreshed = _load_fresh_frames()
+            if _has_data(refreshed):
+                # Next rerun picks up the fresh frames instead of the snapshot
+                fetch_dashboard_frames.clear()
+        except Exception as exc:  # pragma: no cover - defensive logging
+            LOGGER.exception("Background refresh of dashboard frames failed: %s", exc)
+        finally:
+            with _STATE_LOCK:
+                _STATE["refreshing"] = False
+
+    threading.Thread(target=_run, name="dashboard-snapshot-revalidate", daemon=True).start()
+
+
+def _load_archive(spreadsheet_id: str) -> tuple[dict[str, pd.DataFrame], str | None]:
+    """Frames of one archive workbook and their version: from its snapshot, or
+    fetched once and frozen."""
+    name = f"{ARCHIVE_SNAPSHOT_PREFIX}{spreadsheet_id}"
+    snapshot = SNAPSHOT_STORE.load(name)
+    if snapshot is not None:
+        frames, manifest = snapshot
+        return {**_empty_frames(), **frames}, manifest.get("version")
+    frames = _normalise_frames(load_workbook(spreadsheet_id, DASHBOARD_SHEETS))
+    version = None
+    if _has_data(frames):
+        if Config.COMPACT_FRAMES:
+            frames = compact_frames(frames)
+        version = SNAPSHOT_STORE.save(name, frames)
+        LOGGER.info("Froze archive workbook %s", spreadsheet_id)
+    return frames, version
+
+
+def fetch_archives(
+    spreadsheet_ids: list[str] | None = None,
+) -> tuple[list[dict[str, pd.DataFrame]], list[str]]:
+    """Return the frames of the archive workbooks, in configured order (oldest first),
+    and the content version of each.
+
+    Archives not frozen yet are fetched in parallel and hashed once; an archive
+    that fails to load is left out and retried on the next call.
+    """
+    spreadsheet_ids = Config.ARCHIVE_SPREADSHEET_IDS if spreadsheet_ids is None else spreadsheet_ids
+    with _ARCHIVE_LOCK:
+        pending = [sid for sid in spreadsheet_ids if sid not in _ARCHIVES]
+        if pending:
+            with ThreadPoolExecutor(
+                max_workers=min(len(pending), 4), thread_name_prefix="sheets-archive"
+            ) as executor:
+                loaded = executor.map(
+                    lambda sid: contextvars.copy_context().run(_load_archive, sid), pending
+                )
+                for spreadsheet_id, (frames, version) in zip(pending, loaded):
+                    if _has_data(frames):
+                        _ARCHIVES[spreadsheet_id] = frames
+                        _ARCHIVE_VERSIONS[spreadsheet_id] = version or compute_frames_version(
+                            frames
+                        )
+        loaded_ids = [sid for sid in spreadsheet_ids if sid in _ARCHIVES]
+        return [_ARCHIVES[sid] for sid in loaded_ids], [
+            _ARCHIVE_VERSIONS[sid] for sid in loaded_ids
+        ]
+
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def fetch_dashboard_frames() -> dict[str, pd.DataFrame]:
+    """Fetch all dashboard sheets, normalising missing data.
+
+    Returns a dict keyed by sheet name with pandas DataFrames. Any failures are
+    logged and replaced with empty frames so callers can degrade gracefully.
+    When the spreadsheet revision has not changed since the last load, the
+    already-parsed frames are reused instead of downloading the sheets again.
+
+    A freshly started process serves the last on-disk snapshot immediately and
+    refreshes from Google in the background (stale-while-revalidate).
+    """
+    with _STATE_LOCK:
+        fresh = _STATE["fresh"]
+    if not fresh:
+        snapshot = SNAPSHOT_STORE.load(SNAPSHOT_NAME)
+        if snapshot is not None:
+            frames, manifest = snapshot
+            LOGGER.info("Serving dashboard snapshot %s while revalidating", manifest.get("version"))
+            _revalidate_in_background()
+            return {**_empty_frames(), **frames}
+
+    return dict(_load_fresh_frames())
+
+
+@dataclass(frozen=True)
+class WorkbookBundle:
+    """Merged result of fetching the main and widow-support spreadsheets together.
+
+    With archive workbooks configured, ``frames`` is a MultiYearFrames view that
+    concatenates each ledger sheet across the years on first access.
+    """
+
+    frames: Mapping[str, pd.DataFrame]
+    widow_support: pd.DataFrame
+    durations: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    total_seconds: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        """True when both workbooks were fetched without error or timeout."""
+        return not self.errors
+
+
+def _timed(job):
+    """Wrap ``job`` so it returns ``(result, seconds)``."""
+
+    def _run():
+        started = time.perf_counter()
+        result = job()
+        return result, time.perf_counter() - started
+
+    return _run
+
+
+def fetch_all_workbooks(timeout: float | None = None, fresh: bool = False) -> WorkbookBundle:
+    """Fetch the dashboard (SPREADSHEET_ID) and widow-support (WIDOW_SPREADSHEET_ID)
+    workbooks concurrently.
+
+    Both fetches run on a small thread pool, so the total latency is that of the
+    slowest workbook instead of the sum. A fetch that fails or exceeds ``timeout``
+    seconds is reported in ``errors`` and replaced with empty frames.
+
+    With ``fresh`` the dashboard frames bypass the Streamlit cache and the on-disk
+    snapshot (they are still reused while the spreadsheet revision is unchanged).
+    Archive workbooks (``Config.ARCHIVE_SPREADSHEET_IDS``) are fetched alongside
+    until they are frozen; only the current workbook is ever refreshed.
+    """
+    timeout = Config.SHEETS_FETCH_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+
+    # Authorise once on the calling thread so the workers share one client
+    get_sheets_backend()
+
+    jobs = {
+        "dashboard": _load_fresh_frames if fresh else fetch_dashboard_frames,
+        "widow_support": read_widow_support_data,
+    }
+    if Config.ARCHIVE_SPREADSHEET_IDS:
+        jobs["archives"] = fetch_archives
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="sheets-fetch")
+    try:
+        # Each worker runs in a copy of the caller's context, so it keeps the
+        # caller's scheduler lane
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, _timed(job))
+            for name, job in jobs.items()
+        }
+        wait(futures.values(), timeout=timeout)
+    finally:
+        # Do not block on a fetch that timed out; it finishes in the background
+        executor.shutdown(wait=False)
+
+    results: dict[str, object] = {}
+    durations: dict[str, float] = {}
+    errors: dict[str, str] = {}
+    for name, future in futures.items():
+        if not future.done():
+            errors[name] = f"timed out after {timeout}s"
+            LOGGER.warning("Fetching %s workbook timed out after %ss", name, timeout)
+            continue
+        try:
+            results[name], durations[name] = future.result()
+        except Exception as exc:
+            errors[name] = str(exc)
+            LOGGER.error("Fetching %s workbook failed: %s", name, exc)
+
+    frames = results.get("dashboard")
+    if not isinstance(frames, dict):
+        frames = _empty_frames()
+    archives, archive_versions = results.get("archives") or ([], [])
+    if archives:
+        frames = MultiYearFrames(frames, archives, archive_versions)
+    widow_support = results.get("widow_support")
+    return WorkbookBundle(
+        frames=frames,
+        widow_support=(
+            widow_support if isinstance(widow_support, pd.DataFrame) else pd.DataFrame()
+        ),
+        durations=durations,
+        errors=errors,
+        total_seconds=time.perf_counter() - started,
+    )
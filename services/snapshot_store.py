@@ -0,0 +1,126 @@
+"""Persistent on-disk Parquet snapshots of the normalised dashboard frames."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any
+
+import pandas as pd
+
+try:  # Parquet support is optional - without pyarrow the store is disabled
+    import pyarrow  # noqa: F401
+
+    PARQUET_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    PARQUET_AVAILABLE = False
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+def compute_frames_version(frames: dict[str, pd.DataFrame]) -> str:
+    """Return a short content-derived version stamp for a dict of frames."""
+    digest = hashlib.sha1()
+    for name in sorted(frames):
+        frame = frames[name]
+        digest.update(name.encode("utf-8"))
+        digest.update(json.dumps([str(col) for col in frame.columns]).encode("utf-8"))
+        try:
+            digest.update(pd.util.hash_pandas_object(frame, index=False).values.tobytes())
+        except Exception:  # unhashable cells - fall back to a textual dump
+            digest.update(frame.to_csv(index=False).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class SnapshotStore:
+    """Write and read versioned Parquet snapshots of named frame sets.
+
+    Each snapshot lives in ``<directory>/<name>/`` as one Parquet file per frame
+    plus a ``manifest.json``. Frame files carry the version in their name and the
+    manifest is replaced last, so readers never see a half-written snapshot.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled and PARQUET_AVAILABLE
+
+    def _snapshot_dir(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def save(self, name: str, frames: dict[str, pd.DataFrame]) -> str | None:
+        """Persist ``frames`` under ``name`` and return the version stamp (None on failure)."""
+        if not self.enabled:
+            return None
+        version = compute_frames_version(frames)
+        snapshot_dir = self._snapshot_dir(name)
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            current = self.read_manifest(name)
+            if current and current.get("version") == version:
+                return version
+
+            files = {}
+            for sheet, frame in frames.items():
+                file_name = f"{sheet}-{version}.parquet"
+                tmp_path = os.path.join(snapshot_dir, f".{file_name}.tmp")
+                # Parquet needs string column labels
+                frame.rename(columns=str).to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, os.path.join(snapshot_dir, file_name))
+                files[sheet] = file_name
+
+            manifest = {"version": version, "saved_at": time.time(), "files": files}
+            tmp_manifest = os.path.join(snapshot_dir, f".{MANIFEST_NAME}.tmp")
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(tmp_manifest, os.path.join(snapshot_dir, MANIFEST_NAME))
+
+            self._remove_stale_files(snapshot_dir, set(files.values()))
+            LOGGER.info("Saved snapshot %s version %s", name, version)
+            return version
+        except Exception as exc:
+            LOGGER.warning("Could not save snapshot %s: %s", name, exc)
+            return None
+
+    def read_manifest(self, name: str) -> dict[str, Any] | None:
+        """Return the manifest of snapshot ``name`` or None if there is none."""
+        path = os.path.join(self._snapshot_dir(name), MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Ignoring unreadable snapshot manifest %s: %s", path, exc)
+            return None
+
+    def load(self, name: str) -> tuple[dict[str, pd.DataFrame], dict[str, Any]] | None:
+        """Return ``(frames, manifest)`` for snapshot ``name`` or None if unavailable."""
+        if not self.enabled:
+            return None
+        manifest = self.read_manifest(name)
+        if not manifest:
+            return None
+        snapshot_dir = self._snapshot_dir(name)
+        try:
+            frames = {
+                sheet: pd.read_parquet(os.path.join(snapshot_dir, file_name))
+                for sheet, file_name in manifest.get("files", {}).items()
+            }
+        except Exception as exc:
+            LOGGER.warning("Could not read snapshot %s: %s", name, exc)
+            return None
+        return frames, manifest
+
+    @staticmethod
+    def _remove_stale_files(snapshot_dir: str, keep: set[str]) -> None:
+        for file_name in os.listdir(snapshot_dir):
+            if file_name.endswith(".parquet") and file_name not in keep:
+                try:
+                    os.remove(os.path.join(snapshot_dir, file_name))
+                except OSError:
+                    pass
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Change detection for Google Sheets data
+Keeps the last-seen revision marker of each spreadsheet and reuses already-parsed
+results while the spreadsheet has not been edited
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class RevisionCache:
+    """Cache parsed results per (spreadsheet, key) and invalidate them by revision marker.
+
+    ``revision_getter`` is a cheap call returning an opaque marker (e.g. the Drive
+    ``version``/``modifiedTime``) for a spreadsheet id, or ``None`` when the marker
+    cannot be determined. Without a marker the loader always runs and nothing is cached.
+    """
+
+    def __init__(self, revision_getter: Callable[[str], Optional[str]]):
+        self._revision_getter = revision_getter
+        self._entries: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+        self._last_seen: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(
+        self,
+        spreadsheet_id: str,
+        key: str,
+        loader: Callable[[], Any],
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return the cached result for ``key`` if the spreadsheet is unchanged, else reload.
+
+        ``cacheable`` decides whether a freshly loaded result may be kept (e.g. to
+        avoid pinning an empty result produced by a failed fetch).
+        """
+        revision = self._revision_getter(spreadsheet_id)
+        self._record_check(spreadsheet_id, revision)
+
+        if revision is not None:
+            with self._lock:
+                entry = self._entries.get((spreadsheet_id, key))
+            if entry is not None and entry[0] == revision:
+                logging.info(f"Spreadsheet {spreadsheet_id} unchanged ({revision}); reusing {key}")
+                self._record_hit(spreadsheet_id)
+                return entry[1]
+
+        result = loader()
+        if revision is not None and (cacheable is None or cacheable(result)):
+            with self._lock:
+                self._entries[(spreadsheet_id, key)] = (revision, result)
+        return result
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None) -> None:
+        """Drop cached results for one spreadsheet, or for all of them."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._entries.clear()
+            else:
+                for entry_key in [k for k in self._entries if k[0] == spreadsheet_id]:
+                    del self._entries[entry_key]
+
+    def last_seen(self) -> Dict[str, Dict[str, Any]]:
+        """Return the last-seen revision marker and hit counters per spreadsheet."""
+        with self._lock:
+            return {sid: dict(info) for sid, info in self._last_seen.items()}
+
+    def _record_check(self, spreadsheet_id: str, revision: Optional[str]) -> None:
+        with self._lock:
+            info = self._last_seen.setdefault(spreadsheet_id, {"checks": 0, "hits": 0})
+            info["checks"] += 1
+            info["revision"] = revision
+            info["checked_at"] = time.time()
+
+    def _record_hit(self, spreadsheet_id: str) -> None:
+        with self._lock:
+            self._last_seen[spreadsheet_id]["hits"] += 1
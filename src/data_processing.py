@@ -3,7 +3,11 @@ import traceback
 from typing import Dict, List, Optional, Union
 
 import pandas as pd
-import streamlit as st
+
+from src.donor_index import DonorIndex, build_donor_index
+from src.projections import DEFAULT_HORIZON, project_support, widow_commitments
+from src.rollups import Rollups, build_rollups, labelled, month_label, monthly_totals
+from src.stats_cache import cached_by_version
 
 # Config import moved to avoid circular imports
 
@@ -28,7 +32,7 @@ def _get_name_column(df: pd.DataFrame) -> Optional[str]:
     return None
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
+@cached_by_version
 def calculate_monthly_averages(
     df: pd.DataFrame, value_column: str = "שקלים"
 ) -> Dict[str, Union[int, float]]:
@@ -36,26 +40,20 @@ def calculate_monthly_averages(
     if not isinstance(df, pd.DataFrame) or value_column not in df.columns or df.empty:
         return {"monthly_avg": 0, "min_monthly": 0, "max_monthly": 0, "total_months": 0}
     try:
-        # Group by month and calculate totals - ensure dates are properly converted
+        # Totals per integer month key (rows with invalid dates are left out)
         try:
-            df_copy = df.copy()
-            df_copy["תאריך"] = pd.to_datetime(df_copy["תאריך"], errors="coerce")
-            # Filter out rows with invalid dates
-            valid_df = df_copy.dropna(subset=["תאריך"])
-            if valid_df.empty:
+            totals = monthly_totals(df, value_column)
+            if totals.empty:
                 return {"monthly_avg": 0, "min_monthly": 0, "max_monthly": 0, "total_months": 0}
-            monthly_totals = valid_df.groupby(valid_df["תאריך"].dt.strftime("%Y-%m"))[
-                value_column
-            ].sum()
         except Exception as e:
             logging.warning(f"Could not calculate monthly totals: {e}")
             return {"monthly_avg": 0, "min_monthly": 0, "max_monthly": 0, "total_months": 0}
 
         # Calculate statistics
-        monthly_avg = monthly_totals.mean() if len(monthly_totals) > 0 else 0
-        min_monthly = monthly_totals.min() if len(monthly_totals) > 0 else 0
-        max_monthly = monthly_totals.max() if len(monthly_totals) > 0 else 0
-        total_months = len(monthly_totals)
+        monthly_avg = totals.mean()
+        min_monthly = totals.min()
+        max_monthly = totals.max()
+        total_months = len(totals)
 
         return {
             "monthly_avg": monthly_avg,
@@ -107,9 +105,63 @@ def calculate_total_support(df: pd.DataFrame, value_column: str = "סכום חו
         }
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
-def calculate_monthly_budget(expenses_df: pd.DataFrame, donations_df: pd.DataFrame) -> dict:
-    """Calculate monthly budget statistics"""
+def summarize_budget(
+    total_expenses: float,
+    total_donations: float,
+    monthly_expenses: Dict[str, float],
+    monthly_donations: Dict[str, float],
+) -> dict:
+    """Budget status of the given totals (the result of calculate_monthly_budget)"""
+    balance = total_donations - total_expenses
+
+    try:
+        utilization_percentage = (
+            (total_expenses / total_donations * 100) if total_donations > 0 else 0
+        )
+    except (ZeroDivisionError, TypeError):
+        utilization_percentage = 0
+
+    if balance >= 0:
+        if total_expenses == 0:
+            status = "מספק"
+        elif balance >= total_expenses * 0.2:
+            status = "מצוין"
+        elif balance >= total_expenses * 0.1:
+            status = "טוב"
+        else:
+            status = "מספק"
+    else:
+        denominator = total_donations if total_donations > 0 else 1
+        deficit_ratio = abs(balance) / denominator
+        if deficit_ratio > 0.2:
+            status = "קריטי"
+        elif deficit_ratio > 0.1:
+            status = "מדאיג"
+        else:
+            status = "טעון שיפור"
+
+    return {
+        "total_expenses": float(total_expenses),
+        "total_donations": float(total_donations),
+        "balance": float(balance),
+        "status": status,
+        "utilization_percentage": float(utilization_percentage),
+        "monthly_expenses": monthly_expenses,
+        "monthly_donations": monthly_donations,
+        "donation_trend": "increasing" if utilization_percentage < 80 else "stable",
+        "expense_trend": "stable",
+    }
+
+
+@cached_by_version
+def calculate_monthly_budget(
+    expenses_df: pd.DataFrame, donations_df: pd.DataFrame, rollups: Optional[Rollups] = None
+) -> dict:
+    """Calculate monthly budget statistics
+
+    Monthly totals come from ``rollups`` (the shared result of the data version)
+    when given, otherwise they are rolled up from the two frames.
+    """
     try:
         if not isinstance(expenses_df, pd.DataFrame) or not isinstance(donations_df, pd.DataFrame):
             raise ValueError("הנתונים חייבים להיות DataFrame")
@@ -117,98 +169,34 @@ def calculate_monthly_budget(expenses_df: pd.DataFrame, donations_df: pd.DataFra
         expense_amount_col = _get_amount_column(expenses_df)
         donation_amount_col = _get_amount_column(donations_df)
 
-        # Convert amount columns to numeric, handling mixed data types
-        if expense_amount_col:
-            expenses_df[expense_amount_col] = pd.to_numeric(
-                expenses_df[expense_amount_col], errors="coerce"
-            ).fillna(0)
-        if donation_amount_col:
-            donations_df[donation_amount_col] = pd.to_numeric(
-                donations_df[donation_amount_col], errors="coerce"
-            ).fillna(0)
-
-        total_expenses = expenses_df[expense_amount_col].sum() if expense_amount_col else 0
-        total_donations = donations_df[donation_amount_col].sum() if donation_amount_col else 0
-        balance = total_donations - total_expenses
+        # Convert amount columns to numeric, handling mixed data types (the frames are not modified)
+        total_expenses = (
+            pd.to_numeric(expenses_df[expense_amount_col], errors="coerce").fillna(0).sum()
+            if expense_amount_col
+            else 0
+        )
+        total_donations = (
+            pd.to_numeric(donations_df[donation_amount_col], errors="coerce").fillna(0).sum()
+            if donation_amount_col
+            else 0
+        )
 
         monthly_expenses = {}
         monthly_donations = {}
 
-        if expense_amount_col:
-            try:
-                expenses_df_copy = expenses_df.copy()
-                date_col = expenses_df_copy.columns[0]
-                expenses_df_copy["תאריך"] = pd.to_datetime(
-                    expenses_df_copy[date_col], errors="coerce"
-                )
-                valid_expenses = expenses_df_copy.dropna(subset=["תאריך"])
-                if not valid_expenses.empty:
-                    monthly_expenses = (
-                        valid_expenses.groupby(valid_expenses["תאריך"].dt.strftime("%Y-%m"))[
-                            expense_amount_col
-                        ]
-                        .sum()
-                        .to_dict()
-                    )
-            except Exception as exc:
-                logging.warning(f"Could not calculate monthly expenses: {exc}")
-
-        if donation_amount_col:
-            try:
-                donations_df_copy = donations_df.copy()
-                date_col = donations_df_copy.columns[0]
-                donations_df_copy["תאריך"] = pd.to_datetime(
-                    donations_df_copy[date_col], errors="coerce"
-                )
-                valid_donations = donations_df_copy.dropna(subset=["תאריך"])
-                if not valid_donations.empty:
-                    monthly_donations = (
-                        valid_donations.groupby(valid_donations["תאריך"].dt.strftime("%Y-%m"))[
-                            donation_amount_col
-                        ]
-                        .sum()
-                        .to_dict()
-                    )
-            except Exception as exc:
-                logging.warning(f"Could not calculate monthly donations: {exc}")
-
         try:
-            utilization_percentage = (
-                (total_expenses / total_donations * 100) if total_donations > 0 else 0
-            )
-        except (ZeroDivisionError, TypeError):
-            utilization_percentage = 0
-
-        if balance >= 0:
-            if total_expenses == 0:
-                status = "מספק"
-            elif balance >= total_expenses * 0.2:
-                status = "מצוין"
-            elif balance >= total_expenses * 0.1:
-                status = "טוב"
-            else:
-                status = "מספק"
-        else:
-            denominator = total_donations if total_donations > 0 else 1
-            deficit_ratio = abs(balance) / denominator
-            if deficit_ratio > 0.2:
-                status = "קריטי"
-            elif deficit_ratio > 0.1:
-                status = "מדאיג"
-            else:
-                status = "טעון שיפור"
-
-        return {
-            "total_expenses": float(total_expenses),
-            "total_donations": float(total_donations),
-            "balance": float(balance),
-            "status": status,
-            "utilization_percentage": float(utilization_percentage),
-            "monthly_expenses": monthly_expenses,
-            "monthly_donations": monthly_donations,
-            "donation_trend": "increasing" if utilization_percentage < 80 else "stable",
-            "expense_trend": "stable",
-        }
+            if rollups is None:
+                rollups = build_rollups(expenses_df, donations_df)
+            if expense_amount_col:
+                monthly_expenses = labelled(rollups.expenses)
+            if donation_amount_col:
+                monthly_donations = labelled(rollups.donations)
+        except Exception as exc:
+            logging.warning(f"Could not calculate monthly totals: {exc}")
+
+        return summarize_budget(
+            total_expenses, total_donations, monthly_expenses, monthly_donations
+        )
 
     except Exception as exc:
         logging.error(f"Error calculating monthly budget: {exc}")
@@ -226,11 +214,15 @@ def calculate_monthly_budget(expenses_df: pd.DataFrame, donations_df: pd.DataFra
         }
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
+@cached_by_version
 def calculate_donor_statistics(
-    df: pd.DataFrame, value_column: str = "שקלים"
+    df: pd.DataFrame, value_column: str = "שקלים", donor_index: Optional[DonorIndex] = None
 ) -> Dict[str, Union[int, float, List[Dict[str, Union[str, int, float]]]]]:
-    """Calculate donor statistics"""
+    """Calculate donor statistics
+
+    Per-donor figures come from ``donor_index`` (the index of the data version)
+    when given, otherwise the donors of ``df`` are indexed here.
+    """
     if not isinstance(df, pd.DataFrame) or df.empty:
         return {
             "total_donors": 0,
@@ -252,22 +244,16 @@ def calculate_donor_statistics(
             "top_donors": [],
         }
     try:
-        total_donors = df[name_col].nunique()
+        if donor_index is None:
+            donor_index = build_donor_index(df, amount_col, name_col)
+        total_donors = len(donor_index)
         total_donations = df[amount_col].sum()
         try:
             avg_donation = total_donations / total_donors if total_donors > 0 else 0
         except (ZeroDivisionError, TypeError):
             avg_donation = 0
 
-        top_donors_df = (
-            df.groupby(name_col)[amount_col]
-            .agg(["sum", "count"])
-            .sort_values("sum", ascending=False)
-            .head(10)
-            .reset_index()
-        )
-        top_donors_df.columns = ["name", "sum", "count"]
-        top_donors = top_donors_df.to_dict("records")
+        top_donors = donor_index.top_records(10)
 
         return {
             "total_donors": total_donors,
@@ -289,8 +275,13 @@ def calculate_donor_statistics(
         }
 
 
-def calculate_expense_statistics(df: pd.DataFrame, value_column: str = "שקלים") -> dict:
-    """Calculate expense statistics with detailed analysis"""
+def calculate_expense_statistics(
+    df: pd.DataFrame, value_column: str = "שקלים", rollups: Optional[Rollups] = None
+) -> dict:
+    """Calculate expense statistics with detailed analysis
+
+    Pass ``rollups`` only when ``df`` is the full Expenses ledger of that data version.
+    """
     if not isinstance(df, pd.DataFrame) or value_column not in df.columns or df.empty:
         return {
             "total_expenses": 0,
@@ -312,17 +303,17 @@ def calculate_expense_statistics(df: pd.DataFrame, value_column: str = "שקלי
         name_col = "שם" if "שם" in df.columns else df.columns[1] if len(df.columns) > 1 else "שם"
         if name_col in df.columns:
             expense_categories = (
-                df.groupby(name_col)[value_column].sum().sort_values(ascending=False)
+                df.groupby(name_col, observed=True)[value_column].sum().sort_values(ascending=False)
             )
             expense_categories = expense_categories.to_dict()
         else:
             expense_categories = {}
 
         # Monthly expenses
-        if "תאריך" in df.columns:
-            df["תאריך"] = pd.to_datetime(df["תאריך"], format="%d.%m.%Y", errors="coerce")
-            monthly_expenses = df.groupby(df["תאריך"].dt.strftime("%Y-%m"))[value_column].sum()
-            monthly_expenses = monthly_expenses.to_dict()
+        if rollups is not None:
+            monthly_expenses = labelled(rollups.expenses)
+        elif "תאריך" in df.columns:
+            monthly_expenses = labelled(monthly_totals(df, value_column, sheet="Expenses"))
         else:
             monthly_expenses = {}
 
@@ -346,7 +337,7 @@ def calculate_expense_statistics(df: pd.DataFrame, value_column: str = "שקלי
         }
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
+@cached_by_version
 def calculate_widow_statistics(df: pd.DataFrame, value_column: str = "סכום חודשי") -> dict:
     """Calculate widow statistics with detailed analysis"""
     if not isinstance(df, pd.DataFrame) or df.empty:
@@ -414,7 +405,9 @@ def calculate_widow_statistics(df: pd.DataFrame, value_column: str = "סכום 
                 df_copy = df.copy()
                 df_copy[value_column] = numeric_values
                 support_distribution = (
-                    df_copy.groupby("שם ")[value_column].sum().sort_values(ascending=False)
+                    df_copy.groupby("שם ", observed=True)[value_column]
+                    .sum()
+                    .sort_values(ascending=False)
                 )
                 support_distribution = support_distribution.to_dict()
             except Exception as e:
@@ -425,9 +418,9 @@ def calculate_widow_statistics(df: pd.DataFrame, value_column: str = "סכום 
 
         # Monthly support
         if "חודש התחלה" in df.columns:
-            df["חודש התחלה"] = pd.to_datetime(df["חודש התחלה"], format="%d.%m.%Y", errors="coerce")
-            monthly_support = df.groupby(df["חודש התחלה"].dt.strftime("%Y-%m"))[value_column].sum()
-            monthly_support = monthly_support.to_dict()
+            monthly_support = labelled(
+                monthly_totals(df, value_column, "חודש התחלה", sheet="Widows")
+            )
         else:
             monthly_support = {}
 
@@ -451,8 +444,13 @@ def calculate_widow_statistics(df: pd.DataFrame, value_column: str = "סכום 
         }
 
 
-def calculate_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFrame) -> dict:
-    """Calculate monthly trends for expenses and donations"""
+def calculate_monthly_trends(
+    expenses_df: pd.DataFrame, donations_df: pd.DataFrame, rollups: Optional[Rollups] = None
+) -> dict:
+    """Calculate monthly trends for expenses and donations
+
+    Monthly totals come from ``rollups`` when given, otherwise from the two frames.
+    """
     try:
         if not isinstance(expenses_df, pd.DataFrame) or not isinstance(donations_df, pd.DataFrame):
             raise ValueError("הנתונים חייבים להיות DataFrame")
@@ -462,13 +460,11 @@ def calculate_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFra
         donation_amount_col = _get_amount_column(donations_df)
 
         if "תאריך" in expenses_df.columns and expense_amount_col:
-            expenses_df = expenses_df.copy()
-            expenses_df["תאריך"] = pd.to_datetime(
-                expenses_df["תאריך"], format="%d.%m.%Y", errors="coerce"
-            )
-            monthly_expenses = expenses_df.groupby(expenses_df["תאריך"].dt.strftime("%Y-%m"))[
-                expense_amount_col
-            ].sum()
+            if rollups is not None:
+                monthly_expenses = rollups.expenses
+            else:
+                monthly_expenses = monthly_totals(expenses_df, expense_amount_col, sheet="Expenses")
+            monthly_expenses = pd.Series(labelled(monthly_expenses), dtype=float)
 
             # Calculate trend and change
             if len(monthly_expenses) > 1:
@@ -494,13 +490,13 @@ def calculate_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFra
 
         # Calculate monthly trends for donations
         if "תאריך" in donations_df.columns and donation_amount_col:
-            donations_df = donations_df.copy()
-            donations_df["תאריך"] = pd.to_datetime(
-                donations_df["תאריך"], format="%d.%m.%Y", errors="coerce"
-            )
-            monthly_donations = donations_df.groupby(donations_df["תאריך"].dt.strftime("%Y-%m"))[
-                donation_amount_col
-            ].sum()
+            if rollups is not None:
+                monthly_donations = rollups.donations
+            else:
+                monthly_donations = monthly_totals(
+                    donations_df, donation_amount_col, sheet="Donations"
+                )
+            monthly_donations = pd.Series(labelled(monthly_donations), dtype=float)
 
             # Calculate trend and change
             if len(monthly_donations) > 1:
@@ -577,14 +573,26 @@ def determine_trend(percentage_change: float) -> str:
         return "יציב"
 
 
-def calculate_36_month_budget(widows_df: pd.DataFrame, current_support: float) -> dict:
-    """Calculate 36-month budget projection with detailed analysis"""
+def calculate_36_month_budget(
+    widows_df: pd.DataFrame,
+    current_support: float,
+    widow_support_df: Optional[pd.DataFrame] = None,
+    horizon: int = DEFAULT_HORIZON,
+) -> dict:
+    """Calculate 36-month budget projection with detailed analysis
+
+    Each widow's support counts from her start month ("חודש התחלה") until the end
+    of her donor commitment ("עד מתי תחת תורם" in ``widow_support_df``), month by
+    month over ``horizon`` months, against ``current_support`` per month.
+    """
     try:
-        # Calculate total required support
-        total_required = current_support * 36
+        projection = project_support(
+            widow_commitments(widows_df, widow_support_df), horizon, donations=current_support
+        )
 
-        # Calculate current support for 36 months
-        support_36_months = widows_df["סכום חודשי"].sum() * 36
+        # Projected donations and committed support over the horizon
+        total_required = float(projection["donations"].sum())
+        support_36_months = float(projection["required"].sum())
 
         # Calculate difference and percentage
         diff = support_36_months - total_required
@@ -593,24 +601,17 @@ def calculate_36_month_budget(widows_df: pd.DataFrame, current_support: float) -
         )
 
         # Calculate monthly breakdown
-        monthly_breakdown = []
-        if "חודש התחלה" in widows_df.columns:
-            widows_df["חודש התחלה"] = pd.to_datetime(
-                widows_df["חודש התחלה"], format="%d.%m.%Y", errors="coerce"
-            )
-            monthly_support = widows_df.groupby(widows_df["חודש התחלה"].dt.strftime("%Y-%m"))[
-                "סכום חודשי"
-            ].sum()
-
-            for month, amount in monthly_support.items():
-                monthly_breakdown.append(
-                    {
-                        "month": month,
-                        "amount": amount,
-                        "required": current_support,
-                        "difference": amount - current_support,
-                    }
-                )
+        monthly_breakdown = [
+            {
+                "month": month_label(int(month)),
+                "amount": row.required,
+                "required": row.donations,
+                "difference": -row.surplus,
+                "active": int(row.active),
+                "expiring": int(row.expiring),
+            }
+            for month, row in zip(projection.index, projection.itertuples())
+        ]
 
         return {
             "support_36_months": support_36_months,
@@ -1,13 +1,30 @@
 import logging
+from typing import Optional
 
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from src.donor_index import DonorIndex, build_donor_index
+from src.rollups import Rollups, build_rollups, month_label
 
-def create_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFrame):
-    """Create monthly trends chart for expenses and donations"""
+
+def _month_frame(totals: pd.Series) -> pd.DataFrame:
+    """Month totals as a frame with "חודש" ("YYYY-MM") and "שקלים" columns."""
+    return pd.DataFrame(
+        {"חודש": [month_label(int(key)) for key in totals.index], "שקלים": totals.to_numpy()}
+    )
+
+
+def create_monthly_trends(
+    expenses_df: pd.DataFrame, donations_df: pd.DataFrame, rollups: Optional[Rollups] = None
+):
+    """Create monthly trends chart for expenses and donations
+
+    Reads the monthly totals from ``rollups`` when given (the shared result of the
+    data version), otherwise rolls them up from the two frames.
+    """
     try:
         if not isinstance(expenses_df, pd.DataFrame) or not isinstance(donations_df, pd.DataFrame):
             st.error("הנתונים חייבים להיות DataFrame")
@@ -21,19 +38,11 @@ def create_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFrame)
             st.error("עמודות 'תאריך' ו'שקלים' חסרות בנתוני התרומות")
             return None
 
-        # Process expenses data
-        expenses_df["תאריך"] = pd.to_datetime(expenses_df["תאריך"], errors="coerce")
-        expenses_df = expenses_df.dropna(subset=["תאריך"])
-        expenses_df["חודש"] = expenses_df["תאריך"].dt.to_period("M")
-        monthly_expenses = expenses_df.groupby("חודש")["שקלים"].sum().reset_index()
-        monthly_expenses["חודש"] = monthly_expenses["חודש"].astype(str)
-
-        # Process donations data
-        donations_df["תאריך"] = pd.to_datetime(donations_df["תאריך"], errors="coerce")
-        donations_df = donations_df.dropna(subset=["תאריך"])
-        donations_df["חודש"] = donations_df["תאריך"].dt.to_period("M")
-        monthly_donations = donations_df.groupby("חודש")["שקלים"].sum().reset_index()
-        monthly_donations["חודש"] = monthly_donations["חודש"].astype(str)
+        # Monthly totals per integer month key, labelled "YYYY-MM" for the x axis
+        if rollups is None:
+            rollups = build_rollups(expenses_df, donations_df)
+        monthly_expenses = _month_frame(rollups.expenses)
+        monthly_donations = _month_frame(rollups.donations)
 
         # Create the chart
         fig = go.Figure()
@@ -81,6 +90,135 @@ def create_monthly_trends(expenses_df: pd.DataFrame, donations_df: pd.DataFrame)
         return None
 
 
+def create_support_projection_chart(projection: pd.DataFrame):
+    """Create the widow support projection chart
+
+    ``projection`` is the month-by-month result of projections.project_support.
+    """
+    try:
+        if not isinstance(projection, pd.DataFrame) or projection.empty:
+            return None
+        months = [month_label(int(key)) for key in projection.index]
+
+        fig = go.Figure()
+
+        # Required support per month
+        fig.add_trace(
+            go.Bar(x=months, y=projection["required"], name="תמיכה נדרשת", marker_color="#3498db")
+        )
+
+        # Commitments ending per month
+        fig.add_trace(
+            go.Bar(
+                x=months,
+                y=projection["expiring_amount"],
+                name="התחייבויות מסתיימות",
+                marker_color="#e67e22",
+            )
+        )
+
+        # Projected donations
+        if projection["donations"].notna().any():
+            fig.add_trace(
+                go.Scatter(
+                    x=months,
+                    y=projection["donations"],
+                    mode="lines",
+                    name="תרומות צפויות",
+                    line=dict(color="#27ae60", width=3),
+                )
+            )
+
+        fig.update_layout(
+            title="תחזית תמיכה באלמנות",
+            xaxis_title="חודש",
+            yaxis_title="שקלים",
+            hovermode="x unified",
+            template="plotly_white",
+            font=dict(family="Arial", size=12),
+            height=400,
+        )
+
+        return fig
+
+    except Exception as e:
+        logging.error(f"Error creating support projection chart: {e}")
+        st.error(f"שגיאה ביצירת תחזית התמיכה: {e}")
+        return None
+
+
+def create_runway_chart(result):
+    """Create the simulated balance chart
+
+    ``result`` is the runway.RunwayResult of the budget simulation.
+    """
+    try:
+        if result is None or result.months.empty:
+            return None
+        months = [month_label(int(key)) for key in result.months.index]
+
+        fig = go.Figure()
+
+        # Balance band between the 5th and 95th percentile
+        fig.add_trace(
+            go.Scatter(
+                x=months, y=result.months["p95"], mode="lines", line=dict(width=0), showlegend=False
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=months,
+                y=result.months["p5"],
+                mode="lines",
+                fill="tonexty",
+                fillcolor="rgba(52, 152, 219, 0.2)",
+                line=dict(width=0),
+                name="יתרה 5%-95%",
+            )
+        )
+
+        # Median balance
+        fig.add_trace(
+            go.Scatter(
+                x=months,
+                y=result.months["p50"],
+                mode="lines",
+                name="יתרה חציונית",
+                line=dict(color="#3498db", width=3),
+            )
+        )
+
+        # Probability of having run out by each month
+        fig.add_trace(
+            go.Scatter(
+                x=months,
+                y=result.months["ran_out"] * 100,
+                mode="lines",
+                name="סיכוי לגירעון (%)",
+                line=dict(color="#e74c3c", width=2, dash="dot"),
+                yaxis="y2",
+            )
+        )
+
+        fig.update_layout(
+            title="סימולציית יתרה",
+            xaxis_title="חודש",
+            yaxis_title="שקלים",
+            yaxis2=dict(title="%", overlaying="y", side="right", range=[0, 100]),
+            hovermode="x unified",
+            template="plotly_white",
+            font=dict(family="Arial", size=12),
+            height=400,
+        )
+
+        return fig
+
+    except Exception as e:
+        logging.error(f"Error creating runway chart: {e}")
+        st.error(f"שגיאה ביצירת סימולציית היתרה: {e}")
+        return None
+
+
 def create_budget_distribution_chart(df: pd.DataFrame):
     """Create budget distribution pie chart"""
     try:
@@ -102,7 +240,7 @@ def create_budget_distribution_chart(df: pd.DataFrame):
         # If we have a category column, use it
         if "קטגוריה" in df.columns:
             # Group by category and sum amounts
-            category_totals = df.groupby("קטגוריה")[amount_col].sum().reset_index()
+            category_totals = df.groupby("קטגוריה", observed=True)[amount_col].sum().reset_index()
             names_col = "קטגוריה"
             title = "התפלגות הוצאות לפי קטגוריה"
         else:
@@ -118,7 +256,7 @@ def create_budget_distribution_chart(df: pd.DataFrame):
                 return None
 
             # Group by name and sum amounts
-            category_totals = df.groupby(name_col)[amount_col].sum().reset_index()
+            category_totals = df.groupby(name_col, observed=True)[amount_col].sum().reset_index()
             names_col = name_col
             title = "התפלגות הוצאות לפי ספק/לקוח"
 
@@ -192,8 +330,13 @@ def create_widows_support_chart(df: pd.DataFrame):
         return None
 
 
-def create_donor_contribution_chart(donations_df: pd.DataFrame):
-    """Create donor contribution chart"""
+def create_donor_contribution_chart(
+    donations_df: pd.DataFrame, donor_index: Optional[DonorIndex] = None
+):
+    """Create donor contribution chart
+
+    The top donors come from ``donor_index`` when given (the index of the data version).
+    """
     try:
         if not isinstance(donations_df, pd.DataFrame):
             st.error("הנתונים חייבים להיות DataFrame")
@@ -203,9 +346,11 @@ def create_donor_contribution_chart(donations_df: pd.DataFrame):
             st.error("עמודות 'שם' ו'שקלים' חסרות")
             return None
 
-        # Group by donor and sum amounts
-        donor_totals = donations_df.groupby("שם")["שקלים"].sum().reset_index()
-        donor_totals = donor_totals.sort_values("שקלים", ascending=False).head(10)
+        # Top donors by total amount
+        if donor_index is None:
+            donor_index = build_donor_index(donations_df, "שקלים", "שם")
+        donor_totals = donor_index.top(10)[["name", "sum"]]
+        donor_totals.columns = ["שם", "שקלים"]
 
         # Create bar chart
         fig = px.bar(
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Date parsing service for Omri Association Dashboard
+Detects the date format of each (sheet, column) once from a sample, caches it
+and parses with that explicit format; only cells that fail it fall back to the
+other known formats and, last, to element-wise day-first parsing
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Explicit day-first formats used in the workbooks, in order of preference
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d", "%d.%m.%y", "%d/%m/%y", "%Y-%m-%d %H:%M:%S")
+
+# Origin of spreadsheet serial dates (UNFORMATTED_VALUE / SERIAL_NUMBER reads)
+SERIAL_DATE_ORIGIN = pd.Timestamp("1899-12-30")
+
+# Number of distinct values used to detect the format of a column
+SAMPLE_SIZE = 64
+
+# A cached format is re-detected when it parses less than this share of a column
+REDETECT_BELOW = 0.5
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _sample(text: pd.Series, size: int) -> pd.Series:
+    """Up to ``size`` values spread evenly over ``text``."""
+    if len(text) <= size:
+        return text
+    return text.iloc[np.linspace(0, len(text) - 1, size).astype(int)]
+
+
+def detect_format(
+    text: pd.Series, formats: Sequence[str] = DATE_FORMATS, sample_size: int = SAMPLE_SIZE
+) -> Optional[str]:
+    """Return the format in ``formats`` that parses most of a sample of ``text``.
+
+    Ties go to the earlier format; returns None if no format parses any value.
+    """
+    sample = _sample(text, sample_size)
+    best, best_hits = None, 0
+    for fmt in formats:
+        hits = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+            if hits == len(sample):
+                break
+    return best
+
+
+class DateFormatCache:
+    """Detected date format per ``(sheet, column)``."""
+
+    def __init__(self):
+        self._formats: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+        self.detections = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            return self._formats.get(key)
+
+    def set(self, key: Tuple[str, str], fmt: Optional[str]) -> None:
+        with self._lock:
+            self.detections += 1
+            if fmt is None:
+                self._formats.pop(key, None)
+            else:
+                self._formats[key] = fmt
+
+    def invalidate(self, sheet: Optional[str] = None) -> None:
+        """Forget the formats of one sheet, or of all sheets."""
+        with self._lock:
+            if sheet is None:
+                self._formats.clear()
+            else:
+                for key in [k for k in self._formats if k[0] == sheet]:
+                    del self._formats[key]
+
+    def formats(self) -> Dict[Tuple[str, str], str]:
+        """Return a copy of the cached formats."""
+        with self._lock:
+            return dict(self._formats)
+
+
+# Shared by every caller that names its sheet and column
+FORMAT_CACHE = DateFormatCache()
+
+
+def _from_serials(serials: np.ndarray) -> np.ndarray:
+    """Convert spreadsheet serial numbers (days since 1899-12-30) to datetime64[ns]."""
+    return pd.to_datetime(serials, unit="D", origin=SERIAL_DATE_ORIGIN).to_numpy("M8[ns]")
+
+
+def _parse_distinct(
+    values: pd.Series,
+    key: Optional[Tuple[str, str]],
+    formats: Sequence[str],
+    cache: DateFormatCache,
+) -> np.ndarray:
+    """Parse distinct cell values (strings, serial numbers or missing) to datetime64[ns]."""
+    result = np.full(len(values), np.datetime64("NaT", "ns"))
+    numbers = values.map(_is_number).to_numpy(dtype=bool)
+    if numbers.any():
+        result[numbers] = _from_serials(values[numbers].to_numpy(dtype="float64"))
+    text = values.astype(str).str.strip()
+    pending = (text != "").to_numpy() & ~numbers & values.notna().to_numpy()
+    if not pending.any():
+        return result
+
+    fmt = cache.get(key) if key else None
+    if fmt is None:
+        fmt = detect_format(text[pending], formats)
+        if key:
+            cache.set(key, fmt)
+    ordered = ([fmt] if fmt else []) + [f for f in formats if f != fmt]
+
+    total = int(pending.sum())
+    for position, candidate in enumerate(ordered):
+        parsed = pd.to_datetime(text[pending], format=candidate, errors="coerce").to_numpy("M8[ns]")
+        result[pending] = parsed
+        if position == 0 and key and fmt and np.isnat(parsed).sum() > total * REDETECT_BELOW:
+            # The sheet's format changed - detect it again for the next parse
+            logging.info(f"Date format {fmt} no longer fits {key}, re-detecting")
+            cache.set(key, detect_format(text[pending], formats))
+        pending[pending] = np.isnat(parsed)
+        if not pending.any():
+            return result
+    # Last resort for free-form cells: element-wise, day first
+    result[pending] = pd.to_datetime(
+        text[pending], errors="coerce", dayfirst=True, format="mixed"
+    ).to_numpy("M8[ns]")
+    return result
+
+
+def parse_dates(
+    series: pd.Series,
+    sheet: Optional[str] = None,
+    column: Optional[str] = None,
+    formats: Sequence[str] = DATE_FORMATS,
+    cache: DateFormatCache = FORMAT_CACHE,
+) -> pd.Series:
+    """Parse date cells with an explicit, detected day-first format.
+
+    Columns that are already datetime64 are returned unchanged. Numeric cells
+    are serial dates (typed reads). The format of ``(sheet, column)`` is detected
+    from a sample on first use and cached; without a sheet name it is detected
+    on every call. Each distinct value is parsed once.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    key = (sheet, column if column is not None else str(series.name)) if sheet else None
+    codes, uniques = pd.factorize(series)
+    parsed = _parse_distinct(pd.Series(uniques, dtype=object), key, formats, cache)
+    # Code -1 (missing cell) picks the trailing NaT
+    parsed = np.append(parsed, np.datetime64("NaT", "ns"))[codes]
+    return pd.Series(parsed, index=series.index, name=series.name, dtype="datetime64[ns]")
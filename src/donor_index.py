@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Donor index for Omri Association Dashboard
+Factorizes the donor names of the Donations sheet once into integer codes and
+keeps the sum, count and first and last donation date of every donor in
+contiguous arrays; statistics, charts and reports read rankings and per-donor
+figures from it instead of grouping on the name strings again
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.date_parsing import parse_dates
+from src.rollups import amount_column_of
+from src.sheet_schemas import parse_amounts
+
+DONOR_NAME_COLUMNS = ("שם", "שם התורם", "שם לקוח")
+
+
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` largest values, largest first.
+
+    Uses a partial selection instead of sorting everything; ties keep the lower
+    position first, like a stable descending sort.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    threshold = np.partition(values, len(values) - k)[len(values) - k]
+    candidates = np.flatnonzero(values >= threshold)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order][:k]
+
+
+@dataclass(frozen=True)
+class DonorIndex:
+    """Per-donor totals of one Donations frame; donor ``i`` is ``names[i]``.
+
+    Names are sorted, so codes follow the order a groupby on the names would
+    give. Rows without a name are left out; dates are NaT when unknown.
+    """
+
+    names: pd.Index
+    sums: np.ndarray
+    counts: np.ndarray
+    first_dates: np.ndarray
+    last_dates: np.ndarray
+    version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def total(self) -> float:
+        return float(self.sums.sum())
+
+    def top(self, n: int = 10) -> pd.DataFrame:
+        """The ``n`` largest donors: name, sum and count, largest first."""
+        return self.frame(top_k(self.sums, n))
+
+    def ranking(self) -> pd.Series:
+        """Sum per donor name, largest first (all donors)."""
+        order = np.lexsort((np.arange(len(self)), -self.sums))
+        return pd.Series(self.sums[order], index=self.names[order], name="sum")
+
+    def frame(self, codes: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Donors ``codes`` (all by default) as a DataFrame."""
+        codes = np.arange(len(self)) if codes is None else codes
+        return pd.DataFrame(
+            {
+                "name": self.names[codes],
+                "sum": self.sums[codes],
+                "count": self.counts[codes],
+                "first_date": self.first_dates[codes],
+                "last_date": self.last_dates[codes],
+            }
+        )
+
+    def lookup(self, name: Any) -> Optional[Dict[str, Any]]:
+        """Sum, count and first and last date of one donor, or None if unknown."""
+        code = self.names.get_indexer([name])[0]
+        if code < 0:
+            return None
+        return {
+            "name": self.names[code],
+            "sum": float(self.sums[code]),
+            "count": int(self.counts[code]),
+            "first_date": pd.Timestamp(self.first_dates[code]),
+            "last_date": pd.Timestamp(self.last_dates[code]),
+        }
+
+    def top_records(self, n: int = 10) -> List[Dict[str, Any]]:
+        """``top_donors`` records of calculate_donor_statistics."""
+        return self.top(n)[["name", "sum", "count"]].to_dict("records")
+
+
+def _empty_index(version: Optional[str]) -> DonorIndex:
+    return DonorIndex(
+        names=pd.Index([], dtype=object),
+        sums=np.empty(0),
+        counts=np.empty(0, dtype=np.int64),
+        first_dates=np.empty(0, dtype="datetime64[ns]"),
+        last_dates=np.empty(0, dtype="datetime64[ns]"),
+        version=version,
+    )
+
+
+def build_donor_index(
+    df: Optional[pd.DataFrame],
+    value_column: Optional[str] = None,
+    name_column: Optional[str] = None,
+    date_column: str = "תאריך",
+    version: Optional[str] = None,
+) -> DonorIndex:
+    """Index the donors of a Donations frame (empty when it has no name or amount)."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return _empty_index(version)
+    if value_column is None or value_column not in df.columns:
+        value_column = amount_column_of(df)
+    if name_column is None:
+        name_column = next((c for c in DONOR_NAME_COLUMNS if c in df.columns), None)
+    if value_column is None or name_column is None:
+        return _empty_index(version)
+
+    codes, names = pd.factorize(df[name_column], sort=True)
+    named = codes >= 0
+    codes = codes[named]
+    size = len(names)
+    values = parse_amounts(df[value_column]).to_numpy(dtype=float)[named]
+    sums = np.bincount(codes, weights=values, minlength=size)
+    counts = np.bincount(codes, minlength=size).astype(np.int64)
+
+    nat = np.iinfo(np.int64).min
+    first = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(size, nat, dtype=np.int64)
+    if date_column in df.columns:
+        dates = parse_dates(df[date_column], sheet="Donations", column=date_column)
+        stamps = dates.to_numpy(dtype="datetime64[ns]")[named].view(np.int64)
+        dated = stamps != nat
+        np.minimum.at(first, codes[dated], stamps[dated])
+        np.maximum.at(last, codes[dated], stamps[dated])
+    first[first == np.iinfo(np.int64).max] = nat
+
+    return DonorIndex(
+        names=pd.Index(names, dtype=object),
+        sums=sums,
+        counts=counts,
+        first_dates=first.view("datetime64[ns]"),
+        last_dates=last.view("datetime64[ns]"),
+        version=version,
+    )
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Memory compaction of loaded frames for Omri Association Dashboard
+Right after ingestion, repeated names become categoricals, other text becomes
+Arrow-backed strings, amounts keep one fixed float64 dtype and counts become
+small integers; memory_report() compares bytes per frame and column
+"""
+
+import logging
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Text columns whose distinct values are at most this share of the rows
+# (donor and vendor names) are stored as categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Columns holding small non-negative counts
+COUNT_COLUMNS = ("מספר ילדים", "כמה ילדים")
+
+# Arrow-backed strings with NaN as missing value, so comparisons still return
+# plain bool masks (pandas >= 2.3; "string[pyarrow_numpy]" on pandas 2.2)
+try:
+    ARROW_STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+except TypeError:  # pragma: no cover - pandas 2.2
+    ARROW_STRING_DTYPE = pd.StringDtype("pyarrow_numpy")
+
+
+def _compact_counts(series: pd.Series) -> pd.Series:
+    """Counts as the smallest nullable integer dtype that holds them."""
+    numbers = pd.to_numeric(series, errors="coerce")
+    valid = numbers.dropna()
+    if not (valid == valid.round()).all():
+        return series
+    if valid.empty or (valid.min() >= 0 and valid.max() <= np.iinfo(np.uint8).max):
+        return numbers.astype("UInt8")
+    return numbers.astype("Int32")
+
+
+def _compact_column(name: str, series: pd.Series) -> pd.Series:
+    """Return ``series`` in its most compact equivalent dtype."""
+    if name in COUNT_COLUMNS:
+        return _compact_counts(series)
+    if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        # datetime64, float64 amounts, bool and categoricals stay as they are
+        return series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+        return series  # mixed cells (e.g. numbers and text) are left alone
+    non_missing = series.count()
+    if non_missing and series.nunique() <= non_missing * CATEGORY_MAX_UNIQUE_RATIO:
+        return series.astype("category")
+    return series.astype(ARROW_STRING_DTYPE)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a compacted copy of ``df`` (same values, smaller dtypes)."""
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+    compacted = {}
+    for position, name in enumerate(df.columns):
+        column = df.iloc[:, position]
+        try:
+            compacted[position] = _compact_column(str(name), column)
+        except Exception as e:
+            logging.warning(f"Could not compact column '{name}': {e}")
+            compacted[position] = column
+    result = pd.DataFrame(compacted, index=df.index)
+    result.columns = df.columns
+    return result
+
+
+def compact_frames(frames: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Compact every frame of a ``{sheet: DataFrame}`` dict."""
+    return {name: compact_frame(frame) for name, frame in frames.items()}
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Deep memory footprint of ``df`` in bytes (index included)."""
+    return int(df.memory_usage(deep=True).sum()) if isinstance(df, pd.DataFrame) else 0
+
+
+def memory_report(
+    before: Dict[str, pd.DataFrame], after: Dict[str, pd.DataFrame]
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Compare memory use before and after compaction.
+
+    Returns a per-frame summary and a per-column breakdown, both with
+    ``bytes_before``, ``bytes_after`` and ``saved_pct`` columns.
+    """
+    frame_rows = []
+    column_rows = []
+    for name, original in before.items():
+        compacted = after.get(name, original)
+        if not isinstance(original, pd.DataFrame):
+            continue
+        frame_rows.append(
+            {
+                "frame": name,
+                "rows": len(original),
+                "bytes_before": frame_bytes(original),
+                "bytes_after": frame_bytes(compacted),
+            }
+        )
+        usage_before = original.memory_usage(deep=True, index=False)
+        usage_after = compacted.memory_usage(deep=True, index=False)
+        for position, column in enumerate(original.columns):
+            column_rows.append(
+                {
+                    "frame": name,
+                    "column": str(column),
+                    "dtype_before": str(original.dtypes.iloc[position]),
+                    "dtype_after": str(compacted.dtypes.iloc[position]),
+                    "bytes_before": int(usage_before.iloc[position]),
+                    "bytes_after": int(usage_after.iloc[position]),
+                }
+            )
+    frames = pd.DataFrame(frame_rows, columns=["frame", "rows", "bytes_before", "bytes_after"])
+    columns = pd.DataFrame(
+        column_rows,
+        columns=["frame", "column", "dtype_before", "dtype_after", "bytes_before", "bytes_after"],
+    )
+    for report in (frames, columns):
+        report["saved_pct"] = (
+            (1 - report["bytes_after"] / report["bytes_before"].where(report["bytes_before"] > 0))
+            .mul(100)
+            .round(1)
+            .fillna(0.0)
+        )
+    return frames, columns
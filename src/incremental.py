@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Incremental aggregates for Omri Association Dashboard
+Diffs each newly loaded dataset version against the previous one into
+inserted, updated and deleted rows and maintains the monthly, donor and widow
+support totals by applying those deltas, so a refresh only aggregates the rows
+that changed; closed months stay frozen: a change that touches one is never
+patched in, the sheet's totals are rebuilt from scratch instead
+"""
+
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import summarize_budget
+from src.date_parsing import parse_dates
+from src.donor_index import DONOR_NAME_COLUMNS, DonorIndex, top_k
+from src.multi_year import LEDGER_SHEETS, MultiYearFrames, concat_years
+from src.rollups import (
+    Rollups,
+    amount_column_of,
+    date_column_of,
+    labelled,
+    month_label,
+)
+from src.sheet_schemas import parse_amounts
+
+# Sheets whose totals are maintained incrementally
+AGGREGATED_SHEETS = ("Expenses", "Donations", "Widows")
+
+WIDOW_VALUE_COLUMNS = ("סכום חודשי", "כמה מקבלת בכל חודש", "סכום", "שקלים")
+
+# Mixes the occurrence number of duplicate rows into their hash
+_OCCURRENCE_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit content hash of every row of ``df`` (the index is ignored)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy(copy=True)
+
+
+def _row_keys(df: pd.DataFrame) -> np.ndarray:
+    """Row hashes made unique per copy: the n-th identical row gets its own key."""
+    hashes = row_hashes(df)
+    repeated = pd.Series(hashes).duplicated().to_numpy()
+    if repeated.any():
+        copies = hashes[repeated]
+        occurrence = pd.Series(copies).groupby(copies).cumcount().to_numpy(dtype=np.uint64) + 1
+        hashes[repeated] += occurrence * _OCCURRENCE_MIX
+    return hashes
+
+
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    parts = [frame for frame in frames if len(frame)]
+    return pd.concat(parts) if len(parts) > 1 else (parts or frames)[0]
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """Rows of one sheet that changed between two dataset versions.
+
+    ``updated`` holds the new contents of rows edited in place and ``previous``
+    their old contents. Rows are matched by content, so rows that only moved
+    (e.g. after a deletion above them) are not changes; a changed row is an
+    update when it took the place of a changed old row.
+    """
+
+    inserted: pd.DataFrame
+    updated: pd.DataFrame
+    previous: pd.DataFrame
+    deleted: pd.DataFrame
+    keys: Optional[np.ndarray] = None  # row keys of the new version, for the next diff
+
+    @property
+    def added(self) -> pd.DataFrame:
+        """Rows whose contents enter the totals."""
+        return _concat([self.inserted, self.updated])
+
+    @property
+    def removed(self) -> pd.DataFrame:
+        """Rows whose contents leave the totals."""
+        return _concat([self.deleted, self.previous])
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "inserted": len(self.inserted),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted),
+        }
+
+    def __len__(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+
+def _changed_rows(changed: np.ndarray) -> pd.DataFrame:
+    """Position of each changed row, the number of unchanged rows before it (its
+    hunk) and its rank within the hunk."""
+    rows = pd.DataFrame({"position": np.flatnonzero(changed), "hunk": np.cumsum(~changed)[changed]})
+    rows["rank"] = rows.groupby("hunk").cumcount()
+    return rows
+
+
+def row_keys(df: pd.DataFrame) -> Optional[np.ndarray]:
+    """Row keys of ``df`` for diff_frames, or None when its cells cannot be hashed."""
+    try:
+        return _row_keys(df)
+    except TypeError:
+        return None
+
+
+def diff_frames(
+    old: pd.DataFrame, new: pd.DataFrame, old_keys: Optional[np.ndarray] = None
+) -> Optional[ChangeSet]:
+    """Diff two versions of a sheet into inserted, updated and deleted rows.
+
+    ``old_keys`` are the row keys of ``old`` kept from the previous diff, so only
+    the new version is hashed. Returns None when the columns differ or the rows
+    cannot be hashed; the totals are then rebuilt.
+    """
+    if list(old.columns) != list(new.columns):
+        return None
+    if old is new:
+        return ChangeSet(new.iloc[:0], new.iloc[:0], old.iloc[:0], old.iloc[:0], old_keys)
+    if old_keys is None:
+        old_keys = row_keys(old)
+    new_keys = row_keys(new)
+    if old_keys is None or new_keys is None:
+        return None
+    if len(new_keys) >= len(old_keys) and np.array_equal(new_keys[: len(old_keys)], old_keys):
+        # Rows only appended, the usual case for the ledgers
+        return ChangeSet(
+            new.iloc[len(old_keys) :], new.iloc[:0], old.iloc[:0], old.iloc[:0], new_keys
+        )
+    removed = _changed_rows(~pd.Series(old_keys).isin(new_keys).to_numpy())
+    added = _changed_rows(~pd.Series(new_keys).isin(old_keys).to_numpy())
+    # The n-th changed row between the same unchanged rows replaced the n-th old one
+    pairs = removed.merge(added, on=["hunk", "rank"], suffixes=("_old", "_new"))
+    return ChangeSet(
+        inserted=new.iloc[np.setdiff1d(added["position"], pairs["position_new"])],
+        updated=new.iloc[pairs["position_new"].to_numpy()],
+        previous=old.iloc[pairs["position_old"].to_numpy()],
+        deleted=old.iloc[np.setdiff1d(removed["position"], pairs["position_old"])],
+        keys=new_keys,
+    )
+
+
+def _layout(df: Any, sheet: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Amount column and the source column of each grouping of a sheet.
+
+    None when ``df`` has no amount column; such sheets are not aggregated.
+    """
+    if not isinstance(df, pd.DataFrame) or not len(df.columns):
+        return None
+    if sheet == "Widows":
+        value_column = next((c for c in WIDOW_VALUE_COLUMNS if c in df.columns), None)
+        groupings = {
+            "name": "שם" if "שם" in df.columns else df.columns[0],
+            "distribution": "שם ",
+            "month": "חודש התחלה",
+        }
+    else:
+        value_column = amount_column_of(df)
+        groupings = {
+            "name": next((c for c in DONOR_NAME_COLUMNS if c in df.columns), None),
+            "month": date_column_of(df),
+        }
+    if value_column is None:
+        return None
+    groupings["amount"] = value_column
+    return value_column, {
+        grouping: column for grouping, column in groupings.items() if column in df.columns
+    }
+
+
+def _group_keys(df: pd.DataFrame, grouping: str, column: str, sheet: str) -> np.ndarray:
+    keys = df[column]
+    if grouping == "month":
+        dates = parse_dates(keys, sheet=sheet, column=column)
+        return (dates.dt.year * 100 + dates.dt.month).to_numpy(dtype=float, na_value=np.nan)
+    if grouping == "amount":
+        return parse_amounts(keys).to_numpy()
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        keys = keys.astype(keys.cat.categories.dtype)
+    return keys.to_numpy(dtype=object, na_value=np.nan)
+
+
+def _has_spans(sheet: str, groupings: Mapping[str, str]) -> bool:
+    """Whether the ``name`` grouping of a sheet keeps each donor's first and last date."""
+    return sheet != "Widows" and "name" in groupings and "month" in groupings
+
+
+def _date_spans(df: pd.DataFrame, sheet: str, groupings: Mapping[str, str]) -> pd.DataFrame:
+    """First and last date per name (NaT when a name has no dated row)."""
+    column = groupings["month"]
+    dates = parse_dates(df[column], sheet=sheet, column=column).astype("datetime64[ns]")
+    keys = _group_keys(df, "name", groupings["name"], sheet)
+    spans = dates.groupby(keys).agg(["min", "max"])
+    spans.columns = ["first", "last"]
+    return spans
+
+
+def _group_totals(
+    df: pd.DataFrame, sheet: str, value_column: str, groupings: Mapping[str, str]
+) -> Dict[str, pd.DataFrame]:
+    """``{grouping: DataFrame(sum, count)}`` of the amounts of ``df``; the ``name``
+    table of the ledgers also has the ``first`` and ``last`` date per name."""
+    values = parse_amounts(df[value_column])
+    totals = {"all": values.groupby(np.zeros(len(df), dtype=np.int8)).agg(["sum", "count"])}
+    for grouping, column in groupings.items():
+        keys = _group_keys(df, grouping, column, sheet)
+        totals[grouping] = values.groupby(keys).agg(["sum", "count"])
+    if "month" in totals:
+        totals["month"].index = totals["month"].index.astype("int32")
+    if _has_spans(sheet, groupings):
+        totals["name"] = totals["name"].join(_date_spans(df, sheet, groupings))
+    return totals
+
+
+def _combine(current: pd.DataFrame, added: pd.DataFrame, removed: pd.DataFrame) -> pd.DataFrame:
+    flows = ["sum", "count"]
+    table = current[flows].add(added[flows], fill_value=0).sub(removed[flows], fill_value=0)
+    table = table[table["count"] > 0].astype({"count": "int64"})
+    if "first" in current.columns:
+        # Removed rows cannot narrow a span here; SheetAggregates.apply rescans those names
+        spans = [part for part in (current, added) if "first" in part.columns]
+        table["first"] = pd.concat([p["first"].reindex(table.index) for p in spans], axis=1).min(
+            axis=1
+        )
+        table["last"] = pd.concat([p["last"].reindex(table.index) for p in spans], axis=1).max(
+            axis=1
+        )
+    return table
+
+
+def current_month_key() -> int:
+    today = pd.Timestamp.today()
+    return today.year * 100 + today.month
+
+
+@dataclass(frozen=True)
+class SheetAggregates:
+    """Sum of the amount and number of rows per key of each grouping of one sheet.
+
+    Groupings: ``all`` (one key), ``month`` (YYYYMM), ``name``, ``amount`` and,
+    for the Widows sheet, ``distribution`` (per "שם ").
+    """
+
+    sheet: str
+    columns: Tuple[str, ...]
+    value_column: str
+    groupings: Mapping[str, str]
+    totals: Mapping[str, pd.DataFrame]
+    row_keys: Optional[np.ndarray] = None  # of the frame the totals describe
+
+    def get(self, grouping: str) -> pd.DataFrame:
+        table = self.totals.get(grouping)
+        return table if table is not None else pd.DataFrame({"sum": [], "count": []})
+
+    @property
+    def total(self) -> float:
+        return float(self.get("all")["sum"].sum())
+
+    def apply(self, changes: ChangeSet, frame: Optional[pd.DataFrame] = None) -> "SheetAggregates":
+        """Totals after applying ``changes``; only the changed rows are aggregated.
+
+        ``frame`` is the new version of the sheet. A removed row that held a
+        name's first or last date makes that name's span be rescanned in it.
+        """
+        if not len(changes):
+            return replace(self, row_keys=changes.keys)
+        added = _group_totals(changes.added, self.sheet, self.value_column, self.groupings)
+        removed = _group_totals(changes.removed, self.sheet, self.value_column, self.groupings)
+        totals = {
+            grouping: _combine(table, added[grouping], removed[grouping])
+            for grouping, table in self.totals.items()
+        }
+        if "first" in self.totals.get("name", {}):
+            totals["name"] = self._rescan_spans(totals["name"], removed["name"], frame)
+        if "month" in totals:
+            totals["month"] = totals["month"].sort_index()
+        return replace(self, totals=totals, row_keys=changes.keys)
+
+    def closed_months(self, changes: ChangeSet) -> List[int]:
+        """Months before the current one (YYYYMM) that ``changes`` add or remove rows in."""
+        if "month" not in self.groupings or not len(changes):
+            return []
+        months = np.concatenate(
+            [
+                _group_keys(rows, "month", self.groupings["month"], self.sheet)
+                for rows in (changes.added, changes.removed)
+            ]
+        )
+        return sorted({int(m) for m in months[months < current_month_key()]})
+
+    def _rescan_spans(
+        self, table: pd.DataFrame, removed: pd.DataFrame, frame: Optional[pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Recompute the spans of the remaining names that lost their first or last row."""
+        old = self.totals["name"]
+        names = removed.index.intersection(table.index)
+        stale = names[
+            (removed.loc[names, "first"] <= old.loc[names, "first"]).to_numpy()
+            | (removed.loc[names, "last"] >= old.loc[names, "last"]).to_numpy()
+        ]
+        if not len(stale):
+            return table
+        if frame is None:
+            table.loc[stale, ["first", "last"]] = pd.NaT
+            return table
+        keys = _group_keys(frame, "name", self.groupings["name"], self.sheet)
+        rows = frame[pd.Series(keys).isin(stale).to_numpy()]
+        spans = _date_spans(rows, self.sheet, self.groupings).reindex(stale)
+        table.loc[stale, ["first", "last"]] = spans.to_numpy()
+        return table
+
+
+def aggregate_sheet(df: Any, sheet: str) -> Optional[SheetAggregates]:
+    """Totals of a whole sheet; None when it has no amount column."""
+    layout = _layout(df, sheet)
+    if layout is None:
+        return None
+    value_column, groupings = layout
+    return SheetAggregates(
+        sheet,
+        tuple(df.columns),
+        value_column,
+        groupings,
+        _group_totals(df, sheet, value_column, groupings),
+        row_keys(df),
+    )
+
+
+def merge_sheets(
+    current: Optional[SheetAggregates], archived: Optional[SheetAggregates]
+) -> Optional[SheetAggregates]:
+    """Totals of the current rows plus the archived ones, per grouping of ``current``."""
+    if archived is None:
+        return current
+    if current is None:
+        return archived
+    totals = {
+        grouping: _combine(table, archived.get(grouping), table.iloc[:0])
+        for grouping, table in current.totals.items()
+    }
+    if "month" in totals:
+        totals["month"] = totals["month"].sort_index()
+    return replace(current, totals=totals, row_keys=None)
+
+
+def aggregate_archives(
+    archives: List[Mapping[str, pd.DataFrame]],
+) -> Dict[str, Optional[SheetAggregates]]:
+    """Totals of the ledger sheets of the archive workbooks (computed once per archive set)."""
+    if not archives:
+        return {}
+    return {
+        sheet: aggregate_sheet(concat_years([archive.get(sheet) for archive in archives]), sheet)
+        for sheet in LEDGER_SHEETS
+    }
+
+
+def update_sheet(
+    previous: Optional[SheetAggregates], old_df: Any, new_df: Any, sheet: str
+) -> Tuple[Optional[SheetAggregates], Optional[ChangeSet]]:
+    """Bring ``previous`` (the totals of ``old_df``) up to date with ``new_df``.
+
+    Returns the totals and the change set applied, or a full rebuild and None
+    when there is nothing to diff against or the changes touch a closed month.
+    """
+    if (
+        previous is not None
+        and isinstance(old_df, pd.DataFrame)
+        and isinstance(new_df, pd.DataFrame)
+        and previous.columns == tuple(new_df.columns)
+    ):
+        changes = diff_frames(old_df, new_df, previous.row_keys)
+        closed = previous.closed_months(changes) if changes is not None else []
+        if closed:
+            labels = ", ".join(month_label(month) for month in closed)
+            logging.info(f"{sheet}: changes to closed months {labels}; rebuilding the totals")
+        elif changes is not None:
+            return previous.apply(changes, new_df), changes
+    return aggregate_sheet(new_df, sheet), None
+
+
+@dataclass(frozen=True)
+class DatasetAggregates:
+    """Incrementally maintained totals of one dataset version.
+
+    ``changes`` gives the rows inserted, updated and deleted per sheet since the
+    previous version, or None for a sheet whose totals were built from scratch.
+    The statistics have the shape of the data_processing functions they replace.
+
+    ``sheets`` are the totals of the whole dataset; with archive workbooks they
+    are the ``current`` workbook's totals, which the next version is diffed
+    against, plus the frozen ``archived`` totals of ``archive_version``.
+    """
+
+    sheets: Mapping[str, Optional[SheetAggregates]]
+    changes: Mapping[str, Optional[Dict[str, int]]]
+    version: Optional[str] = None
+    current: Optional[Mapping[str, Optional[SheetAggregates]]] = None
+    archived: Mapping[str, Optional[SheetAggregates]] = field(default_factory=dict)
+    archive_version: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether every statistic can be served from the totals."""
+        donations = self.sheets.get("Donations")
+        return (
+            all(self.sheets.get(sheet) is not None for sheet in AGGREGATED_SHEETS)
+            and "name" in donations.groupings
+            and "month" in self.sheets["Expenses"].groupings
+            and "month" in donations.groupings
+        )
+
+    def _months(self, sheet: str) -> pd.Series:
+        aggregates = self.sheets[sheet]
+        months = aggregates.get("month")["sum"].astype(float)
+        months.index = months.index.astype("int32")
+        months.index.name = "month"
+        return months.rename(aggregates.value_column)
+
+    def rollups(self) -> Optional[Rollups]:
+        """Monthly totals of the two ledgers, as build_rollups would compute them."""
+        if self.sheets.get("Expenses") is None or self.sheets.get("Donations") is None:
+            return None
+        return Rollups(
+            donations=self._months("Donations"),
+            expenses=self._months("Expenses"),
+            version=self.version,
+        )
+
+    def donor_index(self) -> Optional[DonorIndex]:
+        """Per-donor totals of the Donations sheet as a DonorIndex, or None when
+        the sheet has no name column."""
+        donations = self.sheets.get("Donations")
+        if donations is None or "name" not in donations.groupings:
+            return None
+        donors = donations.get("name")
+        unknown = np.full(len(donors), np.datetime64("NaT", "ns"))
+        return DonorIndex(
+            names=pd.Index(donors.index, dtype=object),
+            sums=donors["sum"].to_numpy(dtype=float),
+            counts=donors["count"].to_numpy(dtype=np.int64),
+            first_dates=(
+                donors["first"].to_numpy(dtype="datetime64[ns]") if "first" in donors else unknown
+            ),
+            last_dates=(
+                donors["last"].to_numpy(dtype="datetime64[ns]") if "last" in donors else unknown
+            ),
+            version=self.version,
+        )
+
+    def budget_status(self) -> dict:
+        """Same result as calculate_monthly_budget."""
+        return summarize_budget(
+            self.sheets["Expenses"].total,
+            self.sheets["Donations"].total,
+            labelled(self._months("Expenses")),
+            labelled(self._months("Donations")),
+        )
+
+    def donor_statistics(self) -> dict:
+        """Same result as calculate_donor_statistics."""
+        donations = self.sheets["Donations"]
+        donors = donations.get("name")
+        amounts = donations.get("amount").index
+        total_donors = len(donors)
+        total_donations = donations.total
+        top_donors = donors.iloc[top_k(donors["sum"].to_numpy(), 10)]
+        top_donors = top_donors.rename_axis("name").reset_index()
+        return {
+            "total_donors": total_donors,
+            "total_donations": total_donations,
+            "avg_donation": total_donations / total_donors if total_donors > 0 else 0,
+            "min_donation": float(amounts.min()) if len(amounts) else 0,
+            "max_donation": float(amounts.max()) if len(amounts) else 0,
+            "top_donors": top_donors[["name", "sum", "count"]].to_dict("records"),
+        }
+
+    def widow_statistics(self) -> dict:
+        """Same result as calculate_widow_statistics."""
+        widows = self.sheets["Widows"]
+        amounts = widows.get("amount")["count"]
+        distribution = widows.get("distribution")["sum"].sort_values(ascending=False)
+        return {
+            "total_widows": len(widows.get("name")),
+            "total_support": widows.total,
+            "support_1000_count": int(amounts.get(1000, 0)),
+            "support_2000_count": int(amounts.get(2000, 0)),
+            "support_distribution": (
+                distribution.to_dict() if "distribution" in widows.groupings else {}
+            ),
+            "monthly_support": (
+                labelled(widows.get("month")["sum"]) if "month" in widows.groupings else {}
+            ),
+        }
+
+
+def build_aggregates(
+    frames: Mapping[str, pd.DataFrame],
+    version: Optional[str] = None,
+    previous_frames: Optional[Mapping[str, pd.DataFrame]] = None,
+    previous: Optional[DatasetAggregates] = None,
+) -> DatasetAggregates:
+    """Totals of ``frames``, derived from ``previous`` (the totals of
+    ``previous_frames``) by applying the row changes when possible.
+
+    With MultiYearFrames only the current workbook is diffed; the archived
+    ledgers are aggregated once per archive version and added on top, so a
+    refresh never concatenates or hashes the archived rows.
+    """
+    archives: List[Mapping[str, pd.DataFrame]] = []
+    archive_version = None
+    if isinstance(frames, MultiYearFrames):
+        archives, archive_version = frames.archives, frames.archive_version
+        frames = frames.current
+    if isinstance(previous_frames, MultiYearFrames):
+        previous_frames = previous_frames.current
+
+    current: Dict[str, Optional[SheetAggregates]] = {}
+    changes: Dict[str, Optional[Dict[str, int]]] = {}
+    for sheet in AGGREGATED_SHEETS:
+        base = (previous.current or previous.sheets).get(sheet) if previous is not None else None
+        old_df = previous_frames.get(sheet) if previous_frames is not None else None
+        current[sheet], change = update_sheet(base, old_df, frames.get(sheet), sheet)
+        changes[sheet] = change.counts() if change is not None else None
+        if change is not None:
+            logging.info(f"{sheet}: applied {change.counts()} to the aggregates")
+
+    if (
+        previous is not None
+        and archive_version is not None
+        and previous.archive_version == archive_version
+    ):
+        archived = previous.archived
+    else:
+        archived = aggregate_archives(archives)
+    sheets = {sheet: merge_sheets(totals, archived.get(sheet)) for sheet, totals in current.items()}
+    return DatasetAggregates(
+        sheets=sheets,
+        changes=changes,
+        version=version,
+        current=current,
+        archived=archived,
+        archive_version=archive_version,
+    )
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Incremental sync for the append-only ledger sheets (Donations, Expenses)
+Remembers how many rows of each ledger were synced and a fingerprint of its header
+and of every data row, so a refresh only downloads the rows appended since plus a
+bounded window of older rows to check
+
+Staleness: the trailing rows are re-read on every refresh, older rows only when
+the rotating verification window reaches them. An edit above the trailing rows
+therefore shows up within ceil(older rows / VERIFY_ROWS) refreshes, or at the
+next full sync (FULL_SYNC_INTERVAL), whichever comes first. Until then the
+cached frame keeps the old value.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+# Rows at the top of a ledger sheet that are not data (title row + header row)
+LEDGER_HEADER_ROWS = 2
+
+# Number of already-synced trailing rows re-read on every sync to detect edits
+TAIL_ROWS = 5
+
+# Older rows re-read per sync, in a window that rotates through the ledger
+VERIFY_ROWS = 500
+
+# Force a full reload at least this often, whatever the windows have checked
+FULL_SYNC_INTERVAL = 3600  # seconds
+
+
+def _normalize_row(row) -> List[str]:
+    """Return ``row`` as strings without trailing empty cells (as batchGet trims them)."""
+    cells = ["" if cell is None else str(cell) for cell in row]
+    while cells and cells[-1] == "":
+        cells.pop()
+    return cells
+
+
+def fingerprint_rows(rows) -> str:
+    """Return a hash of raw sheet rows that ignores trailing empty cells."""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(json.dumps(_normalize_row(row), ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _row_hash(row) -> int:
+    """Process-local hash of one raw row, ignoring trailing empty cells."""
+    return hash(tuple(_normalize_row(row)))
+
+
+def _column_letter(width: int) -> str:
+    """Return the A1 column letter of column number ``width`` (1 -> A)."""
+    return rowcol_to_a1(1, max(width, 1)).rstrip("0123456789")
+
+
+@dataclass
+class LedgerState:
+    """What is known about one ledger sheet after the last sync."""
+
+    row_count: int  # raw rows, including the header rows
+    width: int
+    header_hash: str
+    header_rows: List[List[str]]
+    frame: pd.DataFrame
+    full_synced_at: float
+    synced_at: float
+    row_hashes: List[int] = field(default_factory=list)  # one per data row
+    verify_from: int = 0  # first data row of the next verification window
+
+
+class LedgerSync:
+    """Per-sheet sync state for append-only ledgers.
+
+    After a full load (``record_full``) a refresh asks for ``plan`` ranges: the
+    header rows, everything from the last ``tail_rows`` synced rows onwards and
+    a window of ``verify_rows`` older rows that moves on with every sync and
+    wraps around. ``apply`` checks the re-read rows against the stored row
+    hashes and, if they are unchanged, parses only the appended rows and appends
+    them to the cached frame. A mismatch (edited or deleted history, changed
+    headers) returns None so the caller falls back to a full reload.
+    """
+
+    def __init__(
+        self,
+        tail_rows: int = TAIL_ROWS,
+        header_rows: int = LEDGER_HEADER_ROWS,
+        full_sync_interval: float = FULL_SYNC_INTERVAL,
+        verify_rows: int = VERIFY_ROWS,
+    ):
+        self.tail_rows = tail_rows
+        self.header_rows = header_rows
+        self.full_sync_interval = full_sync_interval
+        self.verify_rows = verify_rows
+        self._states: Dict[Tuple[str, str], LedgerState] = {}
+        self._lock = threading.Lock()
+
+    def _tail_start(self, row_count: int) -> int:
+        """1-based row number of the first trailing row re-read on every sync."""
+        return max(self.header_rows + 1, row_count - self.tail_rows + 1)
+
+    def _tail_len(self, row_count: int) -> int:
+        return row_count - self._tail_start(row_count) + 1
+
+    def _window(self, state: LedgerState) -> Optional[Tuple[int, int]]:
+        """Data rows [first, last) of the verification window, None without older rows."""
+        older = state.row_count - self.header_rows - self._tail_len(state.row_count)
+        if older <= 0 or self.verify_rows <= 0:
+            return None
+        first = state.verify_from if state.verify_from < older else 0
+        return first, min(first + self.verify_rows, older)
+
+    def plan(self, spreadsheet_id: str, title: str, quoted_title: str) -> Optional[List[str]]:
+        """Return the A1 ranges for an incremental fetch, or None if a full load is needed."""
+        with self._lock:
+            state = self._states.get((spreadsheet_id, title))
+        if state is None or time.time() - state.full_synced_at > self.full_sync_interval:
+            return None
+        last_column = _column_letter(state.width)
+        ranges = [
+            f"{quoted_title}!1:{self.header_rows}",
+            f"{quoted_title}!A{self._tail_start(state.row_count)}:{last_column}",
+        ]
+        window = self._window(state)
+        if window is not None:
+            first, last = (row + self.header_rows for row in window)
+            ranges.append(f"{quoted_title}!A{first + 1}:{last_column}{last}")
+        return ranges
+
+    def record_full(
+        self, spreadsheet_id: str, title: str, values: List[List[str]], frame: pd.DataFrame
+    ) -> None:
+        """Remember the result of a full load of ``title`` as the new sync baseline."""
+        if len(values) < self.header_rows:
+            self.invalidate(spreadsheet_id, title)
+            return
+        now = time.time()
+        state = LedgerState(
+            row_count=len(values),
+            width=max((len(row) for row in values), default=1),
+            header_hash=fingerprint_rows(values[: self.header_rows]),
+            header_rows=[list(row) for row in values[: self.header_rows]],
+            frame=frame.copy(),
+            full_synced_at=now,
+            synced_at=now,
+            row_hashes=[_row_hash(row) for row in values[self.header_rows :]],
+        )
+        with self._lock:
+            self._states[(spreadsheet_id, title)] = state
+
+    def apply(
+        self,
+        spreadsheet_id: str,
+        title: str,
+        range_values: List[List[List[str]]],
+        parse: Callable[[List[List[str]]], pd.DataFrame],
+    ) -> Optional[pd.DataFrame]:
+        """Apply the rows fetched for the ``plan`` ranges and return the updated frame.
+
+        ``parse`` turns header rows plus data rows into a DataFrame (the same parser
+        used for a full load). Returns None when the fingerprints do not match.
+        """
+        with self._lock:
+            state = self._states.get((spreadsheet_id, title))
+        window = None if state is None else self._window(state)
+        if state is None or len(range_values) != (2 if window is None else 3):
+            return None
+        header_values, tail_values = range_values[:2]
+
+        if fingerprint_rows(header_values) != state.header_hash:
+            logging.info(f"Ledger '{title}' headers changed; full reload needed")
+            return None
+        overlap = self._tail_len(state.row_count)
+        synced_tail = state.row_hashes[len(state.row_hashes) - overlap :]
+        if (
+            len(tail_values) < overlap
+            or [_row_hash(row) for row in tail_values[:overlap]] != synced_tail
+        ):
+            logging.info(f"Ledger '{title}' trailing rows were edited; full reload needed")
+            return None
+        if window is not None:
+            first, last = window
+            older = list(range_values[2])
+            older += [[]] * (last - first - len(older))  # trailing blank rows are trimmed
+            if [_row_hash(row) for row in older] != state.row_hashes[first:last]:
+                logging.info(f"Ledger '{title}' older rows were edited; full reload needed")
+                return None
+
+        new_rows = tail_values[overlap:]
+        frame = state.frame
+        if new_rows:
+            appended = parse(state.header_rows + new_rows)
+            frame = pd.concat([frame, appended], ignore_index=True)
+
+        updated = LedgerState(
+            row_count=state.row_count + len(new_rows),
+            width=max([state.width] + [len(row) for row in new_rows]),
+            header_hash=state.header_hash,
+            header_rows=state.header_rows,
+            frame=frame,
+            full_synced_at=state.full_synced_at,
+            synced_at=time.time(),
+            row_hashes=state.row_hashes + [_row_hash(row) for row in new_rows],
+            verify_from=0 if window is None else window[1],
+        )
+        with self._lock:
+            self._states[(spreadsheet_id, title)] = updated
+        logging.info(f"Ledger '{title}' synced incrementally: {len(new_rows)} new rows")
+        return frame.copy()
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None, title: Optional[str] = None) -> None:
+        """Forget the sync state of one ledger, one spreadsheet, or everything."""
+        with self._lock:
+            for key in list(self._states):
+                if spreadsheet_id is not None and key[0] != spreadsheet_id:
+                    continue
+                if title is not None and key[1] != title:
+                    continue
+                del self._states[key]
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        """Return the synced row count and sync times of every tracked ledger."""
+        with self._lock:
+            return {
+                title: {
+                    "rows": state.row_count,
+                    "synced_at": state.synced_at,
+                    "full_synced_at": state.full_synced_at,
+                }
+                for (_, title), state in self._states.items()
+            }
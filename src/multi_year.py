@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Multi-year frames for Omri Association Dashboard
+Older years live in separate archive workbooks; MultiYearFrames presents the
+current workbook and the archives as one {sheet: DataFrame} mapping and only
+concatenates a ledger sheet the first time it is read
+"""
+
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+# Sheets that accumulate rows over the years; the others (the Widows and
+# Investors rosters) describe the current state and come from the current
+# workbook only
+LEDGER_SHEETS = ("Expenses", "Donations")
+
+
+def _align_categories(parts: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    """Give columns that are categorical in every part the union of their categories,
+    so concatenation keeps them categorical instead of falling back to object"""
+    shared = set(parts[0].columns).intersection(*(part.columns for part in parts[1:]))
+    categorical = [
+        column
+        for column in parts[0].columns
+        if column in shared
+        and all(isinstance(part[column].dtype, pd.CategoricalDtype) for part in parts)
+    ]
+    if not categorical:
+        return parts
+    aligned = [part.copy(deep=False) for part in parts]
+    for column in categorical:
+        categories = parts[0][column].cat.categories
+        for part in parts[1:]:
+            categories = categories.union(part[column].cat.categories, sort=False)
+        for part in aligned:
+            part[column] = part[column].cat.set_categories(categories)
+    return aligned
+
+
+def concat_years(parts: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the per-year frames of one sheet (oldest first) into one frame."""
+    non_empty = [part for part in parts if isinstance(part, pd.DataFrame) and not part.empty]
+    if not non_empty:
+        return parts[-1] if parts else pd.DataFrame()
+    if len(non_empty) == 1:
+        return non_empty[0]
+    return pd.concat(_align_categories(non_empty), ignore_index=True)
+
+
+class MultiYearFrames(Mapping):
+    """Read-only ``{sheet: DataFrame}`` view over the current and archive workbooks.
+
+    ``archives`` are ordered oldest first and come before ``current``. A ledger
+    sheet is concatenated on first access and memoised; the other sheets are
+    those of the current workbook. Sheets missing from the current workbook
+    are not exposed.
+    """
+
+    def __init__(
+        self,
+        current: Dict[str, pd.DataFrame],
+        archives: Sequence[Dict[str, pd.DataFrame]],
+        archive_versions: Optional[Sequence[str]] = None,
+    ):
+        self._current = current
+        self._archives = list(archives)
+        self._archive_versions = list(archive_versions) if archive_versions is not None else None
+        self._assembled: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, sheet: str) -> pd.DataFrame:
+        with self._lock:
+            if sheet not in LEDGER_SHEETS:
+                return self._current[sheet]
+            if sheet not in self._assembled:
+                current = self._current[sheet]
+                parts = [archive.get(sheet) for archive in self._archives]
+                self._assembled[sheet] = concat_years([*parts, current])
+            return self._assembled[sheet]
+
+    @property
+    def current(self) -> Dict[str, pd.DataFrame]:
+        """Frames of the current workbook alone."""
+        return self._current
+
+    @property
+    def archives(self) -> List[Dict[str, pd.DataFrame]]:
+        """Frames of the archive workbooks, oldest first."""
+        return self._archives
+
+    @property
+    def archive_version(self) -> Optional[str]:
+        """Token of the archive workbooks (their frozen versions), or None when unknown.
+
+        Archives never change, so versions and totals can key on this token
+        instead of hashing or concatenating the archived rows again.
+        """
+        if self._archive_versions is None:
+            return None
+        return "+".join(self._archive_versions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._current)
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    @property
+    def assembled(self) -> List[str]:
+        """Sheets concatenated so far."""
+        with self._lock:
+            return list(self._assembled)
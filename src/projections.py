@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Widow support projections for Omri Association Dashboard
+Builds a widow x month commitment matrix from each widow's start month and the
+end of her donor commitment with NumPy broadcasting, and projects month by
+month the support required, the commitments starting and expiring and their
+coverage by projected donations, for any horizon
+"""
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.date_parsing import parse_dates
+from src.frame_compaction import COUNT_COLUMNS
+from src.rollups import Rollups
+from src.sheet_schemas import parse_amounts
+
+DEFAULT_HORIZON = 36
+
+# Months of donations averaged by projected_donations
+DONATION_LOOKBACK_MONTHS = 12
+
+# Month indices of commitments without a start (already running) or an end (open-ended)
+_OPEN_START = -1
+_OPEN_END = np.iinfo(np.int32).max
+
+SUPPORT_NAME_COLUMN = "שם הבחורה"
+SUPPORT_AMOUNT_COLUMNS = ("כמה מקבלת בכל חודש", "סכום חודשי")
+SUPPORT_START_COLUMN = "מתי התחילה לקבל"
+SUPPORT_END_COLUMN = "עד מתי תחת תורם"
+
+
+def month_index(dates: pd.Series) -> np.ndarray:
+    """Months since year 0 (``year * 12 + month - 1``); NaN for missing dates."""
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=float, na_value=np.nan)
+
+
+def month_keys(indices: np.ndarray) -> np.ndarray:
+    """Month indices as YYYYMM keys, the month keys of the rollups."""
+    indices = np.asarray(indices, dtype=np.int64)
+    return (indices // 12) * 100 + indices % 12 + 1
+
+
+def _names(series: pd.Series) -> pd.Series:
+    return series.astype("string").str.strip()
+
+
+def _months(df: pd.DataFrame, column: str, sheet: str) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return month_index(parse_dates(df[column], sheet=sheet, column=column))
+
+
+def _children(df: pd.DataFrame) -> np.ndarray:
+    column = next((c for c in COUNT_COLUMNS if c in df.columns), None)
+    if column is None:
+        return np.zeros(len(df))
+    return parse_amounts(df[column]).to_numpy(dtype=float)
+
+
+def widow_commitments(
+    widows_df: Optional[pd.DataFrame], widow_support_df: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """One row per widow: name, monthly amount, first and last month index and children.
+
+    Widows come from the Widows sheet ("שם ", "סכום חודשי", "חודש התחלה",
+    "מספר ילדים"). The end of the donor commitment ("עד מתי תחת תורם") comes
+    from the Widows Support sheet, matched by name, which also fills missing
+    start months. Without a Widows sheet the support sheet is used on its own.
+    A missing start means the support is already running, a missing end that
+    it is open-ended.
+    """
+    support = _support_commitments(widow_support_df)
+    if not isinstance(widows_df, pd.DataFrame) or "סכום חודשי" not in widows_df.columns:
+        return support
+    name_column = "שם " if "שם " in widows_df.columns else "שם"
+    commitments = pd.DataFrame(
+        {
+            "name": (
+                _names(widows_df[name_column])
+                if name_column in widows_df.columns
+                else pd.Series(pd.NA, index=widows_df.index, dtype="string")
+            ),
+            "amount": parse_amounts(widows_df["סכום חודשי"]).to_numpy(dtype=float),
+            "start": _months(widows_df, "חודש התחלה", "Widows"),
+            "children": _children(widows_df),
+        },
+        index=widows_df.index,
+    ).reset_index(drop=True)
+    matched = support.drop_duplicates("name", keep="last").set_index("name")
+    commitments["end"] = commitments["name"].map(matched["end"]).to_numpy(dtype=float)
+    commitments["start"] = commitments["start"].fillna(commitments["name"].map(matched["start"]))
+    return commitments[["name", "amount", "start", "end", "children"]]
+
+
+def _support_commitments(df: Optional[pd.DataFrame]) -> pd.DataFrame:
+    amount_column = (
+        next((c for c in SUPPORT_AMOUNT_COLUMNS if c in df.columns), None)
+        if isinstance(df, pd.DataFrame)
+        else None
+    )
+    if amount_column is None or SUPPORT_NAME_COLUMN not in df.columns:
+        return pd.DataFrame(
+            {
+                "name": pd.Series(dtype="string"),
+                "amount": pd.Series(dtype=float),
+                "start": pd.Series(dtype=float),
+                "end": pd.Series(dtype=float),
+                "children": pd.Series(dtype=float),
+            }
+        )
+    return pd.DataFrame(
+        {
+            "name": _names(df[SUPPORT_NAME_COLUMN]).to_numpy(),
+            "amount": parse_amounts(df[amount_column]).to_numpy(dtype=float),
+            "start": _months(df, SUPPORT_START_COLUMN, "Widows Support"),
+            "end": _months(df, SUPPORT_END_COLUMN, "Widows Support"),
+            "children": _children(df),
+        }
+    )
+
+
+def commitment_matrix(starts: np.ndarray, ends: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """Boolean widow x month matrix: True where a commitment runs in that month.
+
+    ``starts`` and ``ends`` are month indices (inclusive, NaN when open);
+    ``months`` the month indices of the horizon.
+    """
+    starts = np.nan_to_num(np.asarray(starts, dtype=float), nan=_OPEN_START).astype(np.int64)
+    ends = np.nan_to_num(np.asarray(ends, dtype=float), nan=_OPEN_END).astype(np.int64)
+    return (starts[:, None] <= months[None, :]) & (months[None, :] <= ends[:, None])
+
+
+def _per_month(offsets: np.ndarray, weights: np.ndarray, horizon: int) -> np.ndarray:
+    """Sum of ``weights`` per month offset within ``[0, horizon)``."""
+    inside = ~np.isnan(offsets) & (offsets >= 0) & (offsets < horizon)
+    return np.bincount(offsets[inside].astype(np.int64), weights[inside], minlength=horizon)
+
+
+def project_support(
+    commitments: pd.DataFrame,
+    horizon: int = DEFAULT_HORIZON,
+    start: Optional[pd.Timestamp] = None,
+    donations: Union[None, float, Sequence[float], np.ndarray] = None,
+    starting_balance: float = 0.0,
+) -> pd.DataFrame:
+    """Month-by-month projection of the widow support commitments.
+
+    One row per month of the horizon (indexed by YYYYMM, from ``start``, the
+    current month by default) with the support ``required``, the number of
+    ``active`` commitments, the commitments ``starting`` and ``expiring`` (their
+    last month) with their amounts, and, against ``donations`` (a monthly
+    amount or one per month), the ``surplus``, ``coverage`` ratio and running
+    ``balance``.
+    """
+    start = pd.Timestamp.today() if start is None else pd.Timestamp(start)
+    first = start.year * 12 + start.month - 1
+    months = first + np.arange(horizon, dtype=np.int64)
+    amounts = commitments["amount"].to_numpy(dtype=float)
+    starts = commitments["start"].to_numpy(dtype=float)
+    ends = commitments["end"].to_numpy(dtype=float)
+
+    active = commitment_matrix(starts, ends, months)
+    required = amounts @ active
+    ones = np.ones(len(amounts))
+
+    if donations is None:
+        donations = np.full(horizon, np.nan)
+    donations = np.broadcast_to(np.asarray(donations, dtype=float), (horizon,))
+    surplus = donations - required
+    coverage = np.divide(donations, required, out=np.full(horizon, np.nan), where=required > 0)
+    return pd.DataFrame(
+        {
+            "required": required,
+            "active": active.sum(axis=0),
+            "starting": _per_month(starts - first, ones, horizon).astype(np.int64),
+            "starting_amount": _per_month(starts - first, amounts, horizon),
+            "expiring": _per_month(ends - first, ones, horizon).astype(np.int64),
+            "expiring_amount": _per_month(ends - first, amounts, horizon),
+            "donations": donations,
+            "surplus": surplus,
+            "coverage": coverage,
+            "balance": starting_balance + np.cumsum(surplus),
+        },
+        index=pd.Index(month_keys(months), name="month"),
+    )
+
+
+def projected_donations(
+    rollups: Optional[Rollups], lookback: int = DONATION_LOOKBACK_MONTHS
+) -> Optional[float]:
+    """Average monthly donations over the last ``lookback`` months of the rollups."""
+    if rollups is None or rollups.donations.empty:
+        return None
+    return float(rollups.donations.sort_index().tail(lookback).mean())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Monthly rollup engine for Omri Association Dashboard
+Groups ledger rows on an integer month key (YYYYMM) derived with vectorised
+arithmetic instead of "%Y-%m" strings. The key is derived and the donation and
+expense monthly totals computed once per data version, when the refresh builds
+the Rollups; every monthly aggregation and chart reads from that shared result
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import pandas as pd
+
+from src.date_parsing import parse_dates
+
+AMOUNT_COLUMNS = ("שקלים", "סכום")
+
+
+def month_label(key: int) -> str:
+    """``202401`` -> ``"2024-01"``."""
+    return f"{key // 100:04d}-{key % 100:02d}"
+
+
+def labelled(totals: pd.Series) -> Dict[str, float]:
+    """Month totals as a ``{"YYYY-MM": total}`` dict, in month order."""
+    return {month_label(int(key)): value for key, value in totals.items()}
+
+
+def date_column_of(df: pd.DataFrame) -> Optional[str]:
+    """The date column of a ledger frame ("תאריך", else the first column)."""
+    if "תאריך" in df.columns:
+        return "תאריך"
+    return df.columns[0] if len(df.columns) else None
+
+
+def amount_column_of(df: pd.DataFrame) -> Optional[str]:
+    for column in AMOUNT_COLUMNS:
+        if column in df.columns:
+            return column
+    return None
+
+
+def monthly_totals(
+    df: pd.DataFrame,
+    value_column: str,
+    date_column: str = "תאריך",
+    sheet: Optional[str] = None,
+) -> pd.Series:
+    """Sum of ``value_column`` per integer month key, sorted by month.
+
+    Dates are parsed with the shared date service (datetime columns pass
+    through untouched) and rows without a valid date are left out.
+    """
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return pd.Series(dtype=float, index=pd.Index([], dtype="int32", name="month"))
+    dates = parse_dates(df[date_column], sheet=sheet, column=date_column)
+    keys = dates.dt.year * 100 + dates.dt.month
+    valid = keys.notna().to_numpy()
+    values = pd.to_numeric(df[value_column], errors="coerce")
+    totals = values[valid].groupby(keys[valid].astype("int32").to_numpy()).sum()
+    totals.index.name = "month"
+    return totals.rename(value_column)
+
+
+def _ledger_totals(df: Optional[pd.DataFrame], sheet: str) -> pd.Series:
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return monthly_totals(pd.DataFrame(), "")
+    value_column = amount_column_of(df)
+    date_column = date_column_of(df)
+    if value_column is None or date_column is None:
+        return monthly_totals(pd.DataFrame(), "")
+    return monthly_totals(df, value_column, date_column, sheet=sheet)
+
+
+@dataclass(frozen=True)
+class Rollups:
+    """Monthly donation and expense totals of one data version.
+
+    ``donations`` and ``expenses`` are Series indexed by integer month key.
+    """
+
+    donations: pd.Series
+    expenses: pd.Series
+    version: Optional[str] = None
+
+    def months(self) -> pd.DataFrame:
+        """One row per month key with either flow: donations, expenses and balance."""
+        table = pd.concat(
+            [self.donations.rename("donations"), self.expenses.rename("expenses")], axis=1
+        ).fillna(0.0)
+        table = table.sort_index()
+        table.index = table.index.astype("int32")
+        table.index.name = "month"
+        table["balance"] = table["donations"] - table["expenses"]
+        return table
+
+
+def build_rollups(
+    expenses_df: Optional[pd.DataFrame],
+    donations_df: Optional[pd.DataFrame],
+    version: Optional[str] = None,
+) -> Rollups:
+    """Compute the shared monthly totals of the Expenses and Donations ledgers."""
+    return Rollups(
+        donations=_ledger_totals(donations_df, "Donations"),
+        expenses=_ledger_totals(expenses_df, "Expenses"),
+        version=version,
+    )
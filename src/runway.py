@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Runway simulation for Omri Association Dashboard
+Resamples the historical monthly donation and expense totals of the rollups
+over thousands of paths in one NumPy batch and reports, month by month, the
+spread of the balance and the probability of a deficit, and over the horizon
+how many months of widow commitments the balance can fund
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.projections import DEFAULT_HORIZON, month_keys
+from src.rollups import Rollups
+from src.stats_cache import cached_by_version
+
+DEFAULT_PATHS = 10000
+
+# Complete months of history the flows are resampled from
+HISTORY_MONTHS = 36
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# "bootstrap" draws whole historical months; "normal" draws from a bivariate
+# normal fitted to them (negative draws are clipped at zero)
+METHODS = ("bootstrap", "normal")
+
+
+def monthly_history(
+    rollups: Optional[Rollups], before: int, history: int = HISTORY_MONTHS
+) -> pd.DataFrame:
+    """Donations and expenses of the last ``history`` months before month key ``before``.
+
+    The month ``before`` itself is left out: its totals are still incomplete.
+    """
+    if rollups is None:
+        return pd.DataFrame({"donations": pd.Series(dtype=float), "expenses": []})
+    months = rollups.months()
+    return months.loc[months.index < before, ["donations", "expenses"]].tail(history)
+
+
+def sample_flows(
+    history: pd.DataFrame,
+    paths: int,
+    horizon: int,
+    method: str = "bootstrap",
+    rng: Optional[np.random.Generator] = None,
+):
+    """(donations, expenses), each a ``paths x horizon`` array of monthly totals.
+
+    Bootstrap draws donations and expenses of the same historical month
+    together, so months that were high on both sides stay so.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method {method!r}; expected one of {METHODS}")
+    if history.empty:
+        raise ValueError("No complete months of history to simulate from")
+    rng = np.random.default_rng() if rng is None else rng
+    flows = history[["donations", "expenses"]].to_numpy(dtype=float)
+    if method == "bootstrap":
+        drawn = flows[rng.integers(0, len(flows), size=(paths, horizon))]
+    else:
+        covariance = np.cov(flows, rowvar=False) if len(flows) > 1 else np.zeros((2, 2))
+        drawn = rng.multivariate_normal(flows.mean(axis=0), covariance, size=(paths, horizon))
+        np.maximum(drawn, 0.0, out=drawn)
+    return drawn[..., 0], drawn[..., 1]
+
+
+def first_deficit(balances: np.ndarray) -> np.ndarray:
+    """Months funded on each path: months before the balance first drops below zero.
+
+    Paths that never do are funded for the whole horizon.
+    """
+    deficit = balances < 0
+    return np.where(deficit.any(axis=1), deficit.argmax(axis=1), balances.shape[1])
+
+
+@dataclass(frozen=True)
+class RunwayResult:
+    """Simulated balances of one dataset version.
+
+    ``months`` is indexed by YYYYMM with the balance percentiles (``p5`` ...
+    ``p95``), the probability the balance is below zero in that month
+    (``deficit``) and that it has dropped below zero by then (``ran_out``);
+    ``runway`` holds the months funded on each path.
+    """
+
+    months: pd.DataFrame
+    runway: np.ndarray
+    method: str
+    history_months: int
+
+    @property
+    def paths(self) -> int:
+        return len(self.runway)
+
+    @property
+    def horizon(self) -> int:
+        return len(self.months)
+
+    @property
+    def funded_probability(self) -> float:
+        """Probability the balance stays non-negative over the whole horizon."""
+        return float(np.mean(self.runway == self.horizon))
+
+    def runway_percentiles(self, percentiles: Sequence[int] = PERCENTILES) -> Dict[int, int]:
+        """Months funded per percentile (the lower path at each rank)."""
+        values = np.percentile(self.runway, percentiles, method="lower")
+        return {int(p): int(v) for p, v in zip(percentiles, values)}
+
+
+def simulate_runway(
+    history: pd.DataFrame,
+    horizon: int = DEFAULT_HORIZON,
+    paths: int = DEFAULT_PATHS,
+    starting_balance: float = 0.0,
+    commitments: Optional[Sequence[float]] = None,
+    method: str = "bootstrap",
+    start: Optional[pd.Timestamp] = None,
+    seed: Optional[int] = 0,
+) -> RunwayResult:
+    """Simulate ``paths`` balance paths over ``horizon`` months from ``history``.
+
+    ``commitments`` is the widow support required per month (the ``required``
+    column of projections.project_support). Historical expenses already include
+    the support paid today, so only its change from the first month is added
+    to the resampled expenses.
+    """
+    rng = np.random.default_rng(seed)
+    donations, expenses = sample_flows(history, paths, horizon, method, rng)
+    net = donations - expenses
+    if commitments is not None:
+        required = np.asarray(commitments, dtype=float)[:horizon]
+        net[:, : len(required)] -= required - required[0]
+    balances = starting_balance + np.cumsum(net, axis=1)
+
+    runway = first_deficit(balances)
+    start = pd.Timestamp.today() if start is None else pd.Timestamp(start)
+    first = start.year * 12 + start.month - 1
+    months = pd.DataFrame(
+        np.percentile(balances, PERCENTILES, axis=0).T,
+        columns=[f"p{p}" for p in PERCENTILES],
+        index=pd.Index(month_keys(first + np.arange(horizon)), name="month"),
+    )
+    months["deficit"] = (balances < 0).mean(axis=0)
+    months["ran_out"] = np.bincount(runway, minlength=horizon + 1)[:horizon].cumsum() / paths
+    return RunwayResult(months=months, runway=runway, method=method, history_months=len(history))
+
+
+@cached_by_version
+def _cached_runway(
+    rollups: Optional[Rollups],
+    starting_balance: float,
+    commitments: Optional[Sequence[float]],
+    horizon: int,
+    paths: int,
+    method: str,
+    start: pd.Timestamp,
+) -> Optional[RunwayResult]:
+    history = monthly_history(rollups, start.year * 100 + start.month)
+    if history.empty:
+        return None
+    return simulate_runway(
+        history, horizon, paths, starting_balance, commitments, method, start=start
+    )
+
+
+def runway_for(
+    rollups: Optional[Rollups],
+    starting_balance: float = 0.0,
+    commitments: Optional[Sequence[float]] = None,
+    horizon: int = DEFAULT_HORIZON,
+    paths: int = DEFAULT_PATHS,
+    method: str = "bootstrap",
+    start: Optional[pd.Timestamp] = None,
+    version: Optional[str] = None,
+) -> Optional[RunwayResult]:
+    """Runway of the dataset the ``rollups`` belong to, or None without history.
+
+    ``start`` defaults to the first day of the current month. Called with
+    ``version=`` the result is cached per dataset version and start month; pass
+    ``commitments`` as a tuple so it is part of the cache key.
+    """
+    start = pd.Timestamp.today() if start is None else pd.Timestamp(start)
+    return _cached_runway(
+        rollups,
+        starting_balance,
+        commitments,
+        horizon,
+        paths,
+        method,
+        start.normalize().replace(day=1),
+        version=version,
+    )
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+What-if scenarios for Omri Association Dashboard
+Evaluates a grid of support assumptions (a monthly uplift per child, new
+widows taken on per month and yearly donation growth) against the widow
+commitments and projected donations in one broadcast scenario x month pass,
+and tabulates the total cost, coverage and first deficit month of each
+"""
+
+import itertools
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.projections import DEFAULT_HORIZON, commitment_matrix, month_keys
+from src.runway import first_deficit
+
+PARAMETERS = ("child_uplift", "intake", "donation_growth")
+
+# Support and children of a new widow, when the sheet gives no typical values
+DEFAULT_NEW_WIDOW_AMOUNT = 1000.0
+DEFAULT_NEW_WIDOW_CHILDREN = 0.0
+
+
+def scenario_grid(
+    child_uplift: Sequence[float] = (0.0,),
+    intake: Sequence[float] = (0.0,),
+    donation_growth: Sequence[float] = (0.0,),
+) -> pd.DataFrame:
+    """Every combination of the parameter values, one scenario per row.
+
+    ``child_uplift`` is added to the monthly support per child, ``intake`` is
+    the number of new widows per month and ``donation_growth`` the yearly
+    growth of donations (0.05 for 5%).
+    """
+    return pd.DataFrame(
+        list(itertools.product(child_uplift, intake, donation_growth)),
+        columns=list(PARAMETERS),
+        dtype=float,
+    )
+
+
+def evaluate_scenarios(
+    commitments: pd.DataFrame,
+    grid: pd.DataFrame,
+    donations: Optional[float],
+    horizon: int = DEFAULT_HORIZON,
+    start: Optional[pd.Timestamp] = None,
+    starting_balance: float = 0.0,
+    new_widow_amount: Optional[float] = None,
+    new_widow_children: Optional[float] = None,
+) -> pd.DataFrame:
+    """Cost, coverage and first deficit of every scenario of ``grid``.
+
+    ``commitments`` are projections.widow_commitments and ``donations`` the
+    monthly donations today (projections.projected_donations). New widows
+    join from the first month, open-ended, with the median support and mean
+    children of the widows active then unless given. Returns ``grid`` with
+    ``total_cost``, ``total_donations``, ``coverage``, ``final_balance``,
+    ``months_funded`` and ``deficit_month`` (YYYYMM, missing when the
+    balance never drops below zero).
+    """
+    start = pd.Timestamp.today() if start is None else pd.Timestamp(start)
+    first = start.year * 12 + start.month - 1
+    months = first + np.arange(horizon, dtype=np.int64)
+    amounts = commitments["amount"].to_numpy(dtype=float)
+    children = (
+        commitments["children"].to_numpy(dtype=float)
+        if "children" in commitments.columns
+        else np.zeros(len(commitments))
+    )
+    active = commitment_matrix(
+        commitments["start"].to_numpy(dtype=float), commitments["end"].to_numpy(dtype=float), months
+    )
+    required = amounts @ active
+    active_children = children @ active
+
+    current = active[:, 0]
+    if new_widow_amount is None:
+        new_widow_amount = (
+            float(np.median(amounts[current])) if current.any() else DEFAULT_NEW_WIDOW_AMOUNT
+        )
+    if new_widow_children is None:
+        new_widow_children = (
+            float(children[current].mean()) if current.any() else DEFAULT_NEW_WIDOW_CHILDREN
+        )
+
+    # Scenario x month: existing commitments plus the new widows taken on so far
+    uplift = grid["child_uplift"].to_numpy(dtype=float)[:, None]
+    intake = grid["intake"].to_numpy(dtype=float)[:, None]
+    growth = grid["donation_growth"].to_numpy(dtype=float)[:, None]
+    joined = intake * np.arange(1, horizon + 1)
+    cost = (
+        required
+        + uplift * active_children
+        + joined * (new_widow_amount + uplift * new_widow_children)
+    )
+    income = (0.0 if donations is None else donations) * (1.0 + growth) ** (np.arange(horizon) / 12)
+    balances = starting_balance + np.cumsum(income - cost, axis=1)
+
+    funded = first_deficit(balances)
+    keys = month_keys(months)
+    total_cost = cost.sum(axis=1)
+    total_donations = income.sum(axis=1)
+    result = grid.reset_index(drop=True).copy()
+    result["total_cost"] = total_cost
+    result["total_donations"] = total_donations
+    result["coverage"] = np.divide(
+        total_donations, total_cost, out=np.full(len(grid), np.nan), where=total_cost > 0
+    )
+    result["final_balance"] = balances[:, -1]
+    result["months_funded"] = funded
+    deficit_month = pd.array(keys[np.minimum(funded, horizon - 1)], dtype="Int64")
+    deficit_month[funded >= horizon] = pd.NA
+    result["deficit_month"] = deficit_month
+    return result
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Differential worksheet writes for Omri Association Dashboard
+Compares a DataFrame with the current contents of a worksheet and builds the
+minimal set of changed cell ranges, so a write only uploads what was edited
+"""
+
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from src.sheets_backend import SERIAL_EPOCH
+
+
+def _cell_value(value: Any) -> Any:
+    """Convert a DataFrame cell into a JSON-serialisable worksheet value."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple, dict)):
+        return str(value)
+    if pd.isna(value):
+        return ""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        if (value.hour, value.minute, value.second, value.microsecond) == (0, 0, 0, 0):
+            return value.strftime("%Y-%m-%d")
+        return value.isoformat(sep=" ")
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def frame_to_rows(df: pd.DataFrame) -> List[List[Any]]:
+    """Return the header row plus data rows that ``df`` occupies in a worksheet."""
+    rows = [[str(col) for col in df.columns]]
+    rows.extend([_cell_value(value) for value in row] for row in df.itertuples(index=False))
+    return rows
+
+
+def _as_text(value: Any) -> str:
+    """Canonical text of a cell, so 5000, 5000.0 and "5000" compare equal."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _serial_text(value: Any) -> Optional[str]:
+    """Canonical text of the serial number of an ISO date cell, or None if not a date."""
+    if not isinstance(value, str) or len(value) < 10 or value[4:5] != "-":
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return _as_text((moment - SERIAL_EPOCH) / datetime.timedelta(days=1))
+
+
+def _same_cell(old: Any, new: Any) -> bool:
+    """True if a typed (UNFORMATTED_VALUE/SERIAL_NUMBER) cell already holds ``new``."""
+    old_text, new_text = _as_text(old), _as_text(new)
+    if old_text == new_text:
+        return True
+    # Dates are written as ISO text but typed reads return date cells as serials
+    return isinstance(old, (int, float)) and _serial_text(new) == old_text
+
+
+def _changed_runs(current: List[Any], target: List[Any]) -> List[Tuple[int, int]]:
+    """Return (first, last) column spans of the cells that differ between two rows."""
+    runs = []
+    start = None
+    width = max(len(current), len(target))
+    for col in range(width):
+        old = current[col] if col < len(current) else ""
+        new = target[col] if col < len(target) else ""
+        if not _same_cell(old, new):
+            if start is None:
+                start = col
+        elif start is not None:
+            runs.append((start, col - 1))
+            start = None
+    if start is not None:
+        runs.append((start, width - 1))
+    return runs
+
+
+def diff_rows(current: List[List[Any]], target: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Return worksheet ``batch_update`` data turning ``current`` into ``target``.
+
+    Each entry is ``{"range": "B3:C4", "values": [...]}``. Changed cells in the
+    same columns of consecutive rows are merged into one rectangle, so appended
+    rows become a single block. Rows and cells that exist only in ``current``
+    are blanked out.
+    """
+    blocks: List[Dict[str, int]] = []
+    open_blocks: Dict[Tuple[int, int], Dict[str, int]] = {}
+    for row in range(max(len(current), len(target))):
+        old = current[row] if row < len(current) else []
+        new = target[row] if row < len(target) else []
+        still_open = {}
+        for run in _changed_runs(old, new):
+            block = open_blocks.get(run)
+            if block is None:
+                block = {"first_row": row, "last_row": row, "first_col": run[0], "last_col": run[1]}
+                blocks.append(block)
+            block["last_row"] = row
+            still_open[run] = block
+        open_blocks = still_open
+
+    data = []
+    for block in blocks:
+        values = []
+        for row in range(block["first_row"], block["last_row"] + 1):
+            source = target[row] if row < len(target) else []
+            values.append(
+                [
+                    source[col] if col < len(source) else ""
+                    for col in range(block["first_col"], block["last_col"] + 1)
+                ]
+            )
+        first = rowcol_to_a1(block["first_row"] + 1, block["first_col"] + 1)
+        last = rowcol_to_a1(block["last_row"] + 1, block["last_col"] + 1)
+        data.append({"range": f"{first}:{last}", "values": values})
+    return data
+
+
+def count_cells(data: List[Dict[str, Any]]) -> int:
+    """Number of cells written by ``batch_update`` data."""
+    return sum(len(row) for entry in data for row in entry["values"])
+
+
+class SheetContentsCache:
+    """Last written contents of worksheets, tagged with the spreadsheet revision.
+
+    A cached entry is only trusted while the spreadsheet revision is unchanged,
+    i.e. nobody edited the sheet since it was written.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[str, List[List[Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, spreadsheet_id: str, title: str, revision: Optional[str]):
+        """Return the cached rows if they were stored at ``revision``, else None."""
+        if revision is None:
+            return None
+        with self._lock:
+            entry = self._entries.get((spreadsheet_id, title))
+        if entry is None or entry[0] != revision:
+            return None
+        return entry[1]
+
+    def store(
+        self, spreadsheet_id: str, title: str, revision: Optional[str], rows: List[List[Any]]
+    ) -> None:
+        """Remember ``rows`` as the contents of ``title`` at ``revision``."""
+        with self._lock:
+            if revision is None:
+                self._entries.pop((spreadsheet_id, title), None)
+            else:
+                self._entries[(spreadsheet_id, title)] = (revision, rows)
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None) -> None:
+        """Forget the cached contents of one spreadsheet, or of all of them."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == spreadsheet_id]:
+                    del self._entries[key]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Spreadsheet metadata cache for Omri Association Dashboard
+Keeps one opened spreadsheet handle per workbook and a title/alias -> worksheet
+index built from a single metadata fetch, so worksheet lookups are local
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import gspread
+
+# Logical sheet name -> actual worksheet titles to try, in order
+SHEET_ALIASES = {
+    "Widows": ["Almanot", "Widows"],
+    "Widows Support": ["Widows Support", "Widows", "Almanot"],
+}
+
+
+def is_structure_error(exc: Exception) -> bool:
+    """True if ``exc`` suggests the workbook structure changed (tab renamed/deleted)."""
+    if isinstance(exc, gspread.exceptions.WorksheetNotFound):
+        return True
+    if isinstance(exc, gspread.exceptions.APIError):
+        message = str(exc).lower()
+        return "unable to parse range" in message or "no grid with id" in message
+    return False
+
+
+class SheetIndex:
+    """An opened spreadsheet plus its worksheets indexed by title and sheet id."""
+
+    def __init__(self, backend, spreadsheet, worksheets: Iterable):
+        self.backend = backend
+        self.spreadsheet = spreadsheet
+        self.worksheets = list(worksheets)
+        self.by_title = {ws.title: ws for ws in self.worksheets}
+        self.by_id = {getattr(ws, "id", None): ws for ws in self.worksheets}
+        self.fetched_at = time.time()
+
+    @property
+    def titles(self) -> List[str]:
+        """Worksheet titles in workbook order."""
+        return [ws.title for ws in self.worksheets]
+
+    def resolve(self, name: str, use_aliases: bool = True, fallback_first: bool = False):
+        """Return the worksheet for ``name`` (trying its aliases), or None."""
+        candidates = SHEET_ALIASES.get(name, [name]) if use_aliases else [name]
+        for title in candidates:
+            if title in self.by_title:
+                return self.by_title[title]
+        if fallback_first and self.worksheets:
+            return self.worksheets[0]
+        return None
+
+
+class SheetIndexCache:
+    """Process-wide cache of SheetIndex objects keyed by spreadsheet id.
+
+    A workbook is opened and its worksheets listed once; later lookups are
+    resolved locally. The index is rebuilt only when a lookup misses or a caller
+    reports a structure change through ``invalidate``.
+
+    ``call`` wraps the metadata requests (e.g. a request scheduler's ``call``).
+    """
+
+    def __init__(self, call: Optional[Callable[..., Any]] = None):
+        self._call = call or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+        self._indexes: Dict[str, SheetIndex] = {}
+        self._lock = threading.Lock()
+        self.metadata_fetches = 0
+
+    def get(self, backend, spreadsheet_id: str) -> SheetIndex:
+        """Return the cached index for ``spreadsheet_id``, building it on first use."""
+        with self._lock:
+            index = self._indexes.get(spreadsheet_id)
+            if index is not None and index.backend is backend:
+                return index
+        return self._build(backend, spreadsheet_id, spreadsheet=None)
+
+    def refresh(self, backend, spreadsheet_id: str) -> SheetIndex:
+        """Re-list the worksheets of an already opened spreadsheet (one metadata fetch)."""
+        with self._lock:
+            index = self._indexes.get(spreadsheet_id)
+        spreadsheet = index.spreadsheet if index is not None and index.backend is backend else None
+        return self._build(backend, spreadsheet_id, spreadsheet)
+
+    def worksheet(
+        self,
+        backend,
+        spreadsheet_id: str,
+        name: str,
+        use_aliases: bool = True,
+        fallback_first: bool = False,
+    ):
+        """Resolve ``name`` to a worksheet, re-listing the tabs once if it is missing.
+
+        Raises gspread.exceptions.WorksheetNotFound if the tab does not exist.
+        """
+        worksheet = self.get(backend, spreadsheet_id).resolve(name, use_aliases, fallback_first)
+        if worksheet is None:
+            # The tab may have been added or renamed since the index was built
+            worksheet = self.refresh(backend, spreadsheet_id).resolve(
+                name, use_aliases, fallback_first
+            )
+        if worksheet is None:
+            raise gspread.exceptions.WorksheetNotFound(name)
+        return worksheet
+
+    def invalidate(self, spreadsheet_id: Optional[str] = None) -> None:
+        """Forget the index of one spreadsheet, or of all of them."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(spreadsheet_id, None)
+
+    def _build(self, backend, spreadsheet_id: str, spreadsheet) -> SheetIndex:
+        if spreadsheet is None:
+            spreadsheet = self._call(backend.open, spreadsheet_id)
+        worksheets = self._call(backend.list_worksheets, spreadsheet)
+        index = SheetIndex(backend, spreadsheet, worksheets)
+        with self._lock:
+            self._indexes[spreadsheet_id] = index
+            self.metadata_fetches += 1
+        logging.info(f"Indexed {len(index.worksheets)} worksheets of spreadsheet {spreadsheet_id}")
+        return index
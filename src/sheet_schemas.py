@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Declarative sheet schemas for Omri Association Dashboard
+Each sheet declares its header row, column aliases and column kinds once; the
+compiled schema turns raw worksheet rows into a typed DataFrame in a single
+vectorized pass per column, for read_sheet and load_all_data alike
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.date_parsing import parse_dates
+
+# Column kinds
+TEXT = "text"
+DATE = "date"
+AMOUNT = "amount"
+
+# Keywords used to infer the kind of columns of sheets without a declared schema
+DATE_KEYWORDS = ("תאריך", "date", "חודש", "month")
+AMOUNT_KEYWORDS = ("סכום", "amount", "שקלים", "מחיר", "price", "חודשי")
+
+# Everything except digits, the decimal point and the minus sign (currency
+# symbols, thousands separators, spaces)
+AMOUNT_NOISE_PATTERN = r"[^\d.\-]"
+
+
+def _fix_headers(headers: Sequence[Any]) -> List[str]:
+    """Return a list of unique, non-empty headers. Empty headers get a default name. Duplicates get a suffix."""
+    seen: Dict[str, int] = {}
+    fixed = []
+    for i, h in enumerate(headers):
+        name = _cell_text(h).strip()
+        if not name:
+            name = f"עמודה_{i+1}"
+        orig_name = name
+        count = seen.get(name, 0)
+        if count:
+            name = f"{orig_name}_{count+1}"
+        seen[orig_name] = count + 1
+        fixed.append(name)
+    return fixed
+
+
+def _cell_text(value: Any) -> str:
+    """Text of a cell as the sheet shows it (typed reads return 1500 for "1500")."""
+    if value is None or value is pd.NA:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _map_unique(series: pd.Series, convert, missing) -> np.ndarray:
+    """Apply ``convert`` to the distinct values of ``series`` only and broadcast back.
+
+    Ledger columns repeat the same dates and amounts many times, so converting
+    the uniques is much cheaper than converting every cell.
+    """
+    codes, uniques = pd.factorize(series)
+    converted = np.asarray(convert(pd.Series(uniques, dtype=object)))
+    # Code -1 (missing cell) picks the trailing ``missing`` value
+    return np.append(converted, np.array([missing], dtype=converted.dtype))[codes]
+
+
+def _clean_amounts(values: pd.Series) -> pd.Series:
+    numbers = values.map(_is_number).to_numpy(dtype=bool)
+    result = np.zeros(len(values), dtype="float64")
+    if numbers.any():
+        # Typed reads: already numbers, no text cleaning needed
+        result[numbers] = values[numbers].to_numpy(dtype="float64")
+    if not numbers.all():
+        text = values[~numbers].astype(str).str.replace(AMOUNT_NOISE_PATTERN, "", regex=True)
+        result[~numbers] = pd.to_numeric(text, errors="coerce").fillna(0).to_numpy("float64")
+    return pd.Series(result, index=values.index)
+
+
+def parse_amounts(series: pd.Series) -> pd.Series:
+    """Convert amount cells ("₪ 1,500", "250", 300.0) to floats, missing -> 0.
+
+    Numeric cells (typed reads) are taken as they are; only text cells go
+    through the regex cleaning.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors="coerce").fillna(0)
+    return pd.Series(_map_unique(series, _clean_amounts, 0.0), index=series.index)
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """One output column: its name, the source headers it may come from and its kind."""
+
+    name: str
+    aliases: Tuple[str, ...] = ()
+    kind: str = TEXT
+    default: Any = ""  # value of the column when the sheet does not have it
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    """Declarative description of how a worksheet becomes a DataFrame.
+
+    ``header_row`` is the 0-based row holding the headers (data follows it).
+    With ``keep_extra_columns`` undeclared columns are kept (text); otherwise
+    only the declared columns are returned, in declaration order.
+    ``drop_patterns`` drop rows whose raw text in a column matches a regex
+    (repeated header or title rows inside the data). ``typed_values`` marks
+    sheets that may be read unformatted: numbers and serial dates instead of
+    display strings.
+    """
+
+    name: str
+    titles: Tuple[str, ...]
+    header_row: int = 0
+    columns: Tuple[ColumnSpec, ...] = ()
+    keep_extra_columns: bool = False
+    drop_empty_rows: bool = False
+    drop_patterns: Tuple[Tuple[str, str], ...] = ()
+    infer_kinds: bool = False
+    typed_values: bool = False  # safe to fetch unformatted (no IDs/phones with leading zeros)
+
+    def empty_frame(self) -> pd.DataFrame:
+        """Empty frame with the declared columns."""
+        return pd.DataFrame(columns=[column.name for column in self.columns])
+
+
+@dataclass
+class CompiledSchema:
+    """A SheetSchema with its alias lookup and row filters prepared."""
+
+    schema: SheetSchema
+    sources: Dict[str, str] = field(default_factory=dict)  # source header -> column name
+    drop_patterns: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def compile(cls, schema: SheetSchema) -> "CompiledSchema":
+        sources = {}
+        for column in schema.columns:
+            for source in (column.name,) + column.aliases:
+                sources.setdefault(source, column.name)
+        return cls(schema=schema, sources=sources, drop_patterns=schema.drop_patterns)
+
+    def _resolve_columns(self, headers: List[str]) -> Tuple[Dict[int, str], List[ColumnSpec]]:
+        """Map header positions to output names; return the specs of the output columns."""
+        schema = self.schema
+        renamed: Dict[int, str] = {}
+        taken = set()
+        for position, header in enumerate(headers):
+            target = self.sources.get(header.strip())
+            if target is not None and target not in taken:
+                renamed[position] = target
+                taken.add(target)
+        specs = {column.name: column for column in schema.columns}
+        if schema.keep_extra_columns:
+            for position, header in enumerate(headers):
+                if position not in renamed and header not in taken:
+                    renamed[position] = header
+                    taken.add(header)
+                    if header not in specs:
+                        specs[header] = (
+                            _infer_spec(header) if schema.infer_kinds else ColumnSpec(header)
+                        )
+            order = [renamed[p] for p in sorted(renamed)]
+            order += [column.name for column in schema.columns if column.name not in taken]
+        else:
+            order = [column.name for column in schema.columns]
+        return renamed, [specs[name] for name in order]
+
+    def parse(self, values: List[List[Any]], sheet: Optional[str] = None) -> pd.DataFrame:
+        """Turn raw worksheet rows (header rows included) into a typed DataFrame.
+
+        ``sheet`` keys the cached date formats (defaults to the schema name).
+        """
+        schema = self.schema
+        if len(values) <= schema.header_row:
+            return schema.empty_frame() if schema.columns else pd.DataFrame()
+
+        # The values API trims trailing empty cells; pad every row to one width
+        width = max(len(row) for row in values)
+        header_row = list(values[schema.header_row])
+        headers = _fix_headers(header_row + [""] * (width - len(header_row)))
+        renamed, specs = self._resolve_columns(headers)
+
+        positions = sorted(renamed)
+        # Short rows are padded with None by the DataFrame constructor; columns
+        # missing from every row come from reindex and must stay object too
+        raw = pd.DataFrame(values[schema.header_row + 1 :], dtype=object)
+        raw = raw.reindex(columns=range(width)).iloc[:, positions].astype(object)
+        raw.columns = [renamed[p] for p in positions]
+        raw = raw.replace("", None).fillna(pd.NA)
+
+        if schema.drop_patterns and len(raw):
+            keep = np.ones(len(raw), dtype=bool)
+            for column, pattern in self.drop_patterns:
+                if column in raw.columns:
+                    matches = _map_unique(
+                        raw[column], lambda v, p=pattern: v.astype(str).str.contains(p), False
+                    )
+                    keep &= ~matches
+            raw = raw[keep]
+        if schema.drop_empty_rows and len(raw):
+            declared = [c.name for c in schema.columns if c.name in raw.columns]
+            raw = raw.dropna(how="all", subset=declared or None)
+
+        df = pd.DataFrame(index=raw.index)
+        for spec in specs:
+            if spec.name in raw.columns:
+                df[spec.name] = _convert(raw[spec.name], spec.kind, sheet or schema.name)
+            else:
+                df[spec.name] = spec.default
+        return df.reset_index(drop=True)
+
+
+def parse_text(series: pd.Series) -> pd.Series:
+    """Keep text cells as strings; numbers from typed reads become their display text."""
+    if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        return series
+    texts = _map_unique(series, lambda values: values.map(_cell_text).to_numpy(object), None)
+    return pd.Series(texts, index=series.index, dtype=object).fillna(pd.NA)
+
+
+def _convert(series: pd.Series, kind: str, sheet: str) -> pd.Series:
+    if kind == DATE:
+        return parse_dates(series, sheet=sheet, column=series.name)
+    if kind == AMOUNT:
+        return parse_amounts(series)
+    return parse_text(series)
+
+
+@lru_cache(maxsize=512)
+def _infer_spec(header: str) -> ColumnSpec:
+    """Infer the kind of an undeclared column from keywords in its header."""
+    lowered = header.lower()
+    if any(keyword in lowered for keyword in DATE_KEYWORDS) and "סכום" not in lowered:
+        return ColumnSpec(header, kind=DATE)
+    if any(keyword in lowered for keyword in AMOUNT_KEYWORDS):
+        return ColumnSpec(header, kind=AMOUNT)
+    return ColumnSpec(header)
+
+
+def _ledger(name: str, name_aliases: Tuple[str, ...], title_words: str) -> SheetSchema:
+    """Financial ledger: title row, header row, then date / name / amount rows."""
+    return SheetSchema(
+        name=name,
+        titles=(name,),
+        header_row=1,
+        columns=(
+            ColumnSpec("תאריך", aliases=("NaT",), kind=DATE),
+            ColumnSpec("שם", aliases=name_aliases),
+            ColumnSpec("שקלים", aliases=("סכום",), kind=AMOUNT),
+        ),
+        drop_empty_rows=True,
+        typed_values=True,
+        drop_patterns=(
+            ("תאריך", f"עמרי|{title_words}|תאריך|שם|לקוח|סכום"),
+            ("שם", "שם לקוח|שם תורם|שם משקיע"),
+            ("שקלים", "סכום"),
+        ),
+    )
+
+
+SCHEMAS = {
+    "Expenses": _ledger("Expenses", ("שם לקוח", "שם ספק"), "הוצאות"),
+    "Donations": _ledger("Donations", ("שם התורם", "שם לקוח"), "תרומות"),
+    "Investors": _ledger("Investors", ("שם התורם", "שם לקוח"), "משקיעים"),
+    "Widows": SheetSchema(
+        name="Widows",
+        titles=("Widows", "Almanot"),
+        columns=(
+            ColumnSpec("שם ", aliases=("שם",)),
+            ColumnSpec("סכום חודשי", kind=AMOUNT),
+            ColumnSpec("חודש התחלה", kind=DATE),
+            ColumnSpec("מייל"),
+            ColumnSpec("טלפון"),
+            ColumnSpec("תעודת זהות"),
+            ColumnSpec("מספר ילדים"),
+            ColumnSpec("חללים"),
+            ColumnSpec("הערות"),
+            ColumnSpec("תורם"),
+            ColumnSpec("איש קשר לתרומה"),
+        ),
+        keep_extra_columns=True,
+    ),
+    "Widows Support": SheetSchema(
+        name="Widows Support",
+        titles=("Widows Support",),
+        columns=(
+            ColumnSpec("שם הבחורה"),
+            ColumnSpec("כמה ילדים"),
+            ColumnSpec("סכום חודשי"),
+            ColumnSpec("מתי התחילה לקבל"),
+            ColumnSpec("עד מתי תחת תורם"),
+            ColumnSpec("כמה מקבלת בכל חודש"),
+            ColumnSpec("תורם"),
+        ),
+        keep_extra_columns=True,
+    ),
+}
+
+# Sheets without a declared schema: first row is the header, kinds inferred from header keywords
+GENERIC_SCHEMA = SheetSchema(name="generic", titles=(), keep_extra_columns=True, infer_kinds=True)
+
+_COMPILED = {name: CompiledSchema.compile(schema) for name, schema in SCHEMAS.items()}
+_COMPILED_GENERIC = CompiledSchema.compile(GENERIC_SCHEMA)
+_BY_TITLE = {title: _COMPILED[name] for name, schema in SCHEMAS.items() for title in schema.titles}
+
+
+def get_schema(name_or_title: str) -> Optional[SheetSchema]:
+    """Return the declared schema for a logical sheet name or worksheet title."""
+    compiled = _COMPILED.get(name_or_title) or _BY_TITLE.get(name_or_title)
+    return compiled.schema if compiled else None
+
+
+def fetch_typed(name_or_title: str) -> bool:
+    """True if ``name_or_title`` declares a schema that may be read unformatted."""
+    schema = get_schema(name_or_title)
+    return schema is not None and schema.typed_values
+
+
+def parse_sheet(name_or_title: str, values: List[List[Any]]) -> pd.DataFrame:
+    """Parse raw worksheet rows with the schema of ``name_or_title`` (generic if undeclared)."""
+    compiled = _COMPILED.get(name_or_title) or _BY_TITLE.get(name_or_title) or _COMPILED_GENERIC
+    if not values:
+        return compiled.schema.empty_frame() if compiled.schema.columns else pd.DataFrame()
+    # Sheets without a schema keep their date formats under their own title
+    return compiled.parse(values, None if compiled.schema.columns else name_or_title)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Paged streaming reads of large worksheets for Omri Association Dashboard
+Fetches fixed-size row ranges and parses each page straight into a typed frame
+with the sheet's schema, so the raw rows of only one page are held at a time;
+pages can be consumed one by one or concatenated once at the end
+"""
+
+from typing import Any, Callable, Iterator, List, Optional
+
+import pandas as pd
+
+from src.sheet_schemas import get_schema, parse_sheet
+
+# Rows fetched per page
+PAGE_ROWS = 5000
+
+# ``fetch(ranges)`` returns the rows of each A1 range, like SheetsBackend.batch_read
+Fetch = Callable[[List[str]], List[List[List[Any]]]]
+
+
+def header_row_count(sheet_name: str) -> int:
+    """Number of rows up to and including the header row of ``sheet_name``."""
+    schema = get_schema(sheet_name)
+    return (schema.header_row if schema else 0) + 1
+
+
+def iter_sheet_pages(
+    fetch: Fetch,
+    quoted_title: str,
+    sheet_name: str,
+    page_rows: int = PAGE_ROWS,
+    row_count: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the data of a worksheet as typed DataFrames of up to ``page_rows`` rows.
+
+    The header rows are fetched together with the first page and reused to parse
+    every page with the schema of ``sheet_name``. With a known ``row_count``
+    (the worksheet grid size) pages are read up to it, so blank stretches inside
+    the data do not end the stream; otherwise the first empty page ends it.
+    Page frames have a fresh RangeIndex.
+    """
+    if page_rows <= 0:
+        raise ValueError("page_rows must be positive")
+    header_rows = header_row_count(sheet_name)
+    start = header_rows + 1
+    header_values, page = fetch(
+        [f"{quoted_title}!1:{header_rows}", f"{quoted_title}!{start}:{start + page_rows - 1}"]
+    )
+    if len(header_values) < header_rows:
+        return
+    while True:
+        if page:
+            yield parse_sheet(sheet_name, header_values + page)
+        start += page_rows
+        if row_count is not None:
+            if start > row_count:
+                return
+        elif not page:
+            return
+        (page,) = fetch([f"{quoted_title}!{start}:{start + page_rows - 1}"])
+
+
+def collect_pages(pages: Iterator[pd.DataFrame], empty: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate streamed pages once, or return ``empty`` if there were none."""
+    frames = list(pages)
+    if not frames:
+        return empty
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
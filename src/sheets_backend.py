@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Pluggable data access backends for Omri Association Dashboard
+GspreadBackend talks to Google Sheets; LocalBackend serves CSV/Parquet fixtures
+(or in-memory rows) with injected latency, for offline profiling and load tests
+"""
+
+import csv
+import datetime
+import logging
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+
+# Drive metadata endpoint used for cheap change detection
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/{}"
+
+# Typed reads: numbers as numbers and dates/times as spreadsheet serial numbers
+# (days since 1899-12-30) instead of display strings such as "₪ 1,500"
+TYPED_RENDER_PARAMS = {
+    "valueRenderOption": "UNFORMATTED_VALUE",
+    "dateTimeRenderOption": "SERIAL_NUMBER",
+}
+SERIAL_EPOCH = datetime.datetime(1899, 12, 30)
+
+
+class SheetsBackend(ABC):
+    """Operations the dashboard needs from a spreadsheet store.
+
+    Spreadsheet and worksheet handles are opaque to callers, except that
+    worksheets expose ``title`` (and, where known, ``id``, ``row_count`` and
+    ``col_count``). Ranges use A1 notation with quoted sheet titles.
+
+    Reads return formatted cell strings by default; with ``typed=True`` numbers
+    come back as numbers and dates as serial numbers (see TYPED_RENDER_PARAMS),
+    while text cells stay strings.
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    def open(self, spreadsheet_id: str) -> Any:
+        """Return a handle for the spreadsheet ``spreadsheet_id``."""
+
+    @abstractmethod
+    def list_worksheets(self, spreadsheet: Any) -> List[Any]:
+        """Return the worksheets of ``spreadsheet`` in workbook order."""
+
+    @abstractmethod
+    def batch_read(
+        self, spreadsheet: Any, ranges: List[str], typed: bool = False
+    ) -> List[List[List[Any]]]:
+        """Return the rows of each A1 range (one list of rows per range, in order)."""
+
+    @abstractmethod
+    def read_worksheet(self, worksheet: Any, typed: bool = False) -> List[List[Any]]:
+        """Return all rows of ``worksheet``, padded to a uniform width."""
+
+    @abstractmethod
+    def batch_write(self, worksheet: Any, data: List[Dict[str, Any]]) -> None:
+        """Write ``[{"range": "A1:B2", "values": [...]}, ...]`` to ``worksheet``."""
+
+    @abstractmethod
+    def resize(self, worksheet: Any, rows: int, cols: int) -> None:
+        """Grow the grid of ``worksheet`` to at least ``rows`` x ``cols``."""
+
+    @abstractmethod
+    def revision(self, spreadsheet_id: str) -> Optional[str]:
+        """Return a marker that changes whenever the spreadsheet is edited (or None)."""
+
+
+def _get_http_session(client):
+    """Return the authorized requests session behind a gspread client."""
+    # gspread 6 moved the session onto client.http_client
+    http_client = getattr(client, "http_client", client)
+    return http_client.session
+
+
+class GspreadBackend(SheetsBackend):
+    """Google Sheets through an authorized gspread client."""
+
+    name = "gspread"
+
+    def __init__(self, client):
+        self.client = client
+
+    def open(self, spreadsheet_id: str) -> Any:
+        return self.client.open_by_key(spreadsheet_id)
+
+    def list_worksheets(self, spreadsheet: Any) -> List[Any]:
+        return spreadsheet.worksheets()
+
+    def batch_read(
+        self, spreadsheet: Any, ranges: List[str], typed: bool = False
+    ) -> List[List[List[Any]]]:
+        if typed:
+            response = spreadsheet.values_batch_get(ranges, params=dict(TYPED_RENDER_PARAMS))
+        else:
+            response = spreadsheet.values_batch_get(ranges)
+        value_ranges = response.get("valueRanges", []) if isinstance(response, dict) else []
+        return [
+            value_ranges[i].get("values", []) if i < len(value_ranges) else []
+            for i in range(len(ranges))
+        ]
+
+    def read_worksheet(self, worksheet: Any, typed: bool = False) -> List[List[Any]]:
+        if typed:
+            return worksheet.get_all_values(
+                value_render_option=TYPED_RENDER_PARAMS["valueRenderOption"],
+                date_time_render_option=TYPED_RENDER_PARAMS["dateTimeRenderOption"],
+            )
+        return worksheet.get_all_values()
+
+    def batch_write(self, worksheet: Any, data: List[Dict[str, Any]]) -> None:
+        worksheet.batch_update(data)
+
+    def resize(self, worksheet: Any, rows: int, cols: int) -> None:
+        row_count = getattr(worksheet, "row_count", None)
+        col_count = getattr(worksheet, "col_count", None)
+        if isinstance(row_count, int) and rows > row_count:
+            worksheet.add_rows(rows - row_count)
+        if isinstance(col_count, int) and cols > col_count:
+            worksheet.add_cols(cols - col_count)
+
+    def revision(self, spreadsheet_id: str) -> Optional[str]:
+        """One Drive files.get request for the file ``version`` and ``modifiedTime``."""
+        response = _get_http_session(self.client).get(
+            DRIVE_FILES_URL.format(spreadsheet_id),
+            params={"fields": "version,modifiedTime", "supportsAllDrives": "true"},
+        )
+        response.raise_for_status()
+        metadata = response.json()
+        return f"{metadata.get('version', '')}:{metadata.get('modifiedTime', '')}"
+
+
+def _to_serial(value: datetime.date) -> float:
+    """Spreadsheet serial number of a date or datetime."""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return (value - SERIAL_EPOCH) / datetime.timedelta(days=1)
+
+
+def _typed_cell(value: Any) -> Any:
+    """Render a stored cell as UNFORMATTED_VALUE/SERIAL_NUMBER would."""
+    if isinstance(value, bool) or value is None:
+        return "" if value is None else value
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, (datetime.date, pd.Timestamp)):
+        return _to_serial(value)
+    text = str(value)
+    try:
+        # Plain numbers entered as text in a fixture are numeric cells in a real sheet
+        number = float(text)
+    except ValueError:
+        return text
+    if not math.isfinite(number):
+        return text
+    return int(number) if number.is_integer() and "." not in text else number
+
+
+def _formatted_cell(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _trim(rows: List[List[Any]]) -> List[List[Any]]:
+    """Drop trailing empty cells and rows, as the Sheets values API does."""
+    trimmed = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] in ("", None):
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class LocalWorksheet:
+    """A worksheet held in memory as a list of rows."""
+
+    def __init__(self, title: str, sheet_id: int, rows: List[List[Any]]):
+        self.title = title
+        self.id = sheet_id
+        self.rows = [list(row) for row in rows]
+        self.row_count = max(len(self.rows), 1000)
+        self.col_count = max([len(row) for row in self.rows] + [26])
+
+    def __repr__(self):
+        return f"<LocalWorksheet {self.title!r} rows={len(self.rows)}>"
+
+
+class LocalSpreadsheet:
+    """A named collection of LocalWorksheets with a write counter as revision."""
+
+    def __init__(self, spreadsheet_id: str, sheets: Dict[str, List[List[Any]]]):
+        self.id = spreadsheet_id
+        self.worksheets = [
+            LocalWorksheet(title, sheet_id, rows)
+            for sheet_id, (title, rows) in enumerate(sheets.items())
+        ]
+        self.version = 1
+
+    def worksheet(self, title: str) -> LocalWorksheet:
+        for worksheet in self.worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+
+def _read_fixture(path: str) -> List[List[Any]]:
+    """Read a CSV (raw grid) or Parquet (header + rows) fixture file as rows."""
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+        rows = [[str(col) for col in frame.columns]]
+        rows.extend(["" if pd.isna(v) else str(v) for v in row] for row in frame.to_numpy())
+        return rows
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [list(row) for row in csv.reader(f)]
+
+
+def load_fixture_workbooks(directory: str) -> Dict[str, Dict[str, List[List[Any]]]]:
+    """Read ``<directory>/<spreadsheet_id>/<sheet title>.csv|.parquet`` fixtures."""
+    workbooks: Dict[str, Dict[str, List[List[Any]]]] = {}
+    if not os.path.isdir(directory):
+        logging.warning(f"Fixture directory {directory} does not exist")
+        return workbooks
+    for spreadsheet_id in sorted(os.listdir(directory)):
+        workbook_dir = os.path.join(directory, spreadsheet_id)
+        if not os.path.isdir(workbook_dir):
+            continue
+        sheets = {}
+        for file_name in sorted(os.listdir(workbook_dir)):
+            title, ext = os.path.splitext(file_name)
+            if ext in (".csv", ".parquet"):
+                sheets[title] = _read_fixture(os.path.join(workbook_dir, file_name))
+        workbooks[spreadsheet_id] = sheets
+    return workbooks
+
+
+class LocalBackend(SheetsBackend):
+    """Offline backend serving workbooks from fixtures or in-memory rows.
+
+    Every request sleeps ``latency`` seconds plus up to ``jitter`` seconds, so
+    profiles resemble a remote store. Writes change the in-memory rows only and
+    bump the spreadsheet revision. ``requests`` counts calls per operation.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        workbooks: Optional[Dict[str, Dict[str, List[List[Any]]]]] = None,
+        directory: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        sources = load_fixture_workbooks(directory) if directory else {}
+        sources.update(workbooks or {})
+        self.spreadsheets = {sid: LocalSpreadsheet(sid, sheets) for sid, sheets in sources.items()}
+        self.latency = latency
+        self.jitter = jitter
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+
+    def _request(self, operation: str) -> None:
+        with self._lock:
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            self._sleep(delay)
+
+    def open(self, spreadsheet_id: str) -> LocalSpreadsheet:
+        self._request("open")
+        if spreadsheet_id not in self.spreadsheets:
+            raise KeyError(f"No local workbook for spreadsheet {spreadsheet_id}")
+        return self.spreadsheets[spreadsheet_id]
+
+    def list_worksheets(self, spreadsheet: LocalSpreadsheet) -> List[LocalWorksheet]:
+        self._request("list_worksheets")
+        return list(spreadsheet.worksheets)
+
+    def _read_range(self, spreadsheet: LocalSpreadsheet, a1: str) -> List[List[Any]]:
+        quoted, _, cells = a1.partition("!")
+        title = quoted[1:-1].replace("''", "'") if quoted.startswith("'") else quoted
+        rows = spreadsheet.worksheet(title).rows
+        if not cells:
+            return _trim(rows)
+        # Slice before trimming, so paged reads do not copy the whole sheet each time
+        grid = a1_range_to_grid_range(cells)
+        first_row = grid.get("startRowIndex", 0)
+        last_row = grid.get("endRowIndex", len(rows))
+        first_col = grid.get("startColumnIndex", 0)
+        last_col = grid.get("endColumnIndex")
+        return _trim([row[first_col:last_col] for row in rows[first_row:last_row]])
+
+    def batch_read(
+        self, spreadsheet: LocalSpreadsheet, ranges: List[str], typed: bool = False
+    ) -> List[List[List[Any]]]:
+        self._request("batch_read")
+        with self._lock:
+            fetched = [self._read_range(spreadsheet, a1) for a1 in ranges]
+        # The values API returns formatted (string) cells unless asked for typed ones
+        render = _typed_cell if typed else _formatted_cell
+        return [[[render(v) for v in row] for row in rows] for rows in fetched]
+
+    def read_worksheet(self, worksheet: LocalWorksheet, typed: bool = False) -> List[List[Any]]:
+        self._request("read_worksheet")
+        with self._lock:
+            rows = _trim(worksheet.rows)
+        width = max((len(row) for row in rows), default=0)
+        render = _typed_cell if typed else _formatted_cell
+        return [[render(v) for v in row] + [""] * (width - len(row)) for row in rows]
+
+    def batch_write(self, worksheet: LocalWorksheet, data: List[Dict[str, Any]]) -> None:
+        self._request("batch_write")
+        with self._lock:
+            for entry in data:
+                start_row, start_col = a1_to_rowcol(entry["range"].split(":")[0])
+                for r, values in enumerate(entry["values"]):
+                    row_index = start_row - 1 + r
+                    while len(worksheet.rows) <= row_index:
+                        worksheet.rows.append([])
+                    row = worksheet.rows[row_index]
+                    for c, value in enumerate(values):
+                        col_index = start_col - 1 + c
+                        row.extend([""] * (col_index + 1 - len(row)))
+                        row[col_index] = value
+            for spreadsheet in self.spreadsheets.values():
+                if worksheet in spreadsheet.worksheets:
+                    spreadsheet.version += 1
+
+    def resize(self, worksheet: LocalWorksheet, rows: int, cols: int) -> None:
+        self._request("resize")
+        worksheet.row_count = max(worksheet.row_count, rows)
+        worksheet.col_count = max(worksheet.col_count, cols)
+
+    def revision(self, spreadsheet_id: str) -> Optional[str]:
+        self._request("revision")
+        spreadsheet = self.spreadsheets.get(spreadsheet_id)
+        return None if spreadsheet is None else f"local:{spreadsheet.version}"
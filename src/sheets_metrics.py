@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Instrumentation of Google Sheets requests for Omri Association Dashboard
+RequestScheduler reports every call here (call type, sheet, rows and bytes
+returned, latency, retries and throttles); SheetsMetrics keeps aggregate
+counters, latency percentiles and quota usage and renders them as JSON or
+Prometheus text
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Sequence
+
+import numpy as np
+
+# Most recent latencies kept per call type for the percentiles
+LATENCY_SAMPLES = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Quota usage is the number of requests per kind in this trailing window
+QUOTA_WINDOW_SECONDS = 60.0
+
+# Counters kept per call type
+CALL_COUNTERS = ("calls", "errors", "retries", "throttled", "rows", "bytes", "seconds", "queued")
+
+
+def sheet_of_range(a1: str) -> str:
+    """Worksheet title of an A1 range such as ``'Donations'!A2:C10``."""
+    if not a1.endswith("'") and "!" in a1:
+        a1 = a1.rsplit("!", 1)[0]
+    if len(a1) >= 2 and a1[0] == a1[-1] == "'":
+        a1 = a1[1:-1].replace("''", "'")
+    return a1
+
+
+def payload_size(values: Any) -> int:
+    """Estimated size in bytes of a values payload (a list of rows) as UTF-8 JSON.
+
+    Adds up the UTF-8 length of every cell plus the quotes, commas and brackets
+    around them instead of serializing the payload, so sizing a large read costs
+    a pass over its cells.
+    """
+    size = 0
+    for row in values:
+        size += 2 + sum(len(str(cell).encode("utf-8")) + 4 for cell in row)  # '"cell", ' '], '
+    return max(size, 2)
+
+
+def _prune(recent: Deque[float], now: float) -> None:
+    """Drop the request times that left the quota window."""
+    while recent and recent[0] <= now - QUOTA_WINDOW_SECONDS:
+        recent.popleft()
+
+
+def _title(worksheet: Any) -> str:
+    return str(getattr(worksheet, "title", ""))
+
+
+def sheet_sizes(call: str, args: Sequence[Any], result: Any) -> Dict[str, tuple]:
+    """Return ``{sheet: (rows, bytes)}`` moved by one backend call.
+
+    Reads count the rows returned, writes the rows sent; spreadsheet-level calls
+    (open, list_worksheets, revision) are attributed to the sheet ``""``.
+    """
+    try:
+        if call == "batch_read" and len(args) > 1:
+            sizes: Dict[str, list] = {}
+            for a1, values in zip(args[1], result or []):
+                size = sizes.setdefault(sheet_of_range(a1), [0, 0])
+                size[0] += len(values)
+                size[1] += payload_size(values)
+            return {sheet: tuple(size) for sheet, size in sizes.items()}
+        if call == "read_worksheet" and args:
+            return {_title(args[0]): (len(result or []), payload_size(result or []))}
+        if call == "batch_write" and len(args) > 1:
+            rows = [row for update in args[1] for row in update.get("values", [])]
+            return {_title(args[0]): (len(rows), payload_size(rows))}
+        if args and hasattr(args[0], "title") and not isinstance(args[0], str):
+            return {_title(args[0]): (0, 0)}
+    except Exception as e:  # never let instrumentation break a request
+        logging.debug(f"Could not size {call} call: {e}")
+    return {"": (0, 0)}
+
+
+def _percentiles(samples) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {f"p{int(q * 100)}": None for q in QUANTILES}
+    values = np.percentile(np.fromiter(samples, dtype=float), [q * 100 for q in QUANTILES])
+    return {f"p{int(q * 100)}": float(v) for q, v in zip(QUANTILES, values)}
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SheetsMetrics:
+    """Thread-safe aggregates of the Sheets calls made by this process.
+
+    With ``export_path`` the Prometheus text is also written to that file (for
+    the node_exporter textfile collector) at most every ``export_interval``
+    seconds.
+    """
+
+    def __init__(
+        self,
+        export_path: Optional[str] = None,
+        export_interval: float = 15.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._quotas: Dict[str, int] = {}
+        self._last_export = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._calls: Dict[str, Dict[str, float]] = {}
+            self._latency: Dict[str, Deque[float]] = {}
+            self._sheets: Dict[str, Dict[str, int]] = {}
+            self._recent: Dict[str, Deque[float]] = {}
+            self._started = time.time()
+
+    def set_quotas(self, quotas: Dict[str, int]) -> None:
+        """Per-minute quota of each request kind, for the usage gauges."""
+        with self._lock:
+            self._quotas = dict(quotas)
+
+    def observe(
+        self,
+        fn: Callable[..., Any],
+        args: Sequence[Any],
+        result: Any,
+        kind: str,
+        seconds: float,
+        queued: float = 0.0,
+        retries: int = 0,
+        throttled: int = 0,
+        ok: bool = True,
+    ) -> None:
+        """Record one call as made by RequestScheduler.call (retries included)."""
+        call = getattr(fn, "__name__", "call")
+        sizes = sheet_sizes(call, args, result) if ok else {"": (0, 0)}
+        now = self._clock()
+        with self._lock:
+            counters = self._calls.setdefault(call, dict.fromkeys(CALL_COUNTERS, 0))
+            counters["calls"] += 1
+            counters["errors"] += 0 if ok else 1
+            counters["retries"] += retries
+            counters["throttled"] += throttled
+            counters["rows"] += sum(rows for rows, _ in sizes.values())
+            counters["bytes"] += sum(size for _, size in sizes.values())
+            counters["seconds"] += seconds
+            counters["queued"] += queued
+            self._latency.setdefault(call, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+            for sheet, (rows, size) in sizes.items():
+                totals = self._sheets.setdefault(sheet, {"calls": 0, "rows": 0, "bytes": 0})
+                totals["calls"] += 1
+                totals["rows"] += rows
+                totals["bytes"] += size
+            # Each attempt (retries included) takes one quota token
+            recent = self._recent.setdefault(kind, deque())
+            recent.extend([now] * (retries + 1))
+            _prune(recent, now)
+        self._maybe_export(now)
+
+    def _quota_usage(self, now: float) -> Dict[str, Dict[str, float]]:
+        usage = {}
+        for kind in sorted(set(self._quotas) | set(self._recent)):
+            recent = self._recent.get(kind, deque())
+            _prune(recent, now)
+            limit = self._quotas.get(kind)
+            usage[kind] = {
+                "used": len(recent),
+                "limit": limit,
+                "ratio": len(recent) / limit if limit else None,
+            }
+        return usage
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters and latency percentiles per call type, per sheet and in total."""
+        with self._lock:
+            calls = {
+                call: {**counters, **_percentiles(self._latency[call])}
+                for call, counters in sorted(self._calls.items())
+            }
+            totals = {name: sum(c[name] for c in self._calls.values()) for name in CALL_COUNTERS}
+            totals.update(_percentiles([s for samples in self._latency.values() for s in samples]))
+            return {
+                "since": self._started,
+                "calls": calls,
+                "sheets": {sheet: dict(t) for sheet, t in sorted(self._sheets.items())},
+                "totals": totals,
+                "quota": self._quota_usage(self._clock()),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render the summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_text = ",".join(f'{key}="{_label(str(v))}"' for key, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value:g}" if labels else f"{name} {value:g}")
+
+        calls = summary["calls"]
+        for counter, help_text in (
+            ("calls", "Sheets API calls by call type"),
+            ("errors", "Sheets API calls that failed"),
+            ("retries", "Retried attempts after HTTP 429/5xx"),
+            ("throttled", "HTTP 429 responses"),
+            ("rows", "Rows returned (reads) or sent (writes)"),
+            ("bytes", "JSON bytes returned (reads) or sent (writes)"),
+        ):
+            family(
+                f"sheets_{counter}_total",
+                "counter",
+                help_text,
+                [({"call": call}, c[counter]) for call, c in calls.items()],
+            )
+        latency = []
+        for call, c in calls.items():
+            for q in QUANTILES:
+                latency.append(({"call": call, "quantile": str(q)}, c[f"p{int(q * 100)}"]))
+        family(
+            "sheets_request_latency_seconds",
+            "summary",
+            "Latency of Sheets API calls (retries included, quota queueing excluded)",
+            latency,
+        )
+        for call, c in calls.items():
+            lines.append(
+                f'sheets_request_latency_seconds_sum{{call="{_label(call)}"}} {c["seconds"]:g}'
+            )
+            lines.append(
+                f'sheets_request_latency_seconds_count{{call="{_label(call)}"}} {c["calls"]:g}'
+            )
+        family(
+            "sheets_queued_seconds_total",
+            "counter",
+            "Seconds spent waiting for a quota token",
+            [({"call": call}, c["queued"]) for call, c in calls.items()],
+        )
+        sheets = summary["sheets"]
+        family(
+            "sheets_sheet_rows_total",
+            "counter",
+            "Rows moved per worksheet",
+            [({"sheet": sheet}, t["rows"]) for sheet, t in sheets.items() if sheet],
+        )
+        family(
+            "sheets_sheet_bytes_total",
+            "counter",
+            "Bytes moved per worksheet",
+            [({"sheet": sheet}, t["bytes"]) for sheet, t in sheets.items() if sheet],
+        )
+        quota = summary["quota"]
+        family(
+            "sheets_quota_requests",
+            "gauge",
+            f"Requests in the last {QUOTA_WINDOW_SECONDS:g} seconds by kind",
+            [({"kind": kind}, q["used"]) for kind, q in quota.items()],
+        )
+        family(
+            "sheets_quota_limit",
+            "gauge",
+            "Per-minute request quota by kind",
+            [({"kind": kind}, q["limit"]) for kind, q in quota.items()],
+        )
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Optional[str] = None) -> None:
+        """Atomically write the Prometheus text to ``path`` (default ``export_path``)."""
+        path = path or self.export_path
+        if not path:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def _maybe_export(self, now: float) -> None:
+        if not self.export_path:
+            return
+        with self._lock:
+            if self._last_export is not None and now - self._last_export < self.export_interval:
+                return
+            self._last_export = now
+        try:
+            self.export()
+        except OSError as e:
+            logging.warning(f"Could not export Sheets metrics to {self.export_path}: {e}")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Quota-aware request scheduler for Google Sheets calls
+Rate limits requests with token buckets sized to the project quota, serves
+interactive requests before background ones, and retries 429/5xx responses with
+jittered exponential backoff
+"""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.sheets_metrics import SheetsMetrics
+
+# Priority lanes - lower values are served first
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+LANE_PRIORITY = {INTERACTIVE: 0, BACKGROUND: 1}
+
+# Request kinds, each with its own per-minute quota
+READ = "read"
+WRITE = "write"
+
+# HTTP statuses worth retrying: quota exceeded and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+_CURRENT_LANE = contextvars.ContextVar("sheets_request_lane", default=INTERACTIVE)
+
+
+def status_code_of(exc: Exception) -> Optional[int]:
+    """Return the HTTP status behind a gspread APIError or requests HTTPError."""
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Return the Retry-After delay (seconds) sent with a throttled response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` tokens, refilled at ``rate`` tokens per second."""
+
+    def __init__(self, capacity: float, rate: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def take(self) -> float:
+        """Take one token if available and return 0, else return the seconds to wait."""
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class RequestScheduler:
+    """Single gate for all Google Sheets requests.
+
+    ``call`` waits for a token of the request kind's bucket (read or write), with
+    waiters ordered by lane so interactive requests overtake queued background
+    ones, then runs the request and retries throttled (429) or failed (5xx)
+    responses with jittered exponential backoff. Counters are exposed by ``stats``;
+    with ``metrics`` every call is also recorded there (latency, rows, bytes).
+    """
+
+    def __init__(
+        self,
+        read_quota_per_minute: int = 60,
+        write_quota_per_minute: int = 60,
+        burst_seconds: float = 10.0,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        metrics: Optional[SheetsMetrics] = None,
+    ):
+        self.max_retries = max_retries
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.set_quotas({READ: read_quota_per_minute, WRITE: write_quota_per_minute})
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._buckets = {
+            kind: TokenBucket(max(1.0, quota * burst_seconds / 60), quota / 60, clock)
+            for kind, quota in ((READ, read_quota_per_minute), (WRITE, write_quota_per_minute))
+        }
+        self._waiters: Dict[str, list] = {READ: [], WRITE: []}
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._counters = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "server_errors": 0,
+            "failures": 0,
+            "queued_seconds": 0.0,
+            INTERACTIVE: 0,
+            BACKGROUND: 0,
+        }
+
+    @staticmethod
+    @contextlib.contextmanager
+    def lane(name: str):
+        """Run the requests made inside the ``with`` block in lane ``name``."""
+        token = _CURRENT_LANE.set(name)
+        try:
+            yield
+        finally:
+            _CURRENT_LANE.reset(token)
+
+    def _acquire(self, kind: str, lane: str) -> float:
+        """Block until a ``kind`` token is granted to this request; return seconds waited."""
+        started = time.monotonic()
+        ticket = (LANE_PRIORITY.get(lane, 0), next(self._sequence))
+        waiters = self._waiters[kind]
+        with self._cond:
+            heapq.heappush(waiters, ticket)
+            try:
+                while True:
+                    if waiters[0] == ticket:
+                        wait = self._buckets[kind].take()
+                        if wait == 0:
+                            heapq.heappop(waiters)
+                            ticket = None
+                            self._cond.notify_all()
+                            return time.monotonic() - started
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                if ticket is not None:  # interrupted while queued
+                    waiters.remove(ticket)
+                    heapq.heapify(waiters)
+                    self._cond.notify_all()
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        """Jittered exponential delay before retry number ``attempt`` (0-based)."""
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        retry_after = _retry_after(exc)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._cond:
+            self._counters[name] += amount
+
+    def call(self, fn: Callable[..., Any], *args, kind: str = READ, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` under the quota, retrying 429/5xx responses.
+
+        The last error is re-raised once ``max_retries`` retries are exhausted.
+        """
+        lane = _CURRENT_LANE.get()
+        attempt = 0
+        throttled = 0
+        queued_total = 0.0
+        started = time.perf_counter()
+        result = None
+        ok = False
+        try:
+            while True:
+                queued = self._acquire(kind, lane)
+                queued_total += queued
+                self._count("requests")
+                self._count(lane)
+                self._count("queued_seconds", queued)
+                try:
+                    result = fn(*args, **kwargs)
+                    ok = True
+                    return result
+                except Exception as exc:
+                    status = status_code_of(exc)
+                    if status not in RETRYABLE_STATUSES:
+                        raise
+                    throttled += status == 429
+                    self._count("throttled" if status == 429 else "server_errors")
+                    if attempt >= self.max_retries:
+                        self._count("failures")
+                        logging.error(f"Sheets request failed after {attempt} retries: {exc}")
+                        raise
+                    delay = self._backoff(attempt, exc)
+                    logging.warning(
+                        f"Sheets request got HTTP {status} ({lane}); "
+                        f"retry {attempt + 1} in {delay:.1f}s"
+                    )
+                    self._count("retries")
+                    attempt += 1
+                    self._sleep(delay)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe(
+                    fn,
+                    args,
+                    result,
+                    kind=kind,
+                    seconds=time.perf_counter() - started - queued_total,
+                    queued=queued_total,
+                    retries=attempt,
+                    throttled=throttled,
+                    ok=ok,
+                )
+
+    def stats(self) -> Dict[str, float]:
+        """Return a copy of the request, retry and throttling counters."""
+        with self._cond:
+            return dict(self._counters)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Version-keyed cache for the dashboard statistics
+Results are cached by (function, dataset version, params), so a hit costs a
+dict lookup instead of hashing whole DataFrames like st.cache_data; callers opt
+in by passing the version token of the dataset their frames belong to
+"""
+
+import copy
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Cached results kept across all functions and versions (least recently used go first)
+MAX_ENTRIES = 256
+
+# Rows hashed to tell frames apart within one version
+FRAME_SAMPLE_ROWS = 32
+
+
+class StatsCache:
+    """Thread-safe LRU of computed statistics; hits return deep copies."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(self._entries[key])
+            self._misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(value)
+
+    def invalidate(self, version: Optional[str] = None) -> None:
+        """Drop the results of ``version`` (all results when None)."""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[2] == version]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+STATS_CACHE = StatsCache()
+
+
+def _frame_key(value: Any) -> Hashable:
+    """Shape, labels and a hash of a few evenly spread rows of a DataFrame or Series."""
+    rows = np.unique(np.linspace(0, len(value) - 1, min(len(value), FRAME_SAMPLE_ROWS), dtype=int))
+    try:
+        sample = int(pd.util.hash_pandas_object(value.iloc[rows]).sum())
+    except TypeError:  # unhashable cells such as lists
+        sample = None
+    labels = tuple(value.columns) if isinstance(value, pd.DataFrame) else value.name
+    return ("<frame>", value.shape, labels, sample)
+
+
+def _param_key(value: Any) -> Hashable:
+    """Cache key part of one argument.
+
+    Frames are identified by the version token plus a cheap identity (shape,
+    labels and a sample of rows), so two different frames passed under one
+    version do not share a result.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _frame_key(value)
+    if hasattr(value, "version"):  # derived from a dataset version, e.g. Rollups
+        return ("<versioned>", value.version)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def cached_by_version(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Cache ``fn`` per (function, ``version``, params) when called with ``version=``.
+
+    ``version`` must be the token of the dataset the DataFrame arguments come
+    from; without it ``fn`` simply runs.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, version: Optional[str] = None, **kwargs):
+        if version is None:
+            return fn(*args, **kwargs)
+        key = (
+            fn.__module__,
+            fn.__qualname__,
+            version,
+            tuple(_param_key(arg) for arg in args),
+            tuple(sorted((name, _param_key(arg)) for name, arg in kwargs.items())),
+        )
+        return STATS_CACHE.get_or_compute(key, lambda: fn(*args, **kwargs))
+
+    return wrapper
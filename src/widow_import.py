@@ -5,11 +5,12 @@ Handles importing widow data from Google Sheets with donor assignments
 """
 
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 
+from src.date_parsing import parse_dates
 from src.google_sheets_io import read_widow_support_data
 
 
@@ -28,11 +29,18 @@ class WidowImportManager:
             "כמה מקבלת בכל חודש",
         ]
 
-    def load_widow_data(self) -> Tuple[pd.DataFrame, List[Dict]]:
-        """Load widow data from Google Sheets"""
+    def load_widow_data(self, df: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+        """Load widow data from Google Sheets
+
+        A frame already fetched alongside the dashboard data (see
+        services.sheets.fetch_all_workbooks) is reused instead of fetching again.
+        """
         try:
-            # Load data from the widow support spreadsheet
-            df = read_widow_support_data()
+            if df is None:
+                df = st.session_state.get("widow_support_df")
+            if df is None or df.empty:
+                # Load data from the widow support spreadsheet
+                df = read_widow_support_data()
 
             if df is None or df.empty:
                 st.error("❌ לא ניתן לטעון נתוני אלמנות")
@@ -99,7 +107,7 @@ class WidowImportManager:
             # Clean dates
             for date_col in ["start_date", "end_date"]:
                 if date_col in cleaned_df.columns:
-                    cleaned_df[date_col] = pd.to_datetime(cleaned_df[date_col], errors="coerce")
+                    cleaned_df[date_col] = parse_dates(cleaned_df[date_col])
 
             # Remove empty rows
             cleaned_df = cleaned_df.dropna(subset=["widow_name"])
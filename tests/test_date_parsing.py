@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Date Parsing Tests for Omri Association Dashboard
+Tests format detection, the per-column format cache and the fallbacks
+"""
+
+import unittest
+
+import pandas as pd
+
+from src.date_parsing import DateFormatCache, detect_format, parse_dates
+
+
+class TestDetectFormat(unittest.TestCase):
+    """Test format detection from a sample"""
+
+    def test_detects_dominant_format(self):
+        """The format parsing most of the sample should win"""
+        text = pd.Series(["05.01.2024", "06.01.2024", "2024-01-07"])
+        self.assertEqual(detect_format(text), "%d.%m.%Y")
+        self.assertEqual(detect_format(pd.Series(["2024-01-07"])), "%Y-%m-%d")
+
+    def test_no_format(self):
+        """Free text should not match any format"""
+        self.assertIsNone(detect_format(pd.Series(["לא תאריך"])))
+
+
+class TestParseDates(unittest.TestCase):
+    """Test parse_dates"""
+
+    def setUp(self):
+        self.cache = DateFormatCache()
+
+    def test_dates_are_day_first(self):
+        """Dates should be read day first, with several separators"""
+        parsed = parse_dates(
+            pd.Series(["05.01.2024", "06/01/2024", "2024-01-07", "", None]), cache=self.cache
+        )
+        self.assertEqual(
+            list(parsed[:3]),
+            [pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-06"), pd.Timestamp("2024-01-07")],
+        )
+        self.assertTrue(parsed[3:].isna().all())
+
+    def test_serial_dates(self):
+        """Numeric cells are spreadsheet serial dates"""
+        parsed = parse_dates(pd.Series([45296, 45296.5, "06.01.2024"]), cache=self.cache)
+        self.assertEqual(
+            list(parsed),
+            [
+                pd.Timestamp("2024-01-05"),
+                pd.Timestamp("2024-01-05 12:00"),
+                pd.Timestamp("2024-01-06"),
+            ],
+        )
+
+    def test_datetime_columns_are_not_reparsed(self):
+        """datetime64 input should be returned unchanged"""
+        series = pd.Series(pd.to_datetime(["2024-01-05"]))
+        self.assertIs(parse_dates(series, sheet="Expenses", cache=self.cache), series)
+        self.assertEqual(self.cache.formats(), {})
+
+    def test_format_is_cached_per_column(self):
+        """The format should be detected once per (sheet, column)"""
+        series = pd.Series(["05.01.2024", "06.01.2024"], name="תאריך")
+        parse_dates(series, sheet="Expenses", cache=self.cache)
+        parse_dates(series, sheet="Expenses", cache=self.cache)
+        self.assertEqual(self.cache.formats(), {("Expenses", "תאריך"): "%d.%m.%Y"})
+        self.assertEqual(self.cache.detections, 1)
+
+    def test_changed_format_is_redetected(self):
+        """A column whose format changed should still parse and update the cache"""
+        parse_dates(pd.Series(["05.01.2024"]), sheet="S", column="d", cache=self.cache)
+        parsed = parse_dates(
+            pd.Series(["2024-01-05", "2024-01-06"]), sheet="S", column="d", cache=self.cache
+        )
+        self.assertEqual(parsed[1], pd.Timestamp("2024-01-06"))
+        self.assertEqual(self.cache.get(("S", "d")), "%Y-%m-%d")
+
+    def test_unparseable_cells_are_missing(self):
+        """Cells no format or fallback understands should become NaT"""
+        parsed = parse_dates(pd.Series(["05.01.2024", "בקרוב"]), cache=self.cache)
+        self.assertTrue(pd.isna(parsed[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
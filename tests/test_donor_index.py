@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Donor Index Tests for Omri Association Dashboard
+Tests the factorized per-donor totals and the top-k selection
+"""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import calculate_donor_statistics
+from src.data_visualization import create_donor_contribution_chart
+from src.donor_index import build_donor_index, top_k
+from src.incremental import build_aggregates
+from tests.test_incremental import open_all_months
+from tests.test_rollups import make_ledger
+
+
+def make_donations(rows=500, seed=0):
+    return make_ledger(rows, seed, names=60, missing_dates=30, missing_names=40)
+
+
+class TestTopK(unittest.TestCase):
+    """Test the partial selection against a full stable sort"""
+
+    def test_matches_stable_sort(self):
+        values = np.random.default_rng(1).integers(0, 20, 300).astype(float)
+        expected = np.argsort(-values, kind="stable")[:10]
+        np.testing.assert_array_equal(top_k(values, 10), expected)
+
+    def test_short_and_empty(self):
+        np.testing.assert_array_equal(top_k(np.array([1.0, 3.0]), 10), [1, 0])
+        self.assertEqual(len(top_k(np.array([]), 10)), 0)
+
+
+class TestDonorIndex(unittest.TestCase):
+    """Test the per-donor arrays against a groupby on the names"""
+
+    def setUp(self):
+        self.df = make_donations()
+        self.index = build_donor_index(self.df)
+        self.grouped = self.df.groupby("שם").agg(
+            sum=("שקלים", "sum"),
+            count=("שקלים", "count"),
+            first_date=("תאריך", "min"),
+            last_date=("תאריך", "max"),
+        )
+
+    def test_matches_groupby(self):
+        frame = self.index.frame().set_index("name")
+        frame.index.name = "שם"
+        pd.testing.assert_frame_equal(
+            frame, self.grouped, check_dtype=False, check_index_type=False
+        )
+
+    def test_ranking_and_top(self):
+        expected = self.grouped["sum"].sort_values(ascending=False, kind="stable")
+        self.assertEqual(list(self.index.ranking().index), list(expected.index))
+        self.assertEqual(list(self.index.top(5)["name"]), list(expected.index[:5]))
+
+    def test_lookup(self):
+        name = self.grouped.index[3]
+        donor = self.index.lookup(name)
+        self.assertEqual(donor["sum"], self.grouped.loc[name, "sum"])
+        self.assertEqual(donor["last_date"], self.grouped.loc[name, "last_date"])
+        self.assertIsNone(self.index.lookup("לא קיים"))
+
+    def test_missing_columns_give_empty_index(self):
+        self.assertEqual(len(build_donor_index(self.df[["תאריך"]])), 0)
+        self.assertEqual(len(build_donor_index(None)), 0)
+
+
+class TestIndexFromAggregates(unittest.TestCase):
+    """Test the index derived from the incrementally maintained donor totals"""
+
+    def setUp(self):
+        open_all_months(self)
+        self.df = make_donations(seed=3)
+        self.aggregates = build_aggregates({"Donations": self.df}, "v1")
+
+    def assert_same_index(self, index, df):
+        expected = build_donor_index(df)
+        pd.testing.assert_frame_equal(index.frame(), expected.frame(), check_dtype=False)
+
+    def test_full_build(self):
+        self.assert_same_index(self.aggregates.donor_index(), self.df)
+        self.assertEqual(self.aggregates.donor_index().version, "v1")
+
+    def test_changes_that_move_first_and_last_dates(self):
+        dated = self.df.dropna(subset=["שם", "תאריך"])
+        first_rows = dated.groupby("שם")["תאריך"].idxmin()
+        last_rows = dated.groupby("שם")["תאריך"].idxmax()
+        new = self.df.drop(index=first_rows.iloc[:5])
+        new.loc[last_rows.iloc[10], "תאריך"] = pd.Timestamp("2023-01-01")
+        new = pd.concat([new, make_donations(20, seed=4)], ignore_index=True)
+        aggregates = build_aggregates(
+            {"Donations": new}, "v2", {"Donations": self.df}, self.aggregates
+        )
+        self.assertEqual(aggregates.changes["Donations"]["deleted"], 5)
+        self.assert_same_index(aggregates.donor_index(), new)
+
+
+class TestConsumers(unittest.TestCase):
+    """Test that statistics and charts read a shared index"""
+
+    def setUp(self):
+        self.df = make_donations(seed=2)
+        self.index = build_donor_index(self.df)
+
+    def test_statistics_use_index(self):
+        expected = calculate_donor_statistics(self.df)
+        with patch("src.data_processing.build_donor_index", side_effect=AssertionError):
+            stats = calculate_donor_statistics(self.df, donor_index=self.index)
+        self.assertEqual(stats, expected)
+        self.assertEqual(stats["total_donors"], self.df["שם"].nunique())
+
+    def test_chart_uses_index(self):
+        with patch("src.data_visualization.build_donor_index", side_effect=AssertionError):
+            fig = create_donor_contribution_chart(self.df, self.index)
+        self.assertEqual(list(fig.data[0].y), list(self.index.top(10)["name"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Frame Compaction Tests for Omri Association Dashboard
+Tests the post-ingestion dtype compaction and its memory report
+"""
+
+import unittest
+
+import pandas as pd
+
+from src.data_processing import calculate_donor_statistics, calculate_expense_statistics
+from src.frame_compaction import compact_frame, compact_frames, memory_report
+from tests.test_rollups import make_ledger
+
+
+class TestCompactFrame(unittest.TestCase):
+    """Test compact_frame"""
+
+    def test_dtypes(self):
+        """Repeated names become categoricals, unique text Arrow strings, counts small ints"""
+        df = pd.DataFrame(
+            {
+                "שם": pd.Series(["א", "א", "ב", "א"], dtype=object),
+                "הערות": pd.Series(["x", "y", None, "z"], dtype=object),
+                "מספר ילדים": pd.Series(["2", "3", None, "1"], dtype=object),
+                "שקלים": [1.0, 2.0, 3.0, 4.0],
+                "מעורב": pd.Series([1, "a", 2, "b"], dtype=object),
+            }
+        )
+        compacted = compact_frame(df)
+        self.assertIsInstance(compacted["שם"].dtype, pd.CategoricalDtype)
+        self.assertEqual(compacted["הערות"].dtype.storage, "pyarrow")
+        self.assertEqual(str(compacted["מספר ילדים"].dtype), "UInt8")
+        self.assertEqual(compacted["שקלים"].dtype, "float64")
+        self.assertEqual(compacted["מעורב"].dtype, object)
+        self.assertEqual(list(compacted["שם"]), ["א", "א", "ב", "א"])
+        self.assertTrue(pd.isna(compacted["הערות"][2]))
+
+    def test_does_not_modify_input(self):
+        """The original frame should keep its dtypes"""
+        df = make_ledger(200, names=7)
+        compact_frame(df)
+        self.assertEqual(df["שם"].dtype, object)
+
+    def test_statistics_unchanged(self):
+        """Dashboard statistics should be identical on compacted frames"""
+        df = make_ledger(200, names=7)
+        compacted = compact_frame(df)
+        self.assertEqual(calculate_donor_statistics(compacted), calculate_donor_statistics(df))
+        filtered = compacted[compacted["שם"] == "תורם 1"]
+        stats = calculate_expense_statistics(filtered)
+        self.assertEqual(stats, calculate_expense_statistics(df[df["שם"] == "תורם 1"]))
+        self.assertEqual(list(stats["expense_categories"]), ["תורם 1"])
+
+
+class TestMemoryReport(unittest.TestCase):
+    """Test memory_report"""
+
+    def test_report_shows_savings(self):
+        """Compaction should shrink the name column and report it"""
+        frames = {"Donations": make_ledger(200, names=7), "Empty": pd.DataFrame()}
+        by_frame, by_column = memory_report(frames, compact_frames(frames))
+        donations = by_frame.set_index("frame").loc["Donations"]
+        self.assertLess(donations["bytes_after"], donations["bytes_before"])
+        name = by_column[by_column["column"] == "שם"].iloc[0]
+        self.assertEqual(name["dtype_after"], "category")
+        self.assertGreater(name["saved_pct"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
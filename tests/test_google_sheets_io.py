@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Google Sheets I/O Tests for Omri Association Dashboard
+Tests the Sheets loading layer against in-memory fake spreadsheets
+"""
+
+import re
+import unittest
+from unittest.mock import patch
+
+import gspread
+import pandas as pd
+
+import src.google_sheets_io as sheets_io
+from src.change_detection import RevisionCache
+from src.sheet_index import SheetIndexCache
+from src.sheets_backend import GspreadBackend
+from src.sheets_metrics import SheetsMetrics
+from src.sheets_scheduler import RequestScheduler
+from tests.test_sheet_diff import apply_updates
+
+
+class FakeWorksheet:
+    """Minimal stand-in for gspread.Worksheet"""
+
+    def __init__(self, title, values, typed_values=None):
+        self.title = title
+        self.values = values
+        self.typed_values = typed_values
+        self.row_count = 1000
+        self.col_count = 26
+        self.updates = []
+        self.reads = 0
+
+    def get_all_values(self, value_render_option=None, date_time_render_option=None):
+        self.reads += 1
+        if value_render_option is not None and self.typed_values is not None:
+            return self.typed_values
+        return self.values
+
+    def batch_update(self, data):
+        self.updates.append(data)
+        self.values = apply_updates(self.values, data)
+
+    def add_rows(self, rows):
+        self.row_count += rows
+
+    def add_cols(self, cols):
+        self.col_count += cols
+
+
+class FakeSpreadsheet:
+    """Minimal stand-in for gspread.Spreadsheet that counts API calls"""
+
+    def __init__(self, sheets):
+        self.sheets = {title: FakeWorksheet(title, values) for title, values in sheets.items()}
+        self.batch_calls = []
+        self.metadata_calls = 0
+
+    def worksheets(self):
+        self.metadata_calls += 1
+        return list(self.sheets.values())
+
+    def worksheet(self, title):
+        return self.sheets[title]
+
+    def values_batch_get(self, ranges, params=None):
+        self.batch_calls.append(list(ranges))
+        value_ranges = []
+        for a1 in ranges:
+            quoted, _, cells = a1.partition("!")
+            title = quoted.strip("'").replace("''", "'")
+            if title not in self.sheets:
+                raise gspread.exceptions.APIError(
+                    FakeResponse(
+                        {"error": {"code": 400, "message": f"Unable to parse range: {a1}"}}
+                    )
+                )
+            values = self.sheets[title].values
+            if cells:
+                # Row-bounded ranges such as "1:2" or "A5:C"; columns are ignored
+                match = re.match(r"[A-Z]*(\d+):[A-Z]*(\d*)$", cells)
+                first, last = int(match.group(1)), match.group(2)
+                values = values[first - 1 : int(last) if last else len(values)]
+            value_ranges.append({"range": a1, "values": values})
+        return {"valueRanges": value_ranges}
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.text = str(payload)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Authorized session stand-in answering Drive metadata requests"""
+
+    def __init__(self):
+        self.version = "1"
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        return FakeResponse({"version": self.version, "modifiedTime": "2024-01-01T00:00:00Z"})
+
+
+class FakeClient:
+    """Minimal stand-in for gspread.Client"""
+
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+        self.session = FakeSession()
+
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+
+def use_unthrottled_scheduler(test):
+    """Route the test's Sheets calls through a scheduler with a practically unlimited quota"""
+    metrics = SheetsMetrics()
+    scheduler = RequestScheduler(
+        read_quota_per_minute=60000, write_quota_per_minute=60000, metrics=metrics
+    )
+    for name, value in (
+        ("METRICS", metrics),
+        ("SCHEDULER", scheduler),
+        ("SHEET_INDEX", SheetIndexCache(call=scheduler.call)),
+    ):
+        patcher = patch.object(sheets_io, name, value)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+def make_workbook():
+    """Build a fake workbook with the real sheet layout"""
+    return FakeSpreadsheet(
+        {
+            "Expenses": [
+                ["עמרי למען משפחות השכול- הוצאות"],
+                ["תאריך", "שם ספק", "סכום"],
+                ["01.01.2024", "ספק א", "1,000"],
+                ["02.01.2024", "ספק ב", "₪ 250"],
+            ],
+            "Donations": [
+                ["עמרי למען משפחות השכול- תרומות"],
+                ["תאריך", "שם התורם", "סכום"],
+                ["05.01.2024", "תורם א", "5000"],
+            ],
+            "Almanot": [
+                ["שם", "סכום חודשי", "מספר ילדים"],
+                ["אלמנה א", "2000"],
+            ],
+            "Unused": [["a", "b"], ["1", "2"]],
+        }
+    )
+
+
+class TestBatchedLoadAllData(unittest.TestCase):
+    """Test the single-round-trip workbook loader"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.LEDGER_SYNC.invalidate()
+        self.workbook = make_workbook()
+        patcher = patch.object(
+            sheets_io, "get_google_sheets_client", return_value=FakeClient(self.workbook)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_loads_all_sheets_in_one_batch_request(self):
+        """All worksheets should be fetched with exactly one batchGet"""
+        all_data = sheets_io.load_all_data()
+        self.assertEqual(len(self.workbook.batch_calls), 1)
+        self.assertEqual(set(all_data), {"Expenses", "Donations", "Almanot", "Unused"})
+
+    def test_only_requested_sheets_are_fetched(self):
+        """Passing sheet names should restrict the batch to those tabs"""
+        all_data = sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+        self.assertEqual(len(self.workbook.batch_calls), 1)
+        self.assertNotIn("'Unused'", self.workbook.batch_calls[0])
+        self.assertNotIn("Unused", all_data)
+
+    def test_frames_are_split_and_cleaned(self):
+        """Each tab should become its own cleaned DataFrame"""
+        all_data = sheets_io.load_all_data()
+        expenses = all_data["Expenses"]
+        self.assertEqual(list(expenses.columns), ["תאריך", "שם", "שקלים"])
+        self.assertEqual(len(expenses), 2)
+        self.assertTrue(pd.api.types.is_numeric_dtype(expenses["שקלים"]))
+
+        # Short rows (trailing empty cells trimmed by the API) are padded
+        widows = all_data["Almanot"]
+        self.assertEqual(len(widows), 1)
+        self.assertIn("מספר ילדים", widows.columns)
+
+    def test_load_stats_are_recorded(self):
+        """Per-sheet rows, bytes and latency should be recorded"""
+        sheets_io.load_all_data()
+        stats = sheets_io.get_last_load_stats()
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["sheets"]["Expenses"]["rows"], 4)
+        self.assertGreater(stats["sheets"]["Expenses"]["bytes"], 0)
+        self.assertGreaterEqual(stats["fetch_seconds"], 0)
+        self.assertEqual(stats["total_bytes"], sum(s["bytes"] for s in stats["sheets"].values()))
+
+    def test_sheet_titles_are_quoted(self):
+        """Titles with spaces or apostrophes must be valid A1 ranges"""
+        self.assertEqual(sheets_io._quote_sheet_title("Widows Support"), "'Widows Support'")
+        self.assertEqual(sheets_io._quote_sheet_title("Don't"), "'Don''t'")
+
+    def test_no_client_returns_empty(self):
+        """Without a client the loader should degrade to an empty dict"""
+        with patch.object(sheets_io, "get_google_sheets_client", return_value=None):
+            self.assertEqual(sheets_io.load_all_data(), {})
+
+
+class TestRevisionCache(unittest.TestCase):
+    """Test revision-aware reuse of parsed results"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        self.revision = "v1"
+        self.loads = 0
+        self.cache = RevisionCache(lambda spreadsheet_id: self.revision)
+
+    def loader(self):
+        self.loads += 1
+        return pd.DataFrame({"value": [self.loads]})
+
+    def test_unchanged_revision_reuses_result(self):
+        """A second call with the same revision should not reload"""
+        first = self.cache.get_or_load("sheet", "frames", self.loader)
+        second = self.cache.get_or_load("sheet", "frames", self.loader)
+        self.assertEqual(self.loads, 1)
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.last_seen()["sheet"]["hits"], 1)
+
+    def test_changed_revision_reloads(self):
+        """A new revision marker should trigger a reload"""
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.revision = "v2"
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.cache.last_seen()["sheet"]["revision"], "v2")
+
+    def test_unknown_revision_never_caches(self):
+        """Without a marker every call should reload"""
+        self.revision = None
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_uncacheable_results_are_not_kept(self):
+        """Results rejected by the cacheable predicate should be reloaded next time"""
+        self.cache.get_or_load("sheet", "frames", self.loader, cacheable=lambda df: False)
+        self.cache.get_or_load("sheet", "frames", self.loader, cacheable=lambda df: False)
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate(self):
+        """Invalidating a spreadsheet should force a reload"""
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.cache.invalidate("sheet")
+        self.cache.get_or_load("sheet", "frames", self.loader)
+        self.assertEqual(self.loads, 2)
+
+    def test_spreadsheet_revision_uses_drive_metadata(self):
+        """The revision marker should come from one Drive files.get request"""
+        client = FakeClient(make_workbook())
+        with patch.object(sheets_io, "get_google_sheets_client", return_value=client):
+            revision = sheets_io.get_spreadsheet_revision("abc")
+        self.assertEqual(revision, "1:2024-01-01T00:00:00Z")
+        self.assertEqual(len(client.session.requests), 1)
+        self.assertTrue(client.session.requests[0][0].endswith("/files/abc"))
+
+
+class TestSheetIndexCache(unittest.TestCase):
+    """Test the cached spreadsheet handle and worksheet index"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.LEDGER_SYNC.invalidate()
+        self.workbook = make_workbook()
+        self.client = FakeClient(self.workbook)
+        self.backend = GspreadBackend(self.client)
+        self.cache = SheetIndexCache()
+
+    def test_metadata_fetched_once(self):
+        """Repeated lookups should be resolved from the cached index"""
+        for _ in range(3):
+            self.cache.worksheet(self.backend, "id", "Expenses")
+        self.assertEqual(self.workbook.metadata_calls, 1)
+
+    def test_aliases_resolved_locally(self):
+        """Widow aliases should resolve without probing through exceptions"""
+        self.assertEqual(self.cache.worksheet(self.backend, "id", "Widows").title, "Almanot")
+        self.assertEqual(
+            self.cache.worksheet(self.backend, "id", "Widows Support", fallback_first=True).title,
+            "Almanot",
+        )
+        self.assertEqual(self.workbook.metadata_calls, 1)
+
+    def test_missing_tab_reindexes_once(self):
+        """A missing tab should trigger one re-listing and then raise"""
+        self.cache.get(self.backend, "id")
+        with self.assertRaises(gspread.exceptions.WorksheetNotFound):
+            self.cache.worksheet(self.backend, "id", "Nope")
+        self.assertEqual(self.workbook.metadata_calls, 2)
+
+    def test_new_tab_found_after_reindex(self):
+        """A tab added after indexing should be found by the re-listing"""
+        self.cache.get(self.backend, "id")
+        self.workbook.sheets["New"] = FakeWorksheet("New", [["a"]])
+        self.assertEqual(self.cache.worksheet(self.backend, "id", "New").title, "New")
+
+    def test_load_all_data_reuses_index(self):
+        """Consecutive loads should not list the worksheets again"""
+        with patch.object(sheets_io, "get_google_sheets_client", return_value=self.client):
+            sheets_io.load_all_data()
+            sheets_io.load_all_data()
+        self.assertEqual(self.workbook.metadata_calls, 1)
+        self.assertEqual(len(self.workbook.batch_calls), 2)
+
+    def test_load_all_data_recovers_from_deleted_tab(self):
+        """A tab deleted after indexing should trigger a re-index instead of failing"""
+        with patch.object(sheets_io, "get_google_sheets_client", return_value=self.client):
+            sheets_io.load_all_data()
+            del self.workbook.sheets["Unused"]
+            all_data = sheets_io.load_all_data()
+        self.assertNotIn("Unused", all_data)
+        self.assertIn("Expenses", all_data)
+        self.assertEqual(self.workbook.metadata_calls, 2)
+
+
+class TestIncrementalLedgerSync(unittest.TestCase):
+    """Test the append-only sync of the Donations and Expenses ledgers"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.LEDGER_SYNC.invalidate()
+        self.addCleanup(sheets_io.LEDGER_SYNC.invalidate)
+        self.workbook = make_workbook()
+        self.donations = self.workbook.sheets["Donations"].values
+        patcher = patch.object(
+            sheets_io, "get_google_sheets_client", return_value=FakeClient(self.workbook)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_load_is_full(self):
+        """Without a baseline the ledgers should be fetched in full"""
+        sheets_io.load_all_data()
+        stats = sheets_io.get_last_load_stats()
+        self.assertEqual(stats["sheets"]["Donations"]["mode"], "full")
+        self.assertIn("'Donations'", self.workbook.batch_calls[0])
+
+    def test_appended_rows_are_fetched_incrementally(self):
+        """Only the header, trailing and new rows should be requested after a full load"""
+        sheets_io.load_all_data()
+        self.donations.append(["06.01.2024", "תורם ב", "700"])
+        all_data = sheets_io.load_all_data()
+
+        self.assertEqual(len(self.workbook.batch_calls), 2)
+        self.assertIn("'Donations'!1:2", self.workbook.batch_calls[1])
+        self.assertIn("'Donations'!A3:C", self.workbook.batch_calls[1])
+        self.assertEqual(
+            sheets_io.get_last_load_stats()["sheets"]["Donations"]["mode"], "incremental"
+        )
+        donations = all_data["Donations"]
+        self.assertEqual(list(donations["שם"]), ["תורם א", "תורם ב"])
+        self.assertEqual(list(donations["שקלים"]), [5000, 700])
+
+    def test_matches_full_reload(self):
+        """An incremental result should equal a fresh full load of the same sheet"""
+        sheets_io.load_all_data()
+        for day in range(10, 20):
+            self.donations.append([f"{day}.01.2024", f"תורם {day}", str(day * 10)])
+        incremental = sheets_io.load_all_data()["Donations"]
+
+        sheets_io.LEDGER_SYNC.invalidate()
+        full = sheets_io.load_all_data()["Donations"]
+        pd.testing.assert_frame_equal(incremental, full)
+
+    def test_edited_history_triggers_full_reload(self):
+        """A changed trailing row should fall back to fetching the whole ledger"""
+        sheets_io.load_all_data()
+        self.donations[2] = ["05.01.2024", "תורם א", "6000"]
+        all_data = sheets_io.load_all_data()
+
+        self.assertEqual(len(self.workbook.batch_calls), 3)
+        self.assertEqual(self.workbook.batch_calls[2], ["'Donations'"])
+        self.assertEqual(sheets_io.get_last_load_stats()["requests"], 3)
+        self.assertEqual(list(all_data["Donations"]["שקלים"]), [6000])
+
+    def test_older_rows_are_checked_in_a_rotating_window(self):
+        """Rows above the re-read tail should be verified a window at a time"""
+        for day in range(10, 20):
+            self.donations.append([f"{day}.01.2024", f"תורם {day}", str(day * 10)])
+        sync = sheets_io.LEDGER_SYNC
+        with patch.object(sync, "verify_rows", 4):
+            sheets_io.load_all_data()
+            self.donations.append(["21.01.2024", "תורם ב", "700"])
+            sheets_io.load_all_data()
+            self.assertIn("'Donations'!A3:C6", self.workbook.batch_calls[1])
+            self.assertEqual(
+                sheets_io.get_last_load_stats()["sheets"]["Donations"]["mode"], "incremental"
+            )
+
+            # A name edited outside the next window goes unnoticed for one refresh
+            self.donations[3][1] = "תורם מתוקן"
+            stale = sheets_io.load_all_data()
+            self.assertIn("'Donations'!A7:C9", self.workbook.batch_calls[2])
+            self.assertEqual(stale["Donations"]["שם"].iloc[1], "תורם 10")
+
+            fresh = sheets_io.load_all_data()
+            self.assertIn("'Donations'!A3:C6", self.workbook.batch_calls[3])
+            self.assertEqual(sheets_io.get_last_load_stats()["sheets"]["Donations"]["mode"], "full")
+            self.assertEqual(fresh["Donations"]["שם"].iloc[1], "תורם מתוקן")
+            self.assertEqual(len(fresh["Donations"]), 12)
+
+    def test_deleted_rows_trigger_full_reload(self):
+        """Removing synced rows should fall back to a full reload"""
+        self.donations.append(["06.01.2024", "תורם ב", "700"])
+        sheets_io.load_all_data()
+        del self.donations[-1]
+        all_data = sheets_io.load_all_data()
+        self.assertEqual(len(all_data["Donations"]), 1)
+        self.assertEqual(sheets_io.get_last_load_stats()["sheets"]["Donations"]["mode"], "full")
+
+    def test_disabled_sync_always_loads_in_full(self):
+        """With INCREMENTAL_LEDGER_SYNC off every load should fetch whole sheets"""
+        with patch.object(sheets_io, "INCREMENTAL_LEDGER_SYNC", False):
+            sheets_io.load_all_data()
+            sheets_io.load_all_data()
+        self.assertIn("'Donations'", self.workbook.batch_calls[1])
+
+
+class TestDifferentialWriteSheet(unittest.TestCase):
+    """Test that write_sheet only sends the changed ranges"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.SHEET_CONTENTS.invalidate()
+        self.addCleanup(sheets_io.SHEET_CONTENTS.invalidate)
+        self.workbook = make_workbook()
+        self.client = FakeClient(self.workbook)
+        self.sheet = self.workbook.sheets["Unused"]
+        patcher = patch.object(sheets_io, "get_google_sheets_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sheet_is_never_cleared(self):
+        """Writing should patch cells instead of clearing the worksheet"""
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["1", "3"], "b": ["2", "4"]}))
+        self.assertEqual(self.sheet.updates, [[{"range": "A3:B3", "values": [["3", "4"]]}]])
+        self.assertEqual(self.sheet.values, [["a", "b"], ["1", "2"], ["3", "4"]])
+
+    def test_unchanged_frame_sends_nothing(self):
+        """Writing identical contents should not send any update"""
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["1"], "b": ["2"]}))
+        self.assertEqual(self.sheet.updates, [])
+
+    def test_written_contents_reused_while_revision_unchanged(self):
+        """A second write should diff against the cached contents without re-reading"""
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["5"], "b": ["2"]}))
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["5"], "b": ["6"]}))
+        self.assertEqual(self.sheet.reads, 1)
+        self.assertEqual(self.sheet.values, [["a", "b"], ["5", "6"]])
+
+    def test_external_edit_forces_reread(self):
+        """A changed revision should make write_sheet read the sheet again"""
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["5"], "b": ["2"]}))
+        self.sheet.values = [["a", "b"], ["9", "9"]]
+        self.client.session.version = "2"
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["5"], "b": ["2"]}))
+        self.assertEqual(self.sheet.reads, 2)
+        self.assertEqual(self.sheet.values, [["a", "b"], ["5", "2"]])
+
+    def test_grid_grows_for_large_writes(self):
+        """Rows beyond the grid should be added before writing"""
+        self.sheet.row_count = 2
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["1", "3", "5"], "b": ["2", "4", "6"]}))
+        self.assertEqual(self.sheet.row_count, 4)
+
+    def test_resize_refreshes_sheet_index(self):
+        """After growing the grid the worksheet index should be listed again"""
+        sheets_io.SHEET_INDEX.invalidate()
+        self.addCleanup(sheets_io.SHEET_INDEX.invalidate)
+        self.sheet.row_count = 2
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["1", "3", "5"], "b": ["2", "4", "6"]}))
+        self.assertEqual(self.workbook.metadata_calls, 2)
+        sheets_io.write_sheet("Unused", pd.DataFrame({"a": ["1", "3", "7"], "b": ["2", "4", "6"]}))
+        self.assertEqual(self.workbook.metadata_calls, 2)
+
+    def test_formatted_baseline_is_not_rewritten(self):
+        """Cells shown formatted (dates, thousands) but holding the frame's values
+        should not be sent again"""
+        self.sheet.values = [["תאריך", "שקלים", "שם"], ["05.01.2024", "₪5,000", "תורם א"]]
+        self.sheet.typed_values = [["תאריך", "שקלים", "שם"], [45296, 5000, "תורם א"]]
+        frame = pd.DataFrame(
+            {"תאריך": [pd.Timestamp("2024-01-05")], "שקלים": [5000], "שם": ["תורם א"]}
+        )
+        sheets_io.write_sheet("Unused", frame)
+        self.assertEqual(self.sheet.updates, [])
+
+        sheets_io.SHEET_CONTENTS.invalidate()
+        frame.loc[0, "שקלים"] = 5200
+        sheets_io.write_sheet("Unused", frame)
+        self.assertEqual(self.sheet.updates, [[{"range": "B2:B2", "values": [[5200]]}]])
+
+
+if __name__ == "__main__":
+    unittest.main()
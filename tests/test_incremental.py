@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Incremental Aggregate Tests for Omri Association Dashboard
+Tests the row-level change capture and the totals maintained from it
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import services.refresher as refresher_module
+import src.incremental as incremental
+from services.refresher import dataset_version, load_dataset
+from src.incremental import build_aggregates, diff_frames, row_keys
+from src.multi_year import MultiYearFrames
+from src.rollups import build_rollups
+from tests.test_rollups import make_ledger
+from ui.dashboard_core import process_dashboard_data
+
+
+def make_widows(rows=30, seed=0, start="2023-01-01", days=600):
+    """A seeded random Widows sheet shared by the projection tests"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "שם ": [f"אלמנה {i}" for i in range(rows)],
+            "סכום חודשי": rng.choice([1000.0, 2000.0], rows),
+            "חודש התחלה": pd.to_datetime(start) + pd.to_timedelta(rng.integers(0, days, rows), "D"),
+            "מספר ילדים": rng.integers(0, 6, rows).astype(float),
+        }
+    )
+
+
+def open_all_months(test):
+    """Treat every month of the fixtures as open, so changes are applied as deltas"""
+    patcher = patch.object(incremental, "current_month_key", return_value=200001)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+def edited(frames):
+    """A new version: donations inserted, deleted and edited, one widow changed"""
+    donations = frames["Donations"].drop(index=[3, 10])
+    donations = pd.concat([donations, make_ledger(15, seed=9)], ignore_index=True)
+    donations.loc[0, "שקלים"] = 12345.0
+    widows = frames["Widows"].copy()
+    widows.loc[2, "סכום חודשי"] = 1500.0
+    return {"Expenses": frames["Expenses"], "Donations": donations, "Widows": widows}
+
+
+class TestDiffFrames(unittest.TestCase):
+    """Test classifying rows as inserted, updated and deleted"""
+
+    def setUp(self):
+        self.old = make_ledger(50)
+
+    def test_insert_update_delete(self):
+        new = self.old.drop(index=[7]).reset_index(drop=True)
+        new.loc[20, "שקלים"] = -1.0
+        new = pd.concat([new, make_ledger(3, seed=5)], ignore_index=True)
+        changes = diff_frames(self.old, new)
+        self.assertEqual(changes.counts(), {"inserted": 3, "updated": 1, "deleted": 1})
+        self.assertEqual(changes.updated["שקלים"].iloc[0], -1.0)
+        self.assertEqual(changes.previous["שקלים"].iloc[0], self.old.loc[21, "שקלים"])
+
+    def test_appended_rows(self):
+        new = pd.concat([self.old, make_ledger(4, seed=5)], ignore_index=True)
+        changes = diff_frames(self.old, new, row_keys(self.old))
+        self.assertEqual(changes.counts(), {"inserted": 4, "updated": 0, "deleted": 0})
+        np.testing.assert_array_equal(changes.keys, row_keys(new))
+
+    def test_reordered_rows_are_unchanged(self):
+        self.assertEqual(len(diff_frames(self.old, self.old.iloc[::-1])), 0)
+
+    def test_duplicate_rows_are_counted(self):
+        new = pd.concat([self.old, self.old.iloc[[4, 4]]], ignore_index=True)
+        self.assertEqual(diff_frames(self.old, new).counts()["inserted"], 2)
+        self.assertEqual(diff_frames(new, self.old).counts()["deleted"], 2)
+
+    def test_changed_columns_are_not_diffed(self):
+        self.assertIsNone(diff_frames(self.old, self.old.rename(columns={"שם": "שם התורם"})))
+
+
+class TestIncrementalAggregates(unittest.TestCase):
+    """Test that applying deltas gives the same statistics as a full pass"""
+
+    def setUp(self):
+        open_all_months(self)
+        self.frames = {
+            "Expenses": make_ledger(seed=1),
+            "Donations": make_ledger(seed=2),
+            "Widows": make_widows(),
+        }
+        self.new_frames = edited(self.frames)
+        self.previous = build_aggregates(self.frames, "v1")
+        self.aggregates = build_aggregates(self.new_frames, "v2", self.frames, self.previous)
+
+    def test_changes_are_recorded(self):
+        self.assertEqual(
+            self.aggregates.changes["Donations"], {"inserted": 15, "updated": 1, "deleted": 2}
+        )
+        self.assertEqual(self.aggregates.changes["Widows"]["updated"], 1)
+        self.assertIsNone(self.previous.changes["Donations"])
+
+    def test_matches_full_computation(self):
+        full = process_dashboard_data(
+            self.new_frames["Expenses"], self.new_frames["Donations"], self.new_frames["Widows"]
+        )
+        self.assertTrue(self.aggregates.complete)
+        incremental_stats = (
+            self.aggregates.budget_status(),
+            self.aggregates.donor_statistics(),
+            self.aggregates.widow_statistics(),
+        )
+        for expected, actual in zip(full, incremental_stats):
+            self.assertEqual(actual, expected)
+
+    def test_rollups_match(self):
+        expected = build_rollups(self.new_frames["Expenses"], self.new_frames["Donations"])
+        rollups = self.aggregates.rollups()
+        pd.testing.assert_series_equal(rollups.donations, expected.donations)
+        pd.testing.assert_series_equal(rollups.expenses, expected.expenses)
+
+    def test_only_changed_rows_are_aggregated(self):
+        with patch.object(incremental, "parse_amounts", wraps=incremental.parse_amounts) as spy:
+            build_aggregates(self.new_frames, "v2", self.frames, self.previous)
+        self.assertLessEqual(max(len(call.args[0]) for call in spy.call_args_list), 17)
+
+    def test_process_dashboard_data_uses_aggregates(self):
+        with patch("ui.dashboard_core.calculate_donor_statistics", side_effect=AssertionError):
+            _, donor_stats, _ = process_dashboard_data(
+                self.new_frames["Expenses"],
+                self.new_frames["Donations"],
+                self.new_frames["Widows"],
+                aggregates=self.aggregates,
+            )
+        self.assertEqual(donor_stats, self.aggregates.donor_statistics())
+
+
+class TestClosedMonths(unittest.TestCase):
+    """Test that changes to closed months are not applied as deltas"""
+
+    def setUp(self):
+        self.frames = {"Donations": make_ledger(seed=2)}
+        self.previous = build_aggregates(self.frames, "v1")
+
+    def test_change_in_a_closed_month_rebuilds(self):
+        donations = self.frames["Donations"].copy()
+        donations.loc[0, "שקלים"] = 12345.0
+        with patch.object(incremental, "current_month_key", return_value=202601):
+            aggregates = build_aggregates(
+                {"Donations": donations}, "v2", self.frames, self.previous
+            )
+        self.assertIsNone(aggregates.changes["Donations"])
+        expected = build_aggregates({"Donations": donations}, "v2")
+        pd.testing.assert_frame_equal(
+            aggregates.sheets["Donations"].get("month"), expected.sheets["Donations"].get("month")
+        )
+
+    def test_rows_in_the_open_month_are_applied(self):
+        donations = pd.concat(
+            [
+                self.frames["Donations"],
+                pd.DataFrame({"תאריך": [pd.Timestamp("2026-01-05")], "שם": ["א"], "שקלים": [5.0]}),
+            ],
+            ignore_index=True,
+        )
+        with patch.object(incremental, "current_month_key", return_value=202601):
+            aggregates = build_aggregates(
+                {"Donations": donations}, "v2", self.frames, self.previous
+            )
+        self.assertEqual(aggregates.changes["Donations"]["inserted"], 1)
+        self.assertEqual(aggregates.sheets["Donations"].get("month").loc[202601, "sum"], 5.0)
+
+
+class TestArchivedAggregates(unittest.TestCase):
+    """Test that archived years are aggregated once and added to the current totals"""
+
+    def setUp(self):
+        open_all_months(self)
+        self.archive = {
+            "Expenses": make_ledger(seed=3),
+            "Donations": make_ledger(seed=4),
+            "Widows": make_widows(seed=1),
+        }
+        self.current = {
+            "Expenses": make_ledger(seed=1),
+            "Donations": make_ledger(seed=2),
+            "Widows": make_widows(),
+        }
+
+    def multi(self, frames):
+        return MultiYearFrames(frames, [self.archive], ["archive-v1"])
+
+    def assert_matches_concatenated(self, aggregates, frames):
+        full = build_aggregates({sheet: frames[sheet] for sheet in frames})
+        self.assertEqual(aggregates.budget_status(), full.budget_status())
+        self.assertEqual(aggregates.donor_statistics(), full.donor_statistics())
+        self.assertEqual(aggregates.widow_statistics(), full.widow_statistics())
+
+    def test_matches_concatenated_frames(self):
+        frames = self.multi(self.current)
+        aggregates = build_aggregates(frames, "v1")
+        self.assertEqual(frames.assembled, [])
+        self.assert_matches_concatenated(aggregates, frames)
+
+    def test_refresh_reuses_archived_totals(self):
+        first = build_aggregates(self.multi(self.current), "v1")
+        new_frames = self.multi(edited(self.current))
+        with patch.object(incremental, "aggregate_archives", side_effect=AssertionError):
+            second = build_aggregates(new_frames, "v2", self.multi(self.current), first)
+        self.assertEqual(second.changes["Donations"]["inserted"], 15)
+        self.assertIs(second.archived, first.archived)
+        self.assert_matches_concatenated(second, new_frames)
+
+    def test_version_does_not_read_archives(self):
+        frames = self.multi(self.current)
+        version = dataset_version(frames, pd.DataFrame())
+        self.assertEqual(frames.assembled, [])
+        self.assertEqual(dataset_version(self.multi(self.current), pd.DataFrame()), version)
+        self.assertNotEqual(
+            dataset_version(self.multi(edited(self.current)), pd.DataFrame()), version
+        )
+
+
+class TestLoadDataset(unittest.TestCase):
+    """Test that a refresh builds on the totals of the previous version"""
+
+    def setUp(self):
+        open_all_months(self)
+
+    def bundle(self, frames):
+        return SimpleNamespace(frames=frames, widow_support=pd.DataFrame(), errors={})
+
+    def test_refresh_applies_changes(self):
+        frames = {"Expenses": make_ledger(seed=1), "Donations": make_ledger(seed=2)}
+        frames["Widows"] = make_widows()
+        with patch.object(refresher_module, "fetch_all_workbooks") as fetch:
+            fetch.return_value = self.bundle(frames)
+            first = load_dataset()
+            fetch.return_value = self.bundle(edited(frames))
+            second = load_dataset(previous=first)
+        self.assertIsNone(first.aggregates.changes["Donations"])
+        self.assertEqual(second.aggregates.changes["Donations"]["inserted"], 15)
+        self.assertIs(second.rollups.version, second.version)
+        self.assertEqual(second.donor_index.version, second.version)
+
+    def test_refresh_leaves_archives_unassembled(self):
+        archive = {"Expenses": make_ledger(seed=3), "Donations": make_ledger(seed=4)}
+        frames = {"Expenses": make_ledger(seed=1), "Donations": make_ledger(seed=2)}
+        frames["Widows"] = make_widows()
+        multi = MultiYearFrames(frames, [archive], ["archive-v1"])
+        with patch.object(refresher_module, "fetch_all_workbooks") as fetch:
+            fetch.return_value = self.bundle(multi)
+            dataset = load_dataset()
+        self.assertEqual(multi.assembled, [])
+        self.assertEqual(len(dataset.donor_index), multi["Donations"]["שם"].nunique())
+
+
+if __name__ == "__main__":
+    unittest.main()
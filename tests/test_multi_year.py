@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Multi-Year Frames Tests for Omri Association Dashboard
+Tests the lazy concatenation of the current and archived workbooks
+"""
+
+import unittest
+
+import pandas as pd
+
+from src.multi_year import MultiYearFrames, concat_years
+
+
+def donations(names, amounts):
+    return pd.DataFrame({"שם": pd.Categorical(names), "שקלים": amounts})
+
+
+class TestConcatYears(unittest.TestCase):
+    """Test concatenating the per-year frames of one sheet"""
+
+    def test_concatenates_oldest_first(self):
+        result = concat_years([donations(["א"], [1.0]), donations(["ב"], [2.0])])
+        self.assertEqual(list(result["שם"]), ["א", "ב"])
+        self.assertEqual(list(result.index), [0, 1])
+
+    def test_keeps_categoricals(self):
+        """Different category sets should concatenate into one categorical"""
+        result = concat_years([donations(["א", "ב"], [1.0, 2.0]), donations(["ג"], [3.0])])
+        self.assertIsInstance(result["שם"].dtype, pd.CategoricalDtype)
+        self.assertEqual(set(result["שם"].cat.categories), {"א", "ב", "ג"})
+
+    def test_skips_empty_years(self):
+        current = donations(["א"], [1.0])
+        self.assertIs(concat_years([pd.DataFrame(), current]), current)
+
+    def test_all_empty(self):
+        self.assertTrue(concat_years([pd.DataFrame(), pd.DataFrame()]).empty)
+
+
+class TestMultiYearFrames(unittest.TestCase):
+    """Test the lazy {sheet: frame} view"""
+
+    def setUp(self):
+        self.frames = MultiYearFrames(
+            {"Donations": donations(["ג"], [3.0]), "Widows": pd.DataFrame()},
+            [{"Donations": donations(["א"], [1.0])}, {"Donations": donations(["ב"], [2.0])}],
+        )
+
+    def test_sheets_come_from_current_workbook(self):
+        self.assertEqual(list(self.frames), ["Donations", "Widows"])
+        self.assertEqual(len(self.frames), 2)
+
+    def test_assembles_on_first_access(self):
+        self.assertEqual(self.frames.assembled, [])
+        donations_df = self.frames["Donations"]
+        self.assertEqual(list(donations_df["שקלים"]), [1.0, 2.0, 3.0])
+        self.assertEqual(self.frames.assembled, ["Donations"])
+        self.assertIs(self.frames["Donations"], donations_df)
+
+    def test_rosters_come_from_current_workbook(self):
+        """A widow listed in an archive and the current workbook should count once"""
+        widow = pd.DataFrame({"שם ": ["רחל"], "סכום חודשי": [1000.0]})
+        frames = MultiYearFrames(
+            {"Donations": donations(["ג"], [3.0]), "Widows": widow},
+            [{"Donations": donations(["א"], [1.0]), "Widows": widow.copy()}],
+        )
+        self.assertIs(frames["Widows"], widow)
+        self.assertEqual(len(frames["Donations"]), 2)
+        self.assertEqual(frames.assembled, ["Donations"])
+
+    def test_sheet_missing_from_archives(self):
+        self.assertTrue(self.frames["Widows"].empty)
+        self.assertIsNone(self.frames.get("Investors"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Support Projection Tests for Omri Association Dashboard
+Tests the widow x month commitment matrix and the month-by-month projection
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data_processing import calculate_36_month_budget
+from src.projections import (
+    commitment_matrix,
+    month_index,
+    project_support,
+    projected_donations,
+    widow_commitments,
+)
+from src.rollups import Rollups
+
+START = pd.Timestamp("2025-01-01")
+
+
+def months_from(date):
+    return month_index(pd.Series([pd.Timestamp(date)]))[0]
+
+
+class TestCommitmentMatrix(unittest.TestCase):
+    """Test the broadcast matrix against a per-widow loop"""
+
+    def test_matches_loop(self):
+        rng = np.random.default_rng(0)
+        starts = rng.integers(24290, 24330, 200).astype(float)
+        ends = starts + rng.integers(0, 40, 200)
+        starts[::7] = np.nan
+        ends[::5] = np.nan
+        months = 24300 + np.arange(36)
+        expected = np.array(
+            [
+                [(np.isnan(s) or s <= m) and (np.isnan(e) or m <= e) for m in months]
+                for s, e in zip(starts, ends)
+            ]
+        )
+        np.testing.assert_array_equal(commitment_matrix(starts, ends, months), expected)
+
+
+class TestWidowCommitments(unittest.TestCase):
+    """Test combining the Widows and Widows Support sheets"""
+
+    def test_end_dates_come_from_support_sheet(self):
+        widows = pd.DataFrame(
+            {
+                "שם ": ["רחל", "לאה "],
+                "סכום חודשי": ["₪1,000", "2000"],
+                "חודש התחלה": ["01.03.2024", None],
+            }
+        )
+        support = pd.DataFrame(
+            {
+                "שם הבחורה": ["לאה", "רחל"],
+                "כמה מקבלת בכל חודש": [2000, 1000],
+                "מתי התחילה לקבל": ["01.05.2024", "01.01.2020"],
+                "עד מתי תחת תורם": ["01.06.2025", None],
+            }
+        )
+        commitments = widow_commitments(widows, support)
+        self.assertEqual(list(commitments["amount"]), [1000.0, 2000.0])
+        self.assertEqual(commitments["start"][0], months_from("2024-03-01"))
+        self.assertEqual(commitments["start"][1], months_from("2024-05-01"))
+        self.assertTrue(np.isnan(commitments["end"][0]))
+        self.assertEqual(commitments["end"][1], months_from("2025-06-01"))
+
+    def test_support_sheet_alone(self):
+        support = pd.DataFrame({"שם הבחורה": ["א"], "סכום חודשי": [1500]})
+        self.assertEqual(list(widow_commitments(None, support)["amount"]), [1500.0])
+
+
+class TestProjectSupport(unittest.TestCase):
+    """Test the month-by-month projection"""
+
+    def setUp(self):
+        self.commitments = pd.DataFrame(
+            {
+                "name": ["a", "b", "c"],
+                "amount": [1000.0, 2000.0, 500.0],
+                "start": [np.nan, months_from("2025-03-01"), months_from("2024-01-01")],
+                "end": [np.nan, np.nan, months_from("2025-02-01")],
+            }
+        )
+
+    def test_required_expiring_and_coverage(self):
+        projection = project_support(self.commitments, 6, start=START, donations=2500.0)
+        self.assertEqual(list(projection.index[:3]), [202501, 202502, 202503])
+        self.assertEqual(list(projection["required"]), [1500, 1500, 3000, 3000, 3000, 3000])
+        self.assertEqual(list(projection["expiring"]), [0, 1, 0, 0, 0, 0])
+        self.assertEqual(projection.loc[202503, "starting_amount"], 2000.0)
+        self.assertAlmostEqual(projection.loc[202503, "coverage"], 2500 / 3000)
+        self.assertEqual(projection["balance"].iloc[-1], 2 * 1000 - 4 * 500)
+
+    def test_horizon_and_scale(self):
+        rng = np.random.default_rng(1)
+        commitments = pd.DataFrame(
+            {
+                "amount": rng.choice([1000.0, 2000.0], 5000),
+                "start": rng.integers(24290, 24320, 5000).astype(float),
+                "end": rng.integers(24300, 24400, 5000).astype(float),
+            }
+        )
+        projection = project_support(commitments, 60, start=START)
+        self.assertEqual(len(projection), 60)
+        self.assertTrue(projection["coverage"].isna().all())
+
+    def test_projected_donations(self):
+        donations = pd.Series([100.0, 200.0, 300.0], index=[202401, 202402, 202403])
+        rollups = Rollups(donations=donations, expenses=pd.Series(dtype=float))
+        self.assertEqual(projected_donations(rollups, lookback=2), 250.0)
+        self.assertIsNone(projected_donations(None))
+
+
+class TestBudgetProjection(unittest.TestCase):
+    """Test that the 36-month budget follows each widow's dates"""
+
+    def test_ended_commitments_stop_counting(self):
+        widows = pd.DataFrame({"שם ": ["א", "ב"], "סכום חודשי": [1000, 1000]})
+        ended = pd.DataFrame(
+            {"שם הבחורה": ["ב"], "סכום חודשי": [1000], "עד מתי תחת תורם": ["01.01.2000"]}
+        )
+        budget = calculate_36_month_budget(widows, 1000, ended)
+        self.assertEqual(budget["support_36_months"], 36 * 1000)
+        self.assertEqual(len(budget["monthly_breakdown"]), 36)
+        self.assertEqual(budget["status"], "מספיק")
+
+    def test_totals_come_from_the_projection(self):
+        widows = pd.DataFrame(
+            {"שם ": ["א", "ב"], "סכום חודשי": [1000, 500], "חודש התחלה": ["", "01.01.2090"]}
+        )
+        budget = calculate_36_month_budget(widows, 1200, horizon=12)
+        projection = project_support(widow_commitments(widows), 12, donations=1200)
+        self.assertEqual(budget["support_36_months"], projection["required"].sum())
+        self.assertEqual(budget["total_required"], projection["donations"].sum())
+        self.assertEqual(budget["monthly_breakdown"][0]["difference"], -200.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
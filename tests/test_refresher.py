@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Background Refresher Tests for Omri Association Dashboard
+Tests the dataset store, the refresh thread and the first load of a process
+"""
+
+import threading
+import time
+import unittest
+from types import MappingProxyType
+from unittest.mock import patch
+
+import pandas as pd
+
+import services.refresher as refresher_module
+from services.refresher import BackgroundRefresher, DatasetStore, DatasetVersion
+
+
+def make_dataset(version, amount=1.0):
+    """A DatasetVersion with one Donations row"""
+    return DatasetVersion(
+        frames=MappingProxyType({"Donations": pd.DataFrame({"שקלים": [amount]})}),
+        widow_support=pd.DataFrame(),
+        version=version,
+        refreshed_at=time.time(),
+        duration=0.01,
+    )
+
+
+def empty_dataset():
+    return DatasetVersion(
+        frames=MappingProxyType({"Donations": pd.DataFrame()}),
+        widow_support=pd.DataFrame(),
+        version=None,
+        refreshed_at=time.time(),
+        duration=0.01,
+        errors=MappingProxyType({"main": "quota exceeded"}),
+    )
+
+
+class TestDatasetStore(unittest.TestCase):
+    """Test publishing dataset versions"""
+
+    def test_swap_returns_previous_version(self):
+        store = DatasetStore()
+        first, second = make_dataset("v1"), make_dataset("v2")
+        self.assertIsNone(store.swap(first))
+        self.assertIs(store.swap(second), first)
+        self.assertIs(store.current(), second)
+
+    def test_wait_returns_once_published(self):
+        store = DatasetStore()
+        self.assertIsNone(store.wait(timeout=0.01))
+        dataset = make_dataset("v1")
+        threading.Timer(0.05, store.swap, args=(dataset,)).start()
+        self.assertIs(store.wait(timeout=2), dataset)
+
+    def test_readers_see_whole_versions(self):
+        """Concurrent readers only ever see a published version, never a mix"""
+        store = DatasetStore()
+        store.swap(make_dataset("v0", 0.0))
+        seen = []
+
+        def read():
+            for _ in range(500):
+                dataset = store.current()
+                seen.append((dataset.version, dataset.frames["Donations"]["שקלים"].iloc[0]))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for i in range(1, 200):
+            store.swap(make_dataset(f"v{i}", float(i)))
+        reader.join()
+        self.assertTrue(all(version == f"v{int(amount)}" for version, amount in seen))
+
+
+class TestBackgroundRefresher(unittest.TestCase):
+    """Test refreshing, failure handling and the refresh thread"""
+
+    def test_refresh_now_publishes_version(self):
+        store = DatasetStore()
+        refresher = BackgroundRefresher(store, load=lambda: make_dataset("v1"), interval=60)
+        dataset = refresher.refresh_now()
+        self.assertEqual(dataset.version, "v1")
+        self.assertIs(store.current(), dataset)
+        self.assertEqual(refresher.status()["refreshes"], 1)
+
+    def test_empty_load_keeps_current_version(self):
+        store = DatasetStore()
+        store.swap(make_dataset("v1"))
+        refresher = BackgroundRefresher(store, load=empty_dataset, interval=60)
+        self.assertEqual(refresher.refresh_now().version, "v1")
+        status = refresher.status()
+        self.assertEqual(status["failures"], 1)
+        self.assertIn("quota exceeded", status["last_error"])
+
+    def test_failed_load_keeps_current_version(self):
+        def fail():
+            raise ConnectionError("offline")
+
+        store = DatasetStore()
+        store.swap(make_dataset("v1"))
+        refresher = BackgroundRefresher(store, load=fail, interval=60)
+        with self.assertLogs("services.refresher", level="ERROR"):
+            self.assertEqual(refresher.refresh_now().version, "v1")
+        self.assertEqual(refresher.status()["last_error"], "offline")
+
+    def test_status_reports_current_version(self):
+        store = DatasetStore()
+        refresher = BackgroundRefresher(store, load=lambda: make_dataset("v1"), interval=60)
+        self.assertIsNone(refresher.status()["refreshed_at"])
+        refresher.refresh_now()
+        status = refresher.status()
+        self.assertEqual(status["version"], "v1")
+        self.assertFalse(status["running"])
+        self.assertEqual(status["interval"], 60)
+        self.assertIsNotNone(status["refreshed_at"])
+        self.assertAlmostEqual(status["duration"], 0.01)
+
+    def test_thread_refreshes_periodically_and_stops(self):
+        versions = iter(range(1000))
+        store = DatasetStore()
+        refresher = BackgroundRefresher(
+            store, load=lambda: make_dataset(f"v{next(versions)}"), interval=0.02
+        )
+        refresher.start()
+        self.addCleanup(refresher.stop, 2)
+        self.assertIsNotNone(store.wait(timeout=2))
+        deadline = time.time() + 2
+        while refresher.status()["refreshes"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        refresher.stop(timeout=2)
+        self.assertGreaterEqual(refresher.status()["refreshes"], 3)
+        self.assertFalse(refresher.running)
+
+    def test_load_initial_runs_once(self):
+        calls = []
+
+        def initial():
+            calls.append(1)
+            return make_dataset("snapshot")
+
+        store = DatasetStore()
+        refresher = BackgroundRefresher(
+            store, load=lambda: make_dataset("fresh"), interval=60, initial_load=initial
+        )
+        self.assertEqual(refresher.load_initial().version, "snapshot")
+        self.assertEqual(refresher.load_initial().version, "snapshot")
+        self.assertEqual(len(calls), 1)
+
+
+class TestCurrentDataset(unittest.TestCase):
+    """Test the page-render entry point"""
+
+    def setUp(self):
+        store = DatasetStore()
+        patches = [
+            patch.object(refresher_module, "DATASET_STORE", store),
+            patch.object(refresher_module, "_REFRESHER", None),
+            patch.object(refresher_module.Config, "ENABLE_BACKGROUND_REFRESH", False),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = store
+
+    def test_first_call_loads_synchronously_then_reuses(self):
+        loads = []
+
+        def load(fresh=True):
+            loads.append(fresh)
+            return make_dataset("v1")
+
+        with patch.object(refresher_module, "load_dataset", load):
+            refresher_module._REFRESHER = BackgroundRefresher(
+                self.store, load=load, interval=60, initial_load=lambda: load(fresh=False)
+            )
+            first = refresher_module.current_dataset()
+            second = refresher_module.current_dataset()
+        self.assertIs(first, second)
+        self.assertEqual(loads, [False])
+        self.assertFalse(refresher_module.get_refresher().running)
+
+    def test_expired_version_reloads_without_thread(self):
+        stale = make_dataset("old")
+        self.store.swap(
+            DatasetVersion(
+                frames=stale.frames,
+                widow_support=stale.widow_support,
+                version="old",
+                refreshed_at=time.time() - 120,
+                duration=0.01,
+            )
+        )
+        refresher_module._REFRESHER = BackgroundRefresher(
+            self.store, load=lambda: make_dataset("new"), interval=60
+        )
+        self.assertEqual(refresher_module.current_dataset().version, "new")
+
+    def test_no_data_returns_none(self):
+        refresher_module._REFRESHER = BackgroundRefresher(
+            self.store, load=empty_dataset, interval=60, initial_load=empty_dataset
+        )
+        self.assertIsNone(refresher_module.current_dataset())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Rollup Engine Tests for Omri Association Dashboard
+Tests the integer month keys and the shared monthly totals
+"""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import src.rollups as rollups_module
+from src.data_processing import (
+    calculate_expense_statistics,
+    calculate_monthly_averages,
+    calculate_monthly_budget,
+    calculate_monthly_trends,
+)
+from src.rollups import build_rollups, labelled, month_label, monthly_totals
+
+
+def make_ledger(
+    rows=400, seed=0, start="2023-01-01", days=700, names=40, missing_dates=0, missing_names=0
+):
+    """A seeded random ledger (date, name, amount) shared by the ledger tests.
+
+    Every ``missing_dates``-th date and ``missing_names``-th name is left empty.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "תאריך": pd.to_datetime(start) + pd.to_timedelta(rng.integers(0, days, rows), "D"),
+            "שם": pd.Series([f"תורם {i}" for i in rng.integers(0, names, rows)], dtype=object),
+            "שקלים": rng.integers(1, 100, rows) * 50.0,
+        }
+    )
+    if missing_dates:
+        df.loc[::missing_dates, "תאריך"] = pd.NaT
+    if missing_names:
+        df.loc[::missing_names, "שם"] = None
+    return df
+
+
+def legacy_monthly(df, value_column="שקלים"):
+    """The "%Y-%m" string grouping the rollups replace"""
+    valid = df.dropna(subset=["תאריך"])
+    return valid.groupby(valid["תאריך"].dt.strftime("%Y-%m"))[value_column].sum().to_dict()
+
+
+class TestMonthKeys(unittest.TestCase):
+    """Test the integer month keys"""
+
+    def test_month_label(self):
+        self.assertEqual(month_label(202403), "2024-03")
+
+
+class TestMonthlyTotals(unittest.TestCase):
+    """Test the monthly totals against the string grouping"""
+
+    def test_matches_string_grouping(self):
+        df = make_ledger(500, missing_dates=50)
+        self.assertEqual(labelled(monthly_totals(df, "שקלים")), legacy_monthly(df))
+
+    def test_parses_text_dates(self):
+        df = pd.DataFrame({"תאריך": ["01.02.2024", "15.02.2024", "bad"], "שקלים": [1.0, 2.0, 4.0]})
+        self.assertEqual(labelled(monthly_totals(df, "שקלים")), {"2024-02": 3.0})
+
+    def test_empty(self):
+        self.assertTrue(monthly_totals(pd.DataFrame(), "שקלים").empty)
+
+    def test_months_table(self):
+        rollups = build_rollups(
+            make_ledger(500, seed=1, missing_dates=50), make_ledger(500, seed=2, missing_dates=50)
+        )
+        months = rollups.months()
+        self.assertTrue(months.index.is_monotonic_increasing)
+        np.testing.assert_allclose(months["balance"], months["donations"] - months["expenses"])
+        self.assertAlmostEqual(months["donations"].sum(), rollups.donations.sum())
+
+
+class TestAggregationsUseRollups(unittest.TestCase):
+    """Test that the monthly aggregations match the old results and read shared rollups"""
+
+    def setUp(self):
+        self.expenses = make_ledger(500, seed=3, missing_dates=50)
+        self.donations = make_ledger(500, seed=4, missing_dates=50)
+
+    def test_same_results_as_string_grouping(self):
+        budget = calculate_monthly_budget(self.expenses.copy(), self.donations.copy())
+        self.assertEqual(budget["monthly_expenses"], legacy_monthly(self.expenses))
+        self.assertEqual(budget["monthly_donations"], legacy_monthly(self.donations))
+        trends = calculate_monthly_trends(self.expenses, self.donations)
+        self.assertEqual(trends["monthly_donations"], legacy_monthly(self.donations))
+        stats = calculate_expense_statistics(self.expenses.copy())
+        self.assertEqual(stats["monthly_expenses"], legacy_monthly(self.expenses))
+        averages = calculate_monthly_averages(self.donations)
+        self.assertEqual(averages["total_months"], len(legacy_monthly(self.donations)))
+
+    def test_shared_rollups_are_not_recomputed(self):
+        rollups = build_rollups(self.expenses, self.donations)
+        with patch.object(rollups_module, "parse_dates", side_effect=AssertionError):
+            trends = calculate_monthly_trends(self.expenses, self.donations, rollups=rollups)
+        self.assertEqual(trends["monthly_expenses"], labelled(rollups.expenses))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Runway Simulation Tests for Omri Association Dashboard
+Tests the resampled balance paths, the months funded and their caching
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.rollups import Rollups
+from src.runway import first_deficit, monthly_history, runway_for, sample_flows, simulate_runway
+from src.stats_cache import STATS_CACHE
+
+START = pd.Timestamp("2025-01-01")
+
+
+def make_rollups(version="v1"):
+    months = [202401 + i for i in range(12)] + [202501]
+    donations = pd.Series([10000.0] * 12 + [1.0], index=months)
+    expenses = pd.Series([9000.0, 13000.0] * 6 + [1.0], index=months)
+    return Rollups(donations=donations, expenses=expenses, version=version)
+
+
+class TestFirstDeficit(unittest.TestCase):
+    """Test the months funded on each path"""
+
+    def test_matches_loop(self):
+        balances = np.random.default_rng(0).normal(100, 200, (300, 24))
+        expected = [next((i for i, b in enumerate(path) if b < 0), 24) for path in balances]
+        np.testing.assert_array_equal(first_deficit(balances), expected)
+
+
+class TestSampleFlows(unittest.TestCase):
+    """Test the two resampling methods"""
+
+    def setUp(self):
+        self.history = monthly_history(make_rollups(), 202501)
+
+    def test_history_leaves_out_current_month(self):
+        self.assertEqual(len(self.history), 12)
+        self.assertEqual(self.history.index.max(), 202412)
+
+    def test_bootstrap_keeps_months_together(self):
+        donations, expenses = sample_flows(self.history, 1000, 36)
+        self.assertEqual(donations.shape, (1000, 36))
+        self.assertTrue(np.isin(expenses, [9000.0, 13000.0]).all())
+        self.assertTrue((donations == 10000.0).all())
+
+    def test_normal_is_fitted_and_clipped(self):
+        donations, expenses = sample_flows(
+            self.history, 5000, 36, "normal", np.random.default_rng(1)
+        )
+        self.assertAlmostEqual(expenses.mean(), 11000.0, delta=50)
+        self.assertGreaterEqual(donations.min(), 0.0)
+
+    def test_unknown_method_and_empty_history(self):
+        with self.assertRaises(ValueError):
+            sample_flows(self.history, 10, 12, "uniform")
+        with self.assertRaises(ValueError):
+            sample_flows(self.history.iloc[:0], 10, 12)
+
+
+class TestSimulateRunway(unittest.TestCase):
+    """Test the percentiles and deficit probabilities"""
+
+    def setUp(self):
+        self.history = monthly_history(make_rollups(), 202501)
+
+    def test_deterministic_surplus_never_runs_out(self):
+        history = pd.DataFrame({"donations": [5.0, 5.0], "expenses": [3.0, 3.0]})
+        result = simulate_runway(history, 12, 100, start=START)
+        self.assertEqual(result.funded_probability, 1.0)
+        self.assertEqual(result.runway_percentiles()[5], 12)
+        self.assertEqual(list(result.months["p50"]), [2.0 * (i + 1) for i in range(12)])
+        self.assertEqual(result.months.index[0], 202501)
+
+    def test_deficit_probabilities(self):
+        result = simulate_runway(self.history, 36, 4000, starting_balance=1000.0, start=START)
+        # The first month is a deficit when expenses are 13000, half the time
+        self.assertAlmostEqual(result.months["deficit"].iloc[0], 0.5, delta=0.05)
+        self.assertTrue((np.diff(result.months["ran_out"]) >= 0).all())
+        self.assertGreaterEqual(result.months["ran_out"].iloc[-1], result.months["deficit"].max())
+        self.assertAlmostEqual(result.months["ran_out"].iloc[-1], 1 - result.funded_probability)
+
+    def test_commitments_add_their_change(self):
+        history = pd.DataFrame({"donations": [5.0], "expenses": [3.0]})
+        result = simulate_runway(history, 4, 10, commitments=[100.0, 100.0, 103.0, 103.0])
+        self.assertEqual(list(result.months["p50"]), [2.0, 4.0, 3.0, 2.0])
+        self.assertEqual(result.runway_percentiles()[50], 4)
+
+
+class TestRunwayFor(unittest.TestCase):
+    """Test the cached runway of a dataset version"""
+
+    def setUp(self):
+        STATS_CACHE.invalidate()
+
+    def test_cached_per_version(self):
+        rollups = make_rollups()
+        first = runway_for(rollups, 5000.0, start=START, version="v1")
+        hits = STATS_CACHE.stats()["hits"]
+        again = runway_for(rollups, 5000.0, start=START, version="v1")
+        self.assertEqual(STATS_CACHE.stats()["hits"], hits + 1)
+        np.testing.assert_array_equal(again.runway, first.runway)
+        runway_for(rollups, 6000.0, start=START, version="v1")
+        self.assertEqual(STATS_CACHE.stats()["hits"], hits + 1)
+        self.assertEqual(first.history_months, 12)
+
+    def test_default_start_is_the_current_month(self):
+        rollups = make_rollups()
+        runway_for(rollups, 5000.0, version="v1")
+        hits = STATS_CACHE.stats()["hits"]
+        this_month = pd.Timestamp.today().replace(day=1)
+        result = runway_for(rollups, 5000.0, start=this_month, version="v1")
+        self.assertEqual(STATS_CACHE.stats()["hits"], hits + 1)
+        next_month = this_month + pd.offsets.MonthBegin(1)
+        later = runway_for(rollups, 5000.0, start=next_month, version="v1")
+        self.assertEqual(STATS_CACHE.stats()["hits"], hits + 1)
+        self.assertEqual(later.months.index[0], next_month.year * 100 + next_month.month)
+        self.assertNotEqual(later.months.index[0], result.months.index[0])
+
+    def test_no_history(self):
+        self.assertIsNone(runway_for(None, start=START))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Scenario Tests for Omri Association Dashboard
+Tests the parameter grid and the batch evaluation against a per-scenario loop
+"""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.projections import month_index, project_support, widow_commitments
+from src.scenarios import evaluate_scenarios, scenario_grid
+from tests.test_incremental import make_widows
+from ui import dashboard_sections
+
+START = pd.Timestamp("2025-01-01")
+
+
+def make_commitments(rows=200, seed=0):
+    """Commitments of random widows ending 6-59 months in; every fourth is open-ended"""
+    commitments = widow_commitments(make_widows(rows, seed, start="2023-05-01", days=900))
+    ends = commitments["start"] + 6 + commitments.index % 54
+    return commitments.assign(end=ends.where(commitments.index % 4 > 0))
+
+
+def evaluate_one(commitments, uplift, intake, growth, donations, horizon):
+    """One scenario month by month, for comparison"""
+    projection = project_support(
+        commitments.assign(amount=commitments["amount"] + uplift * commitments["children"]),
+        horizon,
+        start=START,
+    )
+    first = month_index(pd.Series([START]))[0]
+    current = (commitments["start"].fillna(-1) <= first) & (commitments["end"].fillna(1e9) >= first)
+    new_cost = commitments.loc[current, "amount"].median() + uplift * (
+        commitments.loc[current, "children"].mean()
+    )
+    balance, deficit, total = 0.0, None, 0.0
+    for month, (key, required) in enumerate(projection["required"].items()):
+        cost = required + intake * (month + 1) * new_cost
+        balance += donations * (1 + growth) ** (month / 12) - cost
+        total += cost
+        if deficit is None and balance < 0:
+            deficit = key
+    return total, deficit
+
+
+class TestScenarioGrid(unittest.TestCase):
+    """Test building the parameter grid"""
+
+    def test_every_combination(self):
+        grid = scenario_grid([0, 100], [0, 1, 2], [0.05])
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(list(grid.columns), ["child_uplift", "intake", "donation_growth"])
+        self.assertEqual(len(grid.drop_duplicates()), 6)
+
+
+class TestEvaluateScenarios(unittest.TestCase):
+    """Test the vectorized evaluation of a grid"""
+
+    def setUp(self):
+        self.commitments = make_commitments()
+        self.grid = scenario_grid([0, 150, 400], [0, 2, 5], [-0.1, 0.0, 0.2])
+        self.donations = 250000.0
+        self.result = evaluate_scenarios(
+            self.commitments, self.grid, self.donations, 36, start=START
+        )
+
+    def test_matches_loop(self):
+        for row in self.result.itertuples():
+            total, deficit = evaluate_one(
+                self.commitments,
+                row.child_uplift,
+                row.intake,
+                row.donation_growth,
+                self.donations,
+                36,
+            )
+            self.assertAlmostEqual(row.total_cost, total, places=3)
+            self.assertEqual(None if pd.isna(row.deficit_month) else row.deficit_month, deficit)
+
+    def test_coverage_and_funded_months(self):
+        self.assertEqual(len(self.result), 27)
+        np.testing.assert_allclose(
+            self.result["coverage"], self.result["total_donations"] / self.result["total_cost"]
+        )
+        never = self.result["deficit_month"].isna()
+        self.assertTrue((self.result.loc[never, "months_funded"] == 36).all())
+        self.assertTrue((self.result.loc[~never, "months_funded"] < 36).all())
+
+    def test_base_scenario_matches_projection(self):
+        base = evaluate_scenarios(
+            self.commitments, scenario_grid(), self.donations, 24, start=START
+        )
+        projection = project_support(self.commitments, 24, start=START, donations=self.donations)
+        self.assertAlmostEqual(base["total_cost"][0], projection["required"].sum())
+        self.assertAlmostEqual(base["final_balance"][0], projection["balance"].iloc[-1])
+
+    def test_hundreds_of_scenarios(self):
+        grid = scenario_grid(np.arange(0, 1001, 50), np.arange(0, 11), np.arange(-0.3, 0.31, 0.05))
+        result = evaluate_scenarios(make_commitments(5000), grid, self.donations, 60, start=START)
+        self.assertEqual(len(result), len(grid))
+        by_uplift = result.groupby(["intake", "donation_growth"])["total_cost"]
+        self.assertTrue(by_uplift.apply(lambda costs: costs.is_monotonic_increasing).all())
+
+
+class TestCommitmentChildren(unittest.TestCase):
+    """Test that widow commitments carry the children count"""
+
+    def test_children_column(self):
+        widows = pd.DataFrame(
+            {"שם ": ["א", "ב"], "סכום חודשי": [1000, 2000], "מספר ילדים": ["3", None]}
+        )
+        commitments = widow_commitments(widows)
+        self.assertEqual(list(commitments["children"]), [3.0, 0.0])
+        result = evaluate_scenarios(commitments, scenario_grid([100]), 0.0, 1, start=START)
+        self.assertEqual(result["total_cost"][0], 3000.0 + 300.0)
+
+
+class TestScenariosSection(unittest.TestCase):
+    """Test the scenario table of the widows section"""
+
+    def test_no_projection_shows_message(self):
+        with patch.object(dashboard_sections, "st") as st, patch.object(
+            dashboard_sections, "evaluate_scenarios"
+        ) as evaluate:
+            st.session_state = {}
+            dashboard_sections.create_scenarios_section(pd.DataFrame())
+        evaluate.assert_not_called()
+        st.info.assert_called_once()
+        st.error.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
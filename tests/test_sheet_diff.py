@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Differential Write Tests for Omri Association Dashboard
+Tests the worksheet diffing used by write_sheet
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.sheet_diff import SheetContentsCache, count_cells, diff_rows, frame_to_rows
+
+
+def apply_updates(rows, data):
+    """Apply batch_update data to a list of rows, the way the Sheets API would"""
+    from gspread.utils import a1_to_rowcol
+
+    rows = [list(row) for row in rows]
+    for entry in data:
+        first, _ = entry["range"].split(":")
+        start_row, start_col = a1_to_rowcol(first)
+        for r, values in enumerate(entry["values"]):
+            row_index = start_row - 1 + r
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            for c, value in enumerate(values):
+                col_index = start_col - 1 + c
+                while len(row) <= col_index:
+                    row.append("")
+                row[col_index] = value
+    # Trim trailing blanks like the API does
+    trimmed = []
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class TestDiffRows(unittest.TestCase):
+    """Test the computation of changed ranges"""
+
+    def setUp(self):
+        self.current = [
+            ["שם", "סכום"],
+            ["א", "100"],
+            ["ב", "200"],
+            ["ג", "300"],
+        ]
+
+    def test_identical_contents_need_no_update(self):
+        """Unchanged rows should produce no ranges"""
+        self.assertEqual(diff_rows(self.current, [list(r) for r in self.current]), [])
+
+    def test_numbers_compare_with_their_text(self):
+        """5000, 5000.0 and "5000" should not count as a change"""
+        target = [["שם", "סכום"], ["א", 100.0], ["ב", 200], ["ג", "300"]]
+        self.assertEqual(diff_rows(self.current, target), [])
+
+    def test_serial_dates_compare_with_iso_text(self):
+        """A typed date cell should equal the ISO text frame_to_rows writes for it"""
+        current = [["תאריך"], [45296], [45296.5]]
+        self.assertEqual(
+            diff_rows(current, [["תאריך"], ["2024-01-05"], ["2024-01-05 12:00:00"]]), []
+        )
+        self.assertEqual(
+            diff_rows(current, [["תאריך"], ["2024-01-06"], ["2024-01-05 12:00:00"]]),
+            [{"range": "A2:A2", "values": [["2024-01-06"]]}],
+        )
+
+    def test_single_cell_edit(self):
+        """Editing one cell should send exactly that cell"""
+        target = [list(r) for r in self.current]
+        target[2][1] = "250"
+        self.assertEqual(diff_rows(self.current, target), [{"range": "B3:B3", "values": [["250"]]}])
+
+    def test_appended_rows_form_one_block(self):
+        """Appended rows should be merged into a single range"""
+        target = self.current + [["ד", "400"], ["ה", "500"]]
+        data = diff_rows(self.current, target)
+        self.assertEqual(data, [{"range": "A5:B6", "values": [["ד", "400"], ["ה", "500"]]}])
+
+    def test_deleted_rows_are_blanked(self):
+        """Rows missing from the target should be cleared"""
+        data = diff_rows(self.current, self.current[:2])
+        self.assertEqual(data, [{"range": "A3:B4", "values": [["", ""], ["", ""]]}])
+
+    def test_roundtrip(self):
+        """Applying the diff should reproduce the target exactly"""
+        target = [
+            ["שם", "סכום", "הערות"],
+            ["א", "100"],
+            ["ב2", "200", "חדש"],
+            ["ד", "400"],
+            ["ה", "500"],
+        ]
+        data = diff_rows(self.current, target)
+        self.assertEqual(apply_updates(self.current, data), target)
+        self.assertLess(count_cells(data), sum(len(row) for row in target))
+
+
+class TestFrameToRows(unittest.TestCase):
+    """Test the conversion of DataFrames to worksheet rows"""
+
+    def test_values_are_serialisable(self):
+        """Missing values, numpy scalars and dates should become plain values"""
+        df = pd.DataFrame(
+            {
+                "תאריך": pd.to_datetime(["2024-01-05", None]),
+                "שקלים": np.array([1.5, np.nan]),
+                "כמות": np.array([3, 4], dtype="int64"),
+            }
+        )
+        rows = frame_to_rows(df)
+        self.assertEqual(rows[0], ["תאריך", "שקלים", "כמות"])
+        self.assertEqual(rows[1], ["2024-01-05", 1.5, 3])
+        self.assertEqual(rows[2], ["", "", 4])
+        self.assertIsInstance(rows[1][2], int)
+
+
+class TestSheetContentsCache(unittest.TestCase):
+    """Test the revision-guarded cache of written contents"""
+
+    def test_entries_require_matching_revision(self):
+        """Cached rows should only be returned for the revision they were stored at"""
+        cache = SheetContentsCache()
+        cache.store("id", "Sheet", "r1", [["a"]])
+        self.assertEqual(cache.get("id", "Sheet", "r1"), [["a"]])
+        self.assertIsNone(cache.get("id", "Sheet", "r2"))
+        self.assertIsNone(cache.get("id", "Sheet", None))
+        cache.invalidate("id")
+        self.assertIsNone(cache.get("id", "Sheet", "r1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
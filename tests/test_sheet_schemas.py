@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Sheet Schema Tests for Omri Association Dashboard
+Tests the declarative schemas that turn worksheet rows into DataFrames
+"""
+
+import unittest
+
+import pandas as pd
+
+import src.google_sheets_io as sheets_io
+from src.sheet_schemas import get_schema, parse_amounts, parse_sheet
+from tests.test_google_sheets_io import use_unthrottled_scheduler
+from tests.test_sheets_backend import fixture_backend
+
+EXPENSES_ROWS = [
+    ["עמרי למען משפחות השכול- הוצאות"],
+    ["תאריך", "שם ספק", "סכום"],
+    ["05.01.2024", "ספק א", "1,500"],
+    ["06/01/2024", "ספק ב", "₪ 250.5"],
+    ["תאריך", "שם לקוח", "סכום"],
+    [],
+    ["07.01.2024", "ספק ג"],
+]
+
+
+class TestValueParsers(unittest.TestCase):
+    """Test the vectorized amount parser"""
+
+    def test_amounts_keep_thousands(self):
+        """Thousands separators and currency symbols should be stripped, not read as decimals"""
+        parsed = parse_amounts(pd.Series(["1,500", "₪ 250.5", "-30", None, "abc"]))
+        self.assertEqual(list(parsed), [1500.0, 250.5, -30.0, 0.0, 0.0])
+
+    def test_numeric_amounts_pass_through(self):
+        """Already numeric amounts should not be re-parsed"""
+        self.assertEqual(list(parse_amounts(pd.Series([1.5, None]))), [1.5, 0.0])
+
+    def test_typed_cells(self):
+        """Numbers from typed reads should skip text cleaning"""
+        self.assertEqual(list(parse_amounts(pd.Series([1500, "₪ 250", 2.5]))), [1500.0, 250.0, 2.5])
+
+
+class TestSheetSchemas(unittest.TestCase):
+    """Test schema-driven parsing of whole sheets"""
+
+    def test_ledger_schema(self):
+        """Ledgers should map aliases, type columns and drop header-like and empty rows"""
+        df = parse_sheet("Expenses", EXPENSES_ROWS)
+        self.assertEqual(list(df.columns), ["תאריך", "שם", "שקלים"])
+        self.assertEqual(list(df["שם"]), ["ספק א", "ספק ב", "ספק ג"])
+        self.assertEqual(list(df["שקלים"]), [1500.0, 250.5, 0.0])
+        self.assertEqual(df["תאריך"][0], pd.Timestamp("2024-01-05"))
+
+    def test_widows_schema_applies_to_almanot(self):
+        """The Almanot tab should be parsed with the Widows schema"""
+        self.assertIs(get_schema("Almanot"), get_schema("Widows"))
+        df = parse_sheet("Almanot", [["שם", "סכום חודשי", "עמודה חדשה"], ["א", "2,000", "x"]])
+        self.assertEqual(list(df.columns[:3]), ["שם ", "סכום חודשי", "עמודה חדשה"])
+        self.assertIn("איש קשר לתרומה", df.columns)
+        self.assertEqual(df["סכום חודשי"][0], 2000.0)
+
+    def test_generic_schema_infers_kinds(self):
+        """Undeclared sheets should infer date and amount columns from their headers"""
+        df = parse_sheet("Other", [["תאריך", "מחיר", "הערה"], ["01.02.2024", "1,200", "x"]])
+        self.assertEqual(df["תאריך"][0], pd.Timestamp("2024-02-01"))
+        self.assertEqual(df["מחיר"][0], 1200.0)
+        self.assertEqual(df["הערה"][0], "x")
+
+    def test_typed_ledger_matches_formatted(self):
+        """A ledger read typed should parse to the same frame as its formatted read"""
+        typed_rows = [
+            ["עמרי למען משפחות השכול- הוצאות"],
+            ["תאריך", "שם ספק", "סכום"],
+            [45296, "ספק א", 1500],
+            [45297, 12, 250.5],
+        ]
+        formatted_rows = [
+            ["עמרי למען משפחות השכול- הוצאות"],
+            ["תאריך", "שם ספק", "סכום"],
+            ["05.01.2024", "ספק א", "₪ 1,500"],
+            ["06.01.2024", "12", "250.5"],
+        ]
+        pd.testing.assert_frame_equal(
+            parse_sheet("Expenses", typed_rows), parse_sheet("Expenses", formatted_rows)
+        )
+
+    def test_empty_sheet_keeps_declared_columns(self):
+        """A ledger without data rows should still have its columns"""
+        df = parse_sheet("Donations", [["title"], ["תאריך", "שם התורם", "סכום"]])
+        self.assertEqual(list(df.columns), ["תאריך", "שם", "שקלים"])
+        self.assertTrue(df.empty)
+
+
+class TestEntryPointsAgree(unittest.TestCase):
+    """read_sheet and load_all_data should produce identical frames"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.set_sheets_backend(fixture_backend())
+        self.addCleanup(sheets_io.set_sheets_backend, None)
+
+    def test_identical_frames(self):
+        """Both entry points should parse every dashboard sheet the same way"""
+        all_data = sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+        for sheet_name, title in [
+            ("Expenses", "Expenses"),
+            ("Donations", "Donations"),
+            ("Investors", "Investors"),
+            ("Widows", "Almanot"),
+        ]:
+            with self.subTest(sheet=sheet_name):
+                pd.testing.assert_frame_equal(sheets_io.read_sheet(sheet_name), all_data[title])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Sheet Stream Tests for Omri Association Dashboard
+Tests paged streaming reads of large worksheets
+"""
+
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import src.google_sheets_io as sheets_io
+from src.sheet_schemas import parse_sheet
+from src.sheet_stream import collect_pages, iter_sheet_pages
+from src.sheets_backend import LocalBackend
+from tests.test_google_sheets_io import use_unthrottled_scheduler
+
+
+def ledger_rows(count):
+    """A Donations ledger with ``count`` data rows"""
+    rows = [["עמרי למען משפחות השכול- תרומות"], ["תאריך", "שם התורם", "סכום"]]
+    rows.extend(
+        [f"{i % 28 + 1:02d}.01.2024", f"תורם {i % 5}", f"{i + 1},000"] for i in range(count)
+    )
+    return rows
+
+
+class TestIterSheetPages(unittest.TestCase):
+    """Test iter_sheet_pages on a LocalBackend"""
+
+    def setUp(self):
+        self.rows = ledger_rows(23)
+        self.backend = LocalBackend(workbooks={"book": {"Donations": self.rows}})
+        self.spreadsheet = self.backend.open("book")
+
+    def fetch(self, ranges):
+        return self.backend.batch_read(self.spreadsheet, ranges)
+
+    def test_pages_match_full_parse(self):
+        """Concatenated pages should equal parsing the whole sheet at once"""
+        pages = list(iter_sheet_pages(self.fetch, "'Donations'", "Donations", page_rows=10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        pd.testing.assert_frame_equal(
+            collect_pages(iter(pages), pd.DataFrame()), parse_sheet("Donations", self.rows)
+        )
+        # Header rows travel with the first page; without a row count the stream
+        # ends at the first empty page
+        self.assertEqual(self.backend.requests["batch_read"], 4)
+
+    def test_blank_rows_inside_data(self):
+        """With a known row count, a blank page should not end the stream"""
+        rows = self.rows[:12] + [[]] * 10 + self.rows[12:]
+        backend = LocalBackend(workbooks={"book": {"Donations": rows}})
+        spreadsheet = backend.open("book")
+        pages = iter_sheet_pages(
+            lambda ranges: backend.batch_read(spreadsheet, ranges),
+            "'Donations'",
+            "Donations",
+            page_rows=5,
+            row_count=len(rows),
+        )
+        self.assertEqual(sum(len(page) for page in pages), 23)
+
+    def test_aggregate_without_materializing(self):
+        """Aggregations should be able to fold over the pages"""
+        total = sum(
+            page["שקלים"].sum()
+            for page in iter_sheet_pages(self.fetch, "'Donations'", "Donations", page_rows=4)
+        )
+        self.assertEqual(total, sum((i + 1) * 1000 for i in range(23)))
+
+    def test_empty_sheet(self):
+        """A sheet without header rows yields no pages"""
+        backend = LocalBackend(workbooks={"book": {"Donations": []}})
+        spreadsheet = backend.open("book")
+        pages = iter_sheet_pages(
+            lambda ranges: backend.batch_read(spreadsheet, ranges), "'Donations'", "Donations"
+        )
+        self.assertEqual(list(pages), [])
+
+
+class TestStreamingReadSheet(unittest.TestCase):
+    """Test read_sheet and iter_sheet on large worksheets"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        self.rows = ledger_rows(30)
+        self.backend = LocalBackend(workbooks={sheets_io.SPREADSHEET_ID: {"Donations": self.rows}})
+        sheets_io.set_sheets_backend(self.backend)
+        self.addCleanup(sheets_io.set_sheets_backend, None)
+
+    def test_large_sheets_are_streamed(self):
+        """read_sheet should page through sheets above the streaming threshold"""
+        expected = sheets_io.read_sheet("Donations")
+        with mock.patch.object(sheets_io, "SHEETS_STREAM_MIN_ROWS", 10), mock.patch.object(
+            sheets_io, "SHEETS_PAGE_ROWS", 400
+        ):
+            streamed = sheets_io.read_sheet("Donations")
+        pd.testing.assert_frame_equal(streamed, expected)
+        self.assertEqual(self.backend.requests["batch_read"], 3)  # grid of 1000 rows
+
+    def test_iter_sheet(self):
+        """iter_sheet should yield typed pages"""
+        pages = list(sheets_io.iter_sheet("Donations", page_rows=500))
+        self.assertEqual(sum(len(page) for page in pages), 30)
+        self.assertEqual(pages[0]["שקלים"].dtype, "float64")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Sheets Backend Tests for Omri Association Dashboard
+Tests the offline LocalBackend and the Sheets I/O layer running on top of it
+"""
+
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import src.google_sheets_io as sheets_io
+from src.sheets_backend import LocalBackend, load_fixture_workbooks
+from tests.test_google_sheets_io import use_unthrottled_scheduler
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "sheets")
+MAIN_FIXTURE = "1zo3Rnmmykvd55owzQyGPSjx6cYfy4SB3SZc-Ku7UcOo"
+WIDOW_FIXTURE = "1FQRFhChBVUI8G7GrJW8BZInxJ2F25UhMT-fj-O6odv8"
+
+
+def fixture_backend(**kwargs):
+    """Build a LocalBackend serving the fixture workbooks under the configured ids"""
+    workbooks = load_fixture_workbooks(FIXTURE_DIR)
+    return LocalBackend(
+        workbooks={
+            sheets_io.SPREADSHEET_ID: workbooks[MAIN_FIXTURE],
+            sheets_io.WIDOW_SPREADSHEET_ID: workbooks[WIDOW_FIXTURE],
+        },
+        **kwargs,
+    )
+
+
+class TestLocalBackend(unittest.TestCase):
+    """Test the LocalBackend itself"""
+
+    def setUp(self):
+        self.backend = LocalBackend(
+            workbooks={"book": {"Sheet": [["a", "b", "c"], ["1", "2"], ["3", "4", "5"]]}}
+        )
+        self.spreadsheet = self.backend.open("book")
+
+    def test_lists_worksheets(self):
+        """Worksheets should be listed in order with titles and ids"""
+        worksheets = self.backend.list_worksheets(self.spreadsheet)
+        self.assertEqual([(ws.title, ws.id) for ws in worksheets], [("Sheet", 0)])
+
+    def test_batch_read_ranges(self):
+        """A1 ranges should be sliced like the values API"""
+        whole, rows, cells = self.backend.batch_read(
+            self.spreadsheet, ["'Sheet'", "'Sheet'!2:3", "'Sheet'!B2:C"]
+        )
+        self.assertEqual(whole, [["a", "b", "c"], ["1", "2"], ["3", "4", "5"]])
+        self.assertEqual(rows, [["1", "2"], ["3", "4", "5"]])
+        self.assertEqual(cells, [["2"], ["4", "5"]])
+
+    def test_read_worksheet_pads_rows(self):
+        """Whole-sheet reads should be padded like get_all_values()"""
+        worksheet = self.spreadsheet.worksheet("Sheet")
+        self.assertEqual(self.backend.read_worksheet(worksheet)[1], ["1", "2", ""])
+
+    def test_typed_reads(self):
+        """Typed reads should return numbers and serial dates, formatted reads strings"""
+        backend = LocalBackend(
+            workbooks={"book": {"Sheet": [[datetime.date(2024, 1, 5), 1500, "₪ 1,500", "12"]]}}
+        )
+        spreadsheet = backend.open("book")
+        (typed,) = backend.batch_read(spreadsheet, ["'Sheet'"], typed=True)
+        (formatted,) = backend.batch_read(spreadsheet, ["'Sheet'"])
+        self.assertEqual(typed, [[45296.0, 1500, "₪ 1,500", 12]])
+        self.assertEqual(formatted, [["2024-01-05", "1500", "₪ 1,500", "12"]])
+
+    def test_write_bumps_revision(self):
+        """Writes should change cells and the revision marker"""
+        worksheet = self.spreadsheet.worksheet("Sheet")
+        before = self.backend.revision("book")
+        self.backend.batch_write(worksheet, [{"range": "C2:C2", "values": [["9"]]}])
+        self.assertEqual(worksheet.rows[1], ["1", "2", "9"])
+        self.assertNotEqual(self.backend.revision("book"), before)
+
+    def test_injected_latency(self):
+        """Every request should sleep for the configured latency"""
+        sleeps = []
+        backend = LocalBackend(
+            workbooks={"book": {"Sheet": [["a"]]}}, latency=0.25, sleep=sleeps.append
+        )
+        spreadsheet = backend.open("book")
+        backend.batch_read(spreadsheet, ["'Sheet'"])
+        self.assertEqual(sleeps, [0.25, 0.25])
+        self.assertEqual(backend.requests, {"open": 1, "batch_read": 1})
+
+    def test_csv_and_parquet_fixtures(self):
+        """Fixture directories should load CSV grids and Parquet frames"""
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "book"))
+            with open(os.path.join(directory, "book", "Raw.csv"), "w", encoding="utf-8") as f:
+                f.write("title\nשם,סכום\nא,5\n")
+            pd.DataFrame({"שם": ["ב"], "סכום": [7]}).to_parquet(
+                os.path.join(directory, "book", "Frame.parquet")
+            )
+            workbooks = load_fixture_workbooks(directory)
+        self.assertEqual(workbooks["book"]["Raw"], [["title"], ["שם", "סכום"], ["א", "5"]])
+        self.assertEqual(workbooks["book"]["Frame"], [["שם", "סכום"], ["ב", "7"]])
+
+
+class TestSheetsIOOnLocalBackend(unittest.TestCase):
+    """Test load_all_data, read_sheet and write_sheet offline"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        self.backend = fixture_backend()
+        sheets_io.set_sheets_backend(self.backend)
+        self.addCleanup(sheets_io.set_sheets_backend, None)
+
+    def test_load_all_data(self):
+        """The dashboard sheets should load from the fixtures"""
+        all_data = sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+        self.assertEqual(set(all_data), {"Expenses", "Donations", "Investors", "Almanot"})
+        self.assertEqual(list(all_data["Expenses"]["שקלים"]), [1000, 250, 1200])
+        self.assertEqual(self.backend.requests["batch_read"], 1)
+
+    def test_read_sheet_resolves_alias(self):
+        """read_sheet('Widows') should read the Almanot fixture"""
+        widows = sheets_io.read_sheet("Widows")
+        self.assertEqual(len(widows), 2)
+        self.assertIn("שם ", widows.columns)
+
+    def test_widow_support(self):
+        """The widow support workbook should load from its own fixture"""
+        self.assertEqual(len(sheets_io.read_widow_support_data()), 2)
+
+    def test_write_then_read(self):
+        """Written frames should be visible to later reads"""
+        df = pd.DataFrame({"שם": ["א", "ב"], "סכום": ["1", "2"]})
+        sheets_io.write_sheet("Investors", df)
+        worksheet = self.backend.spreadsheets[sheets_io.SPREADSHEET_ID].worksheet("Investors")
+        self.assertEqual(worksheet.rows[:3], [["שם", "סכום", ""], ["א", "1", ""], ["ב", "2", ""]])
+
+    def test_typed_render_mode(self):
+        """Typed mode should fetch ledgers unformatted in a second batch, with equal frames"""
+        formatted = sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+        sheets_io.set_sheets_backend(self.backend)  # drop the ledger sync baselines
+        with mock.patch.object(sheets_io, "SHEETS_VALUE_RENDER", "typed"):
+            typed = sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+            self.assertEqual(sheets_io.get_last_load_stats()["requests"], 3)
+        for title in formatted:
+            pd.testing.assert_frame_equal(typed[title], formatted[title])
+
+    def test_no_credentials_needed(self):
+        """The service account check should pass on a local backend"""
+        self.assertTrue(sheets_io.uses_local_backend())
+        self.assertTrue(sheets_io.check_service_account_validity())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Sheets Metrics Tests for Omri Association Dashboard
+Tests the per-call instrumentation of Google Sheets requests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import src.google_sheets_io as sheets_io
+from src.sheets_metrics import SheetsMetrics, payload_size, sheet_of_range, sheet_sizes
+from src.sheets_scheduler import READ, WRITE, RequestScheduler
+from tests.test_google_sheets_io import use_unthrottled_scheduler
+from tests.test_sheets_backend import fixture_backend
+from tests.test_sheets_scheduler import FakeClock, FlakyRequest
+
+
+class Worksheet:
+    def __init__(self, title):
+        self.title = title
+
+
+def batch_read(spreadsheet, ranges, typed=False):
+    return [[["a", "b"], ["1", "2"]] for _ in ranges]
+
+
+class TestSheetSizes(unittest.TestCase):
+    """Test attributing rows and bytes to worksheets"""
+
+    def test_sheet_of_range(self):
+        self.assertEqual(sheet_of_range("'Donations'!A2:C10"), "Donations")
+        self.assertEqual(sheet_of_range("'Widows Support'"), "Widows Support")
+        self.assertEqual(sheet_of_range("'It''s!'!1:2"), "It's!")
+
+    def test_batch_read_per_sheet(self):
+        ranges = ["'Donations'!1:1", "'Donations'!2:3", "'Expenses'"]
+        sizes = sheet_sizes("batch_read", (None, ranges), batch_read(None, ranges))
+        self.assertEqual(sizes["Donations"][0], 4)
+        self.assertEqual(sizes["Expenses"][0], 2)
+        self.assertEqual(sizes["Expenses"][1], len(json.dumps([["a", "b"], ["1", "2"]])))
+
+    def test_write_counts_rows_sent(self):
+        data = [{"range": "A1", "values": [["x"], ["y"]]}]
+        self.assertEqual(
+            sheet_sizes("batch_write", (Worksheet("Investors"), data), None)["Investors"][0], 2
+        )
+
+    def test_payload_size_estimates_json(self):
+        rows = [["05.01.2024", "תורם", "5000"], ["06.01.2024", "תורם ב", 700]]
+
+        def json_bytes(values):
+            return len(json.dumps(values, ensure_ascii=False).encode("utf-8"))
+
+        self.assertEqual(payload_size(rows[:1]), json_bytes(rows[:1]))
+        self.assertAlmostEqual(payload_size(rows), json_bytes(rows), delta=2)
+        self.assertEqual(payload_size([]), 2)
+
+    def test_spreadsheet_level_call(self):
+        self.assertEqual(sheet_sizes("revision", ("sheet-id",), "7"), {"": (0, 0)})
+
+
+class TestSheetsMetrics(unittest.TestCase):
+    """Test aggregation, percentiles and the JSON/Prometheus output"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.metrics = SheetsMetrics(clock=self.clock)
+        self.metrics.set_quotas({READ: 60, WRITE: 60})
+
+    def test_percentiles_per_call(self):
+        for ms in range(1, 101):
+            self.metrics.observe(batch_read, (None, ["'Donations'"]), [[["x"]]], READ, ms / 1000)
+        call = self.metrics.summary()["calls"]["batch_read"]
+        self.assertEqual(call["calls"], 100)
+        self.assertAlmostEqual(call["p50"], 0.0505, places=4)
+        self.assertAlmostEqual(call["p95"], 0.09505, places=4)
+        self.assertAlmostEqual(call["p99"], 0.09901, places=4)
+        self.assertEqual(self.metrics.summary()["sheets"]["Donations"]["rows"], 100)
+
+    def test_errors_retries_and_quota(self):
+        self.metrics.observe(
+            batch_read, (None, []), None, READ, 1.0, retries=2, throttled=2, ok=False
+        )
+        summary = self.metrics.summary()
+        self.assertEqual(summary["calls"]["batch_read"]["errors"], 1)
+        self.assertEqual(summary["totals"]["throttled"], 2)
+        self.assertEqual(summary["quota"][READ]["used"], 3)
+        self.clock.now += 61
+        self.assertEqual(self.metrics.summary()["quota"][READ]["used"], 0)
+
+    def test_quota_window_is_pruned_without_summaries(self):
+        for _ in range(5):
+            self.metrics.observe(batch_read, (None, []), [], READ, 0.1)
+            self.clock.now += 30
+        self.assertEqual(len(self.metrics._recent[READ]), 2)
+
+    def test_prometheus_text(self):
+        self.metrics.observe(batch_read, (None, ["'Donations'"]), [[["x"]]], READ, 0.25)
+        text = self.metrics.to_prometheus()
+        self.assertIn("# TYPE sheets_request_latency_seconds summary", text)
+        self.assertIn('sheets_calls_total{call="batch_read"} 1', text)
+        self.assertIn(
+            'sheets_request_latency_seconds{call="batch_read",quantile="0.99"} 0.25', text
+        )
+        self.assertIn('sheets_sheet_rows_total{sheet="Donations"} 1', text)
+        self.assertIn('sheets_quota_limit{kind="read"} 60', text)
+        json.loads(self.metrics.to_json())
+
+    def test_export_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "sheets.prom")
+            metrics = SheetsMetrics(export_path=path, export_interval=60, clock=self.clock)
+            metrics.observe(batch_read, (None, []), [], READ, 0.1)
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("sheets_calls_total", f.read())
+
+    def test_scheduler_records_retries(self):
+        scheduler = RequestScheduler(
+            read_quota_per_minute=60000, sleep=lambda _: None, metrics=self.metrics
+        )
+        self.assertEqual(scheduler.call(FlakyRequest(429, 503)), "ok")
+        (call,) = self.metrics.summary()["calls"].values()
+        self.assertEqual((call["calls"], call["retries"], call["throttled"]), (1, 2, 1))
+
+
+class TestSheetsIOMetrics(unittest.TestCase):
+    """Test that the Sheets I/O layer reports its calls"""
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        sheets_io.set_sheets_backend(fixture_backend())
+        self.addCleanup(sheets_io.set_sheets_backend, None)
+
+    def test_load_all_data_is_instrumented(self):
+        sheets_io.load_all_data(sheets_io.DASHBOARD_SHEETS)
+        summary = sheets_io.get_sheets_metrics()
+        self.assertEqual(summary["calls"]["batch_read"]["calls"], 1)
+        self.assertGreater(summary["sheets"]["Donations"]["rows"], 0)
+        self.assertGreater(summary["totals"]["bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
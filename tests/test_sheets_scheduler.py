@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Request Scheduler Tests for Omri Association Dashboard
+Tests rate limiting, priority lanes and retries of Google Sheets requests
+"""
+
+import threading
+import time
+import unittest
+
+from src.sheets_scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    WRITE,
+    RequestScheduler,
+    TokenBucket,
+    status_code_of,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeHTTPResponse:
+    """Response carrying only a status code and headers"""
+
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeHTTPError(Exception):
+    """Error shaped like requests.HTTPError / gspread APIError"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeHTTPResponse(status_code, headers)
+
+
+class FlakyRequest:
+    """Callable failing with the given statuses before succeeding"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.statuses:
+            raise FakeHTTPError(self.statuses.pop(0))
+        return "ok"
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test the token bucket"""
+
+    def test_burst_then_refill(self):
+        """The bucket should allow a burst and then refill at its rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(capacity=2, rate=1.0, clock=clock)
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 1.0)
+        clock.now = 1.0
+        self.assertEqual(bucket.take(), 0)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """Test retries, counters and lanes"""
+
+    def setUp(self):
+        self.sleeps = []
+        self.scheduler = RequestScheduler(sleep=self.sleeps.append, base_delay=1.0, max_retries=3)
+
+    def test_retries_throttled_requests(self):
+        """429 and 5xx responses should be retried with growing delays"""
+        request = FlakyRequest(429, 503, 429)
+        self.assertEqual(self.scheduler.call(request), "ok")
+        self.assertEqual(request.calls, 4)
+        self.assertEqual(len(self.sleeps), 3)
+        # Jittered delays stay within [d/2, d] of 1s, 2s, 4s
+        for delay, nominal in zip(self.sleeps, [1, 2, 4]):
+            self.assertGreaterEqual(delay, nominal / 2)
+            self.assertLessEqual(delay, nominal)
+        stats = self.scheduler.stats()
+        self.assertEqual(stats["throttled"], 2)
+        self.assertEqual(stats["server_errors"], 1)
+        self.assertEqual(stats["retries"], 3)
+
+    def test_gives_up_after_max_retries(self):
+        """The last error should be raised once the retries are exhausted"""
+        request = FlakyRequest(429, 429, 429, 429, 429)
+        with self.assertRaises(FakeHTTPError):
+            self.scheduler.call(request)
+        self.assertEqual(request.calls, 4)
+        self.assertEqual(self.scheduler.stats()["failures"], 1)
+
+    def test_other_errors_are_not_retried(self):
+        """Client errors other than 429 should propagate immediately"""
+        request = FlakyRequest(404)
+        with self.assertRaises(FakeHTTPError):
+            self.scheduler.call(request)
+        self.assertEqual(request.calls, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_retry_after_is_respected(self):
+        """A Retry-After header should lengthen the backoff"""
+
+        attempts = []
+
+        def throttled_once():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise FakeHTTPError(429, {"Retry-After": "7"})
+            return "ok"
+
+        self.assertEqual(self.scheduler.call(throttled_once), "ok")
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_lane_is_counted(self):
+        """Requests should be attributed to the lane they run in"""
+        self.scheduler.call(lambda: None)
+        with self.scheduler.lane(BACKGROUND):
+            self.scheduler.call(lambda: None, kind=WRITE)
+        stats = self.scheduler.stats()
+        self.assertEqual(stats[INTERACTIVE], 1)
+        self.assertEqual(stats[BACKGROUND], 1)
+        self.assertEqual(stats["requests"], 2)
+
+    def test_interactive_requests_overtake_background(self):
+        """A queued interactive request should be served before an earlier background one"""
+        # One token of burst, refilled every 0.1s
+        scheduler = RequestScheduler(read_quota_per_minute=600, burst_seconds=0.1)
+        scheduler.call(lambda: None)
+        order = []
+
+        def run(lane):
+            with scheduler.lane(lane):
+                scheduler.call(order.append, lane)
+
+        background = threading.Thread(target=run, args=(BACKGROUND,))
+        interactive = threading.Thread(target=run, args=(INTERACTIVE,))
+        background.start()
+        time.sleep(0.02)
+        interactive.start()
+        background.join(2)
+        interactive.join(2)
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+    def test_status_code_of(self):
+        """Status codes should be read from the error or its response"""
+        self.assertEqual(status_code_of(FakeHTTPError(429)), 429)
+        self.assertIsNone(status_code_of(ValueError("boom")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Sheets Service Tests for Omri Association Dashboard
+Tests the service layer that assembles dashboard data from the workbooks
+"""
+
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import services.sheets as sheets_service
+import src.google_sheets_io as sheets_io
+from services.snapshot_store import SnapshotStore
+from src.multi_year import MultiYearFrames
+from src.sheets_backend import LocalBackend, load_fixture_workbooks
+from tests.test_google_sheets_io import use_unthrottled_scheduler
+from tests.test_sheets_backend import FIXTURE_DIR, MAIN_FIXTURE, fixture_backend
+
+
+def slow(result, seconds):
+    """Return a job that sleeps before returning ``result``"""
+
+    def _job():
+        time.sleep(seconds)
+        return result
+
+    return _job
+
+
+class TestConcurrentWorkbookFetch(unittest.TestCase):
+    """Test fetching the main and widow-support workbooks in parallel"""
+
+    def setUp(self):
+        self.frames = {"Expenses": pd.DataFrame({"שקלים": [1.0]})}
+        self.widows = pd.DataFrame({"שם הבחורה": ["אלמנה א"]})
+        patcher = patch.object(sheets_service, "get_sheets_backend", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetches_run_concurrently(self):
+        """Total latency should be close to the slowest fetch, not the sum"""
+        with patch.object(
+            sheets_service, "fetch_dashboard_frames", slow(self.frames, 0.3)
+        ), patch.object(sheets_service, "read_widow_support_data", slow(self.widows, 0.3)):
+            bundle = sheets_service.fetch_all_workbooks(timeout=5)
+        self.assertTrue(bundle.complete)
+        self.assertLess(bundle.total_seconds, 0.55)
+        self.assertIs(bundle.frames, self.frames)
+        self.assertIs(bundle.widow_support, self.widows)
+        self.assertEqual(set(bundle.durations), {"dashboard", "widow_support"})
+
+    def test_timeout_is_reported(self):
+        """A fetch exceeding the timeout should be reported and replaced with empty data"""
+        with patch.object(
+            sheets_service, "fetch_dashboard_frames", slow(self.frames, 0.01)
+        ), patch.object(sheets_service, "read_widow_support_data", slow(self.widows, 1.0)):
+            bundle = sheets_service.fetch_all_workbooks(timeout=0.2)
+        self.assertFalse(bundle.complete)
+        self.assertIn("widow_support", bundle.errors)
+        self.assertTrue(bundle.widow_support.empty)
+        self.assertIs(bundle.frames, self.frames)
+
+    def test_failure_is_reported(self):
+        """A failing fetch should not break the other one"""
+
+        def boom():
+            raise RuntimeError("quota exceeded")
+
+        with patch.object(sheets_service, "fetch_dashboard_frames", boom), patch.object(
+            sheets_service, "read_widow_support_data", slow(self.widows, 0)
+        ):
+            bundle = sheets_service.fetch_all_workbooks(timeout=5)
+        self.assertIn("quota exceeded", bundle.errors["dashboard"])
+        self.assertEqual(set(bundle.frames), {"Expenses", "Donations", "Investors", "Widows"})
+        self.assertIs(bundle.widow_support, self.widows)
+
+
+class TestFrameCompaction(unittest.TestCase):
+    """Test the compaction stage after ingestion"""
+
+    def test_loaded_frames_are_compacted(self):
+        """Ingested frames should be compacted and the memory report recorded"""
+        donations = pd.DataFrame(
+            {"שם": pd.Series(["א", "א", "א", "ב"], dtype=object), "שקלים": [1.0, 2.0, 3.0, 4.0]}
+        )
+        with patch.object(
+            sheets_service, "load_all_data", return_value={"Donations": donations}
+        ), patch.object(sheets_service.Config, "COMPACT_FRAMES", True), patch.object(
+            sheets_service.SNAPSHOT_STORE, "enabled", False
+        ):
+            frames = sheets_service._load_and_snapshot()
+        self.assertIsInstance(frames["Donations"]["שם"].dtype, pd.CategoricalDtype)
+        report = sheets_service.get_memory_report()
+        self.assertIn("Donations", list(report["frames"]["frame"]))
+
+
+class TestArchiveWorkbooks(unittest.TestCase):
+    """Test archived-year workbooks that are fetched once and frozen"""
+
+    ARCHIVE_ID = "archive-2023"
+
+    def setUp(self):
+        use_unthrottled_scheduler(self)
+        self.backend = LocalBackend(
+            workbooks={self.ARCHIVE_ID: load_fixture_workbooks(FIXTURE_DIR)[MAIN_FIXTURE]}
+        )
+        sheets_io.set_sheets_backend(self.backend)
+        self.addCleanup(sheets_io.set_sheets_backend, None)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        patcher = patch.object(sheets_service, "SNAPSHOT_STORE", SnapshotStore(tmpdir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for archives in (sheets_service._ARCHIVES, sheets_service._ARCHIVE_VERSIONS):
+            patcher = patch.dict(archives, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def forget_archives(self):
+        """Drop the in-memory archives, as a restarted process would"""
+        sheets_service._ARCHIVES.clear()
+        sheets_service._ARCHIVE_VERSIONS.clear()
+
+    def test_archive_fetched_once(self):
+        """Later calls should be served from memory without any request"""
+        (first,) = sheets_service.fetch_archives([self.ARCHIVE_ID])[0]
+        self.assertFalse(first["Donations"].empty)
+        requests = dict(self.backend.requests)
+        (second,) = sheets_service.fetch_archives([self.ARCHIVE_ID])[0]
+        self.assertIs(second, first)
+        self.assertEqual(self.backend.requests, requests)
+
+    def test_archive_frozen_in_snapshot(self):
+        """A new process should load the archive from its snapshot, not from Sheets"""
+        (first,) = sheets_service.fetch_archives([self.ARCHIVE_ID])[0]
+        self.forget_archives()
+        requests = dict(self.backend.requests)
+        (reloaded,) = sheets_service.fetch_archives([self.ARCHIVE_ID])[0]
+        self.assertEqual(self.backend.requests, requests)
+        self.assertEqual(len(reloaded["Donations"]), len(first["Donations"]))
+
+    def test_failed_archive_is_retried(self):
+        self.assertEqual(sheets_service.fetch_archives(["missing"])[0], [])
+        self.assertNotIn("missing", sheets_service._ARCHIVES)
+
+    def test_bundle_concatenates_years(self):
+        """fetch_all_workbooks should expose the archive and current years as one frame"""
+        backend = fixture_backend()
+        backend.spreadsheets[self.ARCHIVE_ID] = self.backend.spreadsheets[self.ARCHIVE_ID]
+        sheets_io.set_sheets_backend(backend)
+        with patch.object(sheets_service.Config, "ARCHIVE_SPREADSHEET_IDS", [self.ARCHIVE_ID]):
+            bundle = sheets_service.fetch_all_workbooks(fresh=True)
+        self.assertIsInstance(bundle.frames, MultiYearFrames)
+        self.assertIsNotNone(bundle.frames.archive_version)
+        (archive,) = sheets_service.fetch_archives([self.ARCHIVE_ID])[0]
+        self.assertEqual(
+            len(bundle.frames["Donations"]),
+            len(archive["Donations"]) + len(bundle.frames._current["Donations"]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
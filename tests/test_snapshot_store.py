@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Snapshot Store Tests for Omri Association Dashboard
+Tests the on-disk Parquet snapshot used for warm starts
+"""
+
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from services.snapshot_store import SnapshotStore, compute_frames_version
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Test saving and loading versioned Parquet snapshots"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.store = SnapshotStore(self.tmpdir.name)
+        self.frames = {
+            "Donations": pd.DataFrame(
+                {
+                    "תאריך": pd.to_datetime(["2024-01-01", "2024-02-01"]),
+                    "שם": ["תורם א", "תורם ב"],
+                    "שקלים": [5000.0, 3000.0],
+                }
+            ),
+            "Widows": pd.DataFrame({"שם ": ["אלמנה א"], "סכום חודשי": [2000.0]}),
+        }
+
+    def test_round_trip(self):
+        """Saved frames should load back unchanged with the same version"""
+        version = self.store.save("dashboard", self.frames)
+        loaded = self.store.load("dashboard")
+        self.assertIsNotNone(loaded)
+        frames, manifest = loaded
+        self.assertEqual(manifest["version"], version)
+        pd.testing.assert_frame_equal(frames["Donations"], self.frames["Donations"])
+        pd.testing.assert_frame_equal(frames["Widows"], self.frames["Widows"])
+
+    def test_missing_snapshot(self):
+        """Loading an unknown snapshot should return None"""
+        self.assertIsNone(self.store.load("nothing"))
+
+    def test_version_tracks_content(self):
+        """The version stamp should change only when the data changes"""
+        same = {name: frame.copy() for name, frame in self.frames.items()}
+        self.assertEqual(compute_frames_version(self.frames), compute_frames_version(same))
+        same["Donations"].loc[0, "שקלים"] = 1.0
+        self.assertNotEqual(compute_frames_version(self.frames), compute_frames_version(same))
+
+    def test_new_version_replaces_old_files(self):
+        """Saving a new version should leave only the new Parquet files behind"""
+        self.store.save("dashboard", self.frames)
+        changed = dict(self.frames, Widows=pd.DataFrame({"שם ": ["אלמנה ב"]}))
+        version = self.store.save("dashboard", changed)
+        files = os.listdir(os.path.join(self.tmpdir.name, "dashboard"))
+        parquet_files = [f for f in files if f.endswith(".parquet")]
+        self.assertEqual(len(parquet_files), 2)
+        self.assertTrue(all(version in f for f in parquet_files))
+
+    def test_disabled_store(self):
+        """A disabled store should neither write nor read"""
+        store = SnapshotStore(self.tmpdir.name, enabled=False)
+        self.assertIsNone(store.save("dashboard", self.frames))
+        self.assertIsNone(store.load("dashboard"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Statistics Cache Tests for Omri Association Dashboard
+Tests caching the statistics per dataset version instead of per DataFrame hash
+"""
+
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import src.stats_cache as stats_cache
+from src.data_processing import calculate_donor_statistics
+from src.stats_cache import StatsCache, cached_by_version
+from ui.dashboard_core import process_dashboard_data
+
+
+class TestCachedByVersion(unittest.TestCase):
+    """Test the (function, version, params) cache"""
+
+    def setUp(self):
+        patcher = patch.object(stats_cache, "STATS_CACHE", StatsCache(max_entries=3))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+        @cached_by_version
+        def total(df, column="שקלים"):
+            self.calls.append(column)
+            return {"total": df[column].sum()}
+
+        self.total = total
+        self.df = pd.DataFrame({"שקלים": [1.0, 2.0], "סכום": [5.0, 5.0]})
+
+    def test_hit_skips_computation(self):
+        self.assertEqual(self.total(self.df, version="v1"), {"total": 3.0})
+        self.assertEqual(self.total(self.df, version="v1"), {"total": 3.0})
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_key_includes_version_and_params(self):
+        self.total(self.df, version="v1")
+        self.total(self.df, version="v2")
+        self.total(self.df, column="סכום", version="v1")
+        self.assertEqual(len(self.calls), 3)
+
+    def test_without_version_always_computes(self):
+        self.total(self.df)
+        self.total(self.df)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_different_frames_under_one_version(self):
+        self.total(self.df, version="v1")
+        self.total(self.df.assign(שקלים=[1.0, 7.0]), version="v1")
+        self.total(self.df.iloc[:1], version="v1")
+        self.total(self.df.copy(), version="v1")
+        self.assertEqual(len(self.calls), 3)
+
+    def test_hits_are_copies(self):
+        self.total(self.df, version="v1")["total"] = -1
+        self.assertEqual(self.total(self.df, version="v1"), {"total": 3.0})
+
+    def test_lru_and_invalidate(self):
+        for version in ("v1", "v2", "v3", "v4"):
+            self.total(self.df, version=version)
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self.total(self.df, version="v1")  # evicted, computed again
+        self.assertEqual(len(self.calls), 5)
+        self.cache.invalidate("v1")
+        self.total(self.df, version="v1")
+        self.assertEqual(len(self.calls), 6)
+
+    def test_statistics_functions_accept_version(self):
+        donations = pd.DataFrame({"שם": ["א", "ב"], "שקלים": [1.0, 2.0]})
+        first = calculate_donor_statistics(donations, version="v1")
+        with patch("src.data_processing._get_name_column", side_effect=AssertionError):
+            self.assertEqual(calculate_donor_statistics(donations, version="v1"), first)
+
+
+class TestProcessDashboardData(unittest.TestCase):
+    """Test that processing leaves the session's frames untouched"""
+
+    def test_inputs_are_not_modified(self):
+        expenses = pd.DataFrame({"תאריך": ["01.01.2024"], "שם": ["ספק"], "שקלים": ["1,000"]})
+        donations = pd.DataFrame({"תאריך": ["01.01.2024"], "שם": ["תורם"], "שקלים": ["₪ 2,000"]})
+        widows = pd.DataFrame({"שם ": ["א"], "סכום חודשי": ["₪1,000"], "מספר ילדים": ["2"]})
+        originals = [df.copy() for df in (expenses, donations, widows)]
+        budget, _, widow_stats = process_dashboard_data(expenses, donations, widows)
+        for df, original in zip((expenses, donations, widows), originals):
+            pd.testing.assert_frame_equal(df, original)
+        self.assertEqual(budget["total_donations"], 2000.0)
+        self.assertEqual(widow_stats["total_support"], 1000.0)
+
+    def test_failures_are_not_cached(self):
+        expenses = pd.DataFrame({"תאריך": ["01.01.2024"], "שם": ["ספק"], "שקלים": ["1,000"]})
+        donations = pd.DataFrame({"תאריך": ["01.01.2024"], "שם": ["תורם"], "שקלים": ["2,000"]})
+        widows = pd.DataFrame({"שם ": ["א"], "סכום חודשי": ["₪1,000"], "מספר ילדים": ["2"]})
+        with patch(
+            "ui.dashboard_core.calculate_monthly_budget", side_effect=ValueError("boom")
+        ), patch("ui.dashboard_core.st"):
+            budget, _, _ = process_dashboard_data(expenses, donations, widows, version="vf")
+        self.assertEqual(budget["total_budget"], 0)
+        budget, _, _ = process_dashboard_data(expenses, donations, widows, version="vf")
+        self.assertEqual(budget["total_donations"], 2000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,12 +5,12 @@ Handles core dashboard logic, data loading, and processing
 """
 
 import logging
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
 
-from services.sheets import fetch_dashboard_frames
+from services.refresher import current_dataset
 
 # Config import moved to avoid circular imports
 from src.alerts import (
@@ -24,7 +24,13 @@ from src.data_processing import (
     calculate_monthly_budget,
     calculate_widow_statistics,
 )
+from src.date_parsing import parse_dates
+from src.donor_index import DonorIndex
 from src.google_sheets_io import check_service_account_validity
+from src.incremental import DatasetAggregates
+from src.rollups import Rollups
+from src.sheet_schemas import parse_amounts
+from src.stats_cache import cached_by_version
 from ui.dashboard_layout import (
     create_dashboard_header,
     create_main_tabs,
@@ -41,44 +47,45 @@ from ui.dashboard_sections import (
 )
 
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def load_dashboard_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """Load all dashboard data from Google Sheets with enhanced loading states and error handling"""
     try:
-        # Check if data is already in session state
-        if (
-            "expenses_df" in st.session_state
-            and "donations_df" in st.session_state
-            and "almanot_df" in st.session_state
-            and "investors_df" in st.session_state
+        # The background refresher keeps the current dataset; this never waits on Google
+        # once the first version of the process is loaded
+        dataset = current_dataset()
+        if dataset is None:
+            st.error("❌ לא ניתן לטעון נתונים. אנא בדוק את חיבור Google Sheets")
+            return None, None, None, None
+
+        # Reuse the session's frames while the dataset version is unchanged
+        if st.session_state.get("dataset_version") == dataset.version and all(
+            st.session_state.get(key) is not None
+            for key in ("expenses_df", "donations_df", "almanot_df", "investors_df")
         ):
+            return (
+                st.session_state.expenses_df,
+                st.session_state.donations_df,
+                st.session_state.almanot_df,
+                st.session_state.investors_df,
+            )
 
-            # Use cached data
-            expenses_df = st.session_state.expenses_df
-            donations_df = st.session_state.donations_df
-            almanot_df = st.session_state.almanot_df
-            investors_df = st.session_state.investors_df
-
-            # Validate cached data
-            if (
-                expenses_df is not None
-                and donations_df is not None
-                and almanot_df is not None
-                and investors_df is not None
-            ):
-                return expenses_df, donations_df, almanot_df, investors_df
-
-        frames = fetch_dashboard_frames()
-        expenses_df = frames.get("Expenses", pd.DataFrame())
-        donations_df = frames.get("Donations", pd.DataFrame())
-        investors_df = frames.get("Investors", pd.DataFrame())
-        almanot_df = frames.get("Widows", pd.DataFrame())
+        # Sessions get shallow copies so they never change the shared version
+        frames = dataset.frames
+        expenses_df = frames.get("Expenses", pd.DataFrame()).copy(deep=False)
+        donations_df = frames.get("Donations", pd.DataFrame()).copy(deep=False)
+        investors_df = frames.get("Investors", pd.DataFrame()).copy(deep=False)
+        almanot_df = frames.get("Widows", pd.DataFrame()).copy(deep=False)
 
         # Store in session state
         st.session_state.expenses_df = expenses_df
         st.session_state.donations_df = donations_df
         st.session_state.almanot_df = almanot_df
         st.session_state.investors_df = investors_df
+        st.session_state.widow_support_df = dataset.widow_support
+        st.session_state.dataset_version = dataset.version
+        st.session_state.rollups = dataset.rollups
+        st.session_state.aggregates = dataset.aggregates
+        st.session_state.donor_index = dataset.donor_index
 
         # Validate data integrity
         if expenses_df.empty and donations_df.empty and almanot_df.empty:
@@ -101,45 +108,88 @@ def load_dashboard_data() -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.
         return None, None, None, None
 
 
-@st.cache_data(ttl=600)  # Cache for 10 minutes
+def _typed_copy(df: pd.DataFrame, conversions: Dict[str, Any]) -> pd.DataFrame:
+    """Shallow copy of ``df`` with ``conversions`` applied to the columns it has;
+    the caller's frame is never modified."""
+    if df is None or df.empty:
+        return df
+    return df.assign(
+        **{column: convert(df[column]) for column, convert in conversions.items() if column in df}
+    )
+
+
+@cached_by_version
+def _dashboard_statistics(
+    expenses_df: pd.DataFrame,
+    donations_df: pd.DataFrame,
+    almanot_df: pd.DataFrame,
+    rollups: Optional[Rollups] = None,
+    aggregates: Optional[DatasetAggregates] = None,
+    donor_index: Optional[DonorIndex] = None,
+) -> Tuple[Dict, Dict, Dict]:
+    """Budget, donor and widow statistics; errors propagate so they are never cached."""
+    if aggregates is not None and aggregates.complete:
+        return (
+            aggregates.budget_status(),
+            aggregates.donor_statistics(),
+            aggregates.widow_statistics(),
+        )
+
+    # Fix data types with validation (silent processing), on copies
+    expenses_df = _typed_copy(
+        expenses_df,
+        {"שקלים": parse_amounts, "תאריך": lambda s: parse_dates(s, sheet="Expenses")},
+    )
+    donations_df = _typed_copy(
+        donations_df,
+        {"שקלים": parse_amounts, "תאריך": lambda s: parse_dates(s, sheet="Donations")},
+    )
+    almanot_df = _typed_copy(
+        almanot_df,
+        {
+            "מספר ילדים": lambda s: pd.to_numeric(s, errors="coerce").fillna(0),
+            "סכום חודשי": parse_amounts,
+        },
+    )
+
+    # Calculate statistics (silent processing)
+    budget_status = calculate_monthly_budget(expenses_df, donations_df, rollups=rollups)
+    donor_stats = calculate_donor_statistics(donations_df, donor_index=donor_index)
+
+    widow_stats = calculate_widow_statistics(almanot_df)
+
+    return budget_status, donor_stats, widow_stats
+
+
 def process_dashboard_data(
-    expenses_df: pd.DataFrame, donations_df: pd.DataFrame, almanot_df: pd.DataFrame
+    expenses_df: pd.DataFrame,
+    donations_df: pd.DataFrame,
+    almanot_df: pd.DataFrame,
+    rollups: Optional[Rollups] = None,
+    aggregates: Optional[DatasetAggregates] = None,
+    donor_index: Optional[DonorIndex] = None,
+    version: Optional[str] = None,
 ) -> Tuple[Dict, Dict, Dict]:
-    """Process dashboard data and calculate statistics with enhanced error handling"""
+    """Process dashboard data and calculate statistics with enhanced error handling
+
+    Called with ``version`` (the dataset version token) the result is cached per
+    version, so a rerun costs a dictionary lookup; a failure shows an error and
+    returns defaults without being cached. The input frames are not modified;
+    ``rollups`` are the monthly totals of the same dataset version and
+    ``aggregates`` its incrementally maintained totals, which replace the pass
+    over the frames when they cover every statistic; ``donor_index`` is its
+    donor index.
+    """
     try:
-        # Fix data types with validation (silent processing)
-        for _df_name, df in [("expenses_df", expenses_df), ("donations_df", donations_df)]:
-            if df is not None and not df.empty:
-                if "שקלים" in df.columns:
-                    df["שקלים"] = pd.to_numeric(df["שקלים"], errors="coerce").fillna(0)
-                if "תאריך" in df.columns:
-                    df["תאריך"] = pd.to_datetime(df["תאריך"], errors="coerce")
-
-        if almanot_df is not None and not almanot_df.empty:
-            if "מספר ילדים" in almanot_df.columns:
-                almanot_df["מספר ילדים"] = pd.to_numeric(
-                    almanot_df["מספר ילדים"], errors="coerce"
-                ).fillna(0)
-            if "סכום חודשי" in almanot_df.columns:
-                # Clean the data first - remove any non-numeric characters
-                almanot_df["סכום חודשי"] = (
-                    almanot_df["סכום חודשי"]
-                    .astype(str)
-                    .str.replace("₪", "")
-                    .str.replace(",", "")
-                    .str.replace(" ", "")
-                )
-                almanot_df["סכום חודשי"] = pd.to_numeric(almanot_df["סכום חודשי"], errors="coerce")
-                # Only fill NaN with 0, not all values
-                almanot_df["סכום חודשי"] = almanot_df["סכום חודשי"].fillna(0)
-
-        # Calculate statistics (silent processing)
-        budget_status = calculate_monthly_budget(expenses_df, donations_df)
-        donor_stats = calculate_donor_statistics(donations_df)
-
-        widow_stats = calculate_widow_statistics(almanot_df)
-
-        return budget_status, donor_stats, widow_stats
+        return _dashboard_statistics(
+            expenses_df,
+            donations_df,
+            almanot_df,
+            rollups,
+            aggregates,
+            donor_index,
+            version=version,
+        )
 
     except Exception as e:
         error_msg = f"שגיאה בעיבוד נתונים: {str(e)}"
@@ -301,7 +351,13 @@ def run_dashboard() -> None:
 
         # Process data
         budget_status, donor_stats, widow_stats = process_dashboard_data(
-            expenses_df, donations_df, almanot_df
+            expenses_df,
+            donations_df,
+            almanot_df,
+            st.session_state.get("rollups"),
+            st.session_state.get("aggregates"),
+            st.session_state.get("donor_index"),
+            version=st.session_state.get("dataset_version"),
         )
 
         # Create tabs with proper state management
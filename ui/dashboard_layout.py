@@ -4,6 +4,8 @@ Dashboard Layout Module
 Handles the main dashboard structure, tabs, and layout
 """
 
+import logging
+from datetime import datetime
 
 import pandas as pd
 import streamlit as st
@@ -49,8 +51,16 @@ def create_dashboard_header():
         col1, col2 = st.columns([4, 1])
 
         with col1:
-            # Empty space for clean look
-            pass
+            # When the background refresher last published the data
+            try:
+                from services.refresher import get_refresh_status
+
+                status = get_refresh_status()
+                if status.get("refreshed_at"):
+                    refreshed = datetime.fromtimestamp(status["refreshed_at"]).strftime("%H:%M:%S")
+                    st.caption(f"🔄 עודכן לאחרונה: {refreshed} ({status['duration']:.1f} שניות)")
+            except Exception as e:
+                logging.debug(f"Refresh status unavailable: {e}")
 
         with col2:
             # Quick theme toggle and performance info
@@ -73,6 +83,8 @@ def create_dashboard_header():
                     st.info("ℹ️ מידע על ביצועים: טעינה מהירה")
 
                 show_performance_info()
+                show_memory_report()
+                show_sheets_metrics()
 
         add_spacing(1)
     except Exception:
@@ -80,6 +92,75 @@ def create_dashboard_header():
         pass
 
 
+def show_memory_report():
+    """Show bytes per frame and column before/after compaction (debug mode)"""
+    from services.sheets import get_memory_report
+
+    report = get_memory_report()
+    if not report:
+        return
+    frames = report["frames"]
+    with st.expander("🧮 זיכרון נתונים"):
+        st.caption(
+            f"{frames['bytes_before'].sum() / 1024:.0f} KB → "
+            f"{frames['bytes_after'].sum() / 1024:.0f} KB"
+        )
+        st.dataframe(frames, hide_index=True)
+        st.dataframe(report["columns"], hide_index=True)
+
+
+def show_sheets_metrics():
+    """Show Google Sheets call counts, latency percentiles and quota usage (debug mode)"""
+    from src.google_sheets_io import (
+        METRICS,
+        REVISION_CACHE,
+        get_last_load_stats,
+        get_request_stats,
+    )
+
+    summary = METRICS.summary()
+    if not summary["calls"]:
+        return
+    totals = summary["totals"]
+    last_load = get_last_load_stats()
+    requests = get_request_stats()
+    with st.expander("📡 קריאות Google Sheets"):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("קריאות", f"{totals['calls']:.0f}")
+        col2.metric("p50", f"{totals['p50']:.2f}s")
+        col3.metric("p95", f"{totals['p95']:.2f}s")
+        col4.metric("p99", f"{totals['p99']:.2f}s")
+        st.caption(
+            f"ניסיונות חוזרים: {requests['retries']}, חסימות 429: {requests['throttled']}, "
+            f"המתנה בתור: {requests['queued_seconds']:.2f}s"
+        )
+        if last_load.get("sheets"):
+            st.caption(
+                f"טעינה אחרונה: {last_load['requests']} בקשות, "
+                f"{last_load['total_bytes'] / 1024:.0f} KB, {last_load['total_seconds']:.2f}s"
+            )
+            st.dataframe(pd.DataFrame.from_dict(last_load["sheets"], orient="index"))
+        for spreadsheet_id, seen in REVISION_CACHE.last_seen().items():
+            st.caption(
+                f"גרסה {seen.get('revision')} של {spreadsheet_id}: "
+                f"{seen['hits']}/{seen['checks']} בדיקות ללא טעינה מחדש"
+            )
+        for kind, usage in summary["quota"].items():
+            if usage["limit"]:
+                st.caption(f"מכסת {kind}: {usage['used']}/{usage['limit']} בדקה האחרונה")
+        st.dataframe(pd.DataFrame.from_dict(summary["calls"], orient="index"))
+        st.dataframe(pd.DataFrame.from_dict(summary["sheets"], orient="index"))
+        st.download_button(
+            "JSON", METRICS.to_json(), file_name="sheets_metrics.json", mime="application/json"
+        )
+        st.download_button(
+            "Prometheus",
+            METRICS.to_prometheus(),
+            file_name="sheets_metrics.prom",
+            mime="text/plain",
+        )
+
+
 def create_section_header(title: str, icon: str = ""):
     """Create a consistent section header using design system tokens"""
     icon_text = f"{icon} " if icon else ""
@@ -312,7 +393,9 @@ def create_reports_section(
             try:
                 from reports.reports import generate_monthly_report
 
-                filename = generate_monthly_report(expenses_df, donations_df, almanot_df)
+                filename = generate_monthly_report(
+                    expenses_df, donations_df, almanot_df, st.session_state.get("donor_index")
+                )
                 if filename:
                     with open(filename, "rb") as file:
                         st.download_button(
@@ -328,7 +411,7 @@ def create_reports_section(
             try:
                 from reports.reports import generate_donor_report
 
-                filename = generate_donor_report(donations_df)
+                filename = generate_donor_report(donations_df, st.session_state.get("donor_index"))
                 if filename:
                     with open(filename, "rb") as file:
                         st.download_button(
@@ -361,7 +444,9 @@ def create_reports_section(
             try:
                 from reports.reports import generate_budget_report
 
-                filename = generate_budget_report(expenses_df, donations_df)
+                filename = generate_budget_report(
+                    expenses_df, donations_df, rollups=st.session_state.get("rollups")
+                )
                 if filename:
                     with open(filename, "rb") as file:
                         st.download_button(
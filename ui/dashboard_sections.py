@@ -8,6 +8,7 @@ import logging
 import re
 from typing import Dict
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -17,8 +18,18 @@ from src.data_visualization import (
     create_budget_distribution_chart,
     create_donor_contribution_chart,
     create_monthly_trends,
+    create_runway_chart,
+    create_support_projection_chart,
     create_widows_support_chart,
 )
+from src.projections import (
+    DEFAULT_HORIZON,
+    project_support,
+    projected_donations,
+    widow_commitments,
+)
+from src.runway import runway_for
+from src.scenarios import evaluate_scenarios, scenario_grid
 
 # Removed unused import: create_filter_group - CI Fix
 from ui.components.simple_ui import (
@@ -162,7 +173,9 @@ def create_budget_section(
 
     # Budget Charts
     try:
-        monthly_trends_fig = create_monthly_trends(expenses_df, donations_df)
+        monthly_trends_fig = create_monthly_trends(
+            expenses_df, donations_df, rollups=st.session_state.get("rollups")
+        )
         if monthly_trends_fig:
             st.plotly_chart(monthly_trends_fig, width="stretch", key=f"{context}_monthly_trends")
         else:
@@ -177,15 +190,77 @@ def create_budget_section(
         st.error("שגיאה בטעינת גרפים תקציביים")
         logging.error(f"Budget charts error: {e}")
 
+    if context == "budget":
+        add_spacing(2)
+        create_runway_section(budget_status)
+
     add_spacing(3)
 
 
+def create_runway_section(budget_status: Dict):
+    """Create the simulated runway of the budget tab"""
+    try:
+        st.markdown("#### 🎲 סימולציית יתרה")
+        horizon = st.slider("חודשים קדימה", 12, 60, DEFAULT_HORIZON, key="runway_horizon")
+        start = pd.Timestamp.today().normalize().replace(day=1)
+        projection = project_support(
+            widow_commitments(
+                st.session_state.get("almanot_df"), st.session_state.get("widow_support_df")
+            ),
+            horizon,
+            start=start,
+        )
+        result = runway_for(
+            st.session_state.get("rollups"),
+            (budget_status or {}).get("balance", 0.0),
+            tuple(projection["required"]),
+            horizon,
+            start=start,
+            version=st.session_state.get("dataset_version"),
+        )
+        if result is None:
+            st.info("אין מספיק חודשים שלמים לסימולציה")
+            return
+        runway_fig = create_runway_chart(result)
+        if runway_fig:
+            st.plotly_chart(runway_fig, width="stretch", key="budget_runway")
+        runway = result.runway_percentiles()
+        create_simple_metric_row(
+            [
+                {
+                    "title": "חודשים ממומנים (חציון)",
+                    "value": f"{runway[50]:,}",
+                    "help": (
+                        f"חציון מתוך {result.paths:,} מסלולים "
+                        f"שנדגמו מ-{result.history_months} חודשים"
+                    ),
+                },
+                {
+                    "title": "חודשים ממומנים (תרחיש רע)",
+                    "value": f"{runway[5]:,}",
+                    "help": "ב-95% מהמסלולים היתרה מחזיקה לפחות מספר חודשים זה",
+                },
+                {
+                    "title": "סיכוי לגירעון בתקופה",
+                    "value": f"{1 - result.funded_probability:.0%}",
+                    "help": "שיעור המסלולים שבהם היתרה יורדת מתחת לאפס",
+                },
+            ],
+            3,
+        )
+    except Exception as e:
+        st.error("שגיאה בחישוב סימולציית היתרה")
+        logging.error(f"Runway simulation error: {e}")
+
+
 def create_donors_section(donations_df: pd.DataFrame, donor_stats: Dict):
     """Create the donors management section"""
     create_simple_section_header("👥 ניהול תורמים")
     # Donor Charts (no duplicate metrics)
     try:
-        donor_fig = create_donor_contribution_chart(donations_df)
+        donor_fig = create_donor_contribution_chart(
+            donations_df, st.session_state.get("donor_index")
+        )
         if donor_fig:
             st.plotly_chart(donor_fig, width="stretch", key="donor_contributions")
         else:
@@ -197,6 +272,66 @@ def create_donors_section(donations_df: pd.DataFrame, donor_stats: Dict):
     add_spacing(3)
 
 
+def _slider_values(low: float, high: float, step: float) -> np.ndarray:
+    """Every value of a range slider selection, ``step`` apart."""
+    return np.arange(low, high + step / 2, step)
+
+
+def create_scenarios_section(almanot_df: pd.DataFrame):
+    """Create the what-if scenario table of the widows section"""
+    try:
+        st.markdown("#### 🧮 תרחישי תמיכה")
+        donations = projected_donations(st.session_state.get("rollups"))
+        if donations is None:
+            # Without a donation projection every scenario would run on zero income
+            st.info("אין מספיק נתוני תרומות חודשיים לחישוב תרחישים")
+            return
+        col1, col2, col3 = create_three_column_layout()
+        with col1:
+            uplift = st.slider("תוספת חודשית לילד (₪)", 0, 1000, (0, 300), 50, key="uplift")
+        with col2:
+            intake = st.slider("אלמנות חדשות בחודש", 0, 10, (0, 3), key="intake")
+        with col3:
+            growth = st.slider("צמיחת תרומות שנתית (%)", -30, 30, (-10, 10), 5, key="growth")
+        grid = scenario_grid(
+            _slider_values(*uplift, 50),
+            _slider_values(*intake, 1),
+            _slider_values(*growth, 5) / 100,
+        )
+        scenarios = evaluate_scenarios(
+            widow_commitments(almanot_df, st.session_state.get("widow_support_df")),
+            grid,
+            donations,
+            st.session_state.get("projection_horizon", DEFAULT_HORIZON),
+        )
+        scenarios = scenarios.sort_values(
+            ["months_funded", "total_cost"], ascending=[False, True], kind="stable"
+        )
+        scenarios["donation_growth"] *= 100
+        scenarios["coverage"] *= 100
+        st.caption(f"{len(scenarios):,} תרחישים")
+        st.dataframe(
+            scenarios.rename(
+                columns={
+                    "child_uplift": "תוספת לילד",
+                    "intake": "אלמנות חדשות בחודש",
+                    "donation_growth": "צמיחת תרומות (%)",
+                    "total_cost": "עלות כוללת",
+                    "total_donations": "תרומות צפויות",
+                    "coverage": "כיסוי (%)",
+                    "final_balance": "יתרה בסוף התקופה",
+                    "months_funded": "חודשים ממומנים",
+                    "deficit_month": "חודש גירעון",
+                }
+            ).round(1),
+            width="stretch",
+            hide_index=True,
+        )
+    except Exception as e:
+        st.error("שגיאה בחישוב תרחישי התמיכה")
+        logging.error(f"Scenario evaluation error: {e}")
+
+
 def create_widows_section(almanot_df: pd.DataFrame, widow_stats: Dict):
     """Create the widows management section"""
     create_simple_section_header("👩 ניהול אלמנות")
@@ -246,6 +381,42 @@ def create_widows_section(almanot_df: pd.DataFrame, widow_stats: Dict):
 
     add_spacing(2)
 
+    # Support projection over a chosen horizon
+    try:
+        st.markdown("#### 📈 תחזית תמיכה")
+        horizon = st.slider("חודשים קדימה", 12, 60, DEFAULT_HORIZON, key="projection_horizon")
+        commitments = widow_commitments(almanot_df, st.session_state.get("widow_support_df"))
+        projection = project_support(
+            commitments,
+            horizon,
+            donations=projected_donations(st.session_state.get("rollups")),
+        )
+        projection_fig = create_support_projection_chart(projection)
+        if projection_fig:
+            st.plotly_chart(projection_fig, width="stretch", key="support_projection")
+        create_simple_metric_row(
+            [
+                {
+                    "title": "תמיכה נדרשת בתקופה",
+                    "value": f"₪{projection['required'].sum():,.0f}",
+                    "help": "סך התמיכה לפי חודשי ההתחלה וסיום ההתחייבות של כל אלמנה",
+                },
+                {
+                    "title": "התחייבויות מסתיימות",
+                    "value": f"{projection['expiring'].sum():,}",
+                    "help": "התחייבויות תורמים שמסתיימות בתקופה",
+                },
+            ],
+            2,
+        )
+    except Exception as e:
+        st.error("שגיאה בחישוב תחזית התמיכה")
+        logging.error(f"Support projection error: {e}")
+
+    add_spacing(2)
+    create_scenarios_section(almanot_df)
+    add_spacing(2)
+
     # Complete Widows Table
     try:
         st.markdown("#### 📋 טבלת כל האלמנות")